@@ -1,3 +1,423 @@
-from django.contrib import admin
+"""
+Keeps the admin changelists cheap on large tables.
 
-# Register your models here.
+``LargeTableAdminMixin`` select_related()s the foreign keys shown in
+``list_display``. Once the table statistics put a model above
+ADMIN_LARGE_TABLE_ROWS rows, its changelist also:
+
+* takes the unfiltered row count from the statistics instead of running
+  ``COUNT(*)`` over the whole inheritance join;
+* counts filtered lists up to ADMIN_COUNT_LIMIT rows only;
+* searches indexed columns by prefix (``LIKE 'term%'``), leaving out the
+  search fields no index can serve.
+
+Estimates come from information_schema on MySQL and from sqlite_stat1
+(after ANALYZE) on SQLite; without statistics a table counts as small.
+
+``RecentRowsInlineMixin`` keeps long inlines light: the change form holds
+the latest ADMIN_INLINE_ROWS rows (``?<prefix>-offset=N`` moves the
+window), older ones are fetched on demand from a JSON view that
+``RecentRowsAdminMixin`` adds to the parent admin, and on save only the
+rows that changed are validated and written.
+
+``BackgroundDeleteAdminMixin`` hands deletes to the background worker
+(see api/deletion.py): the object is hidden at once and the progress of
+its removal shows under "Deletion jobs".
+
+``in_group()`` answers the admins' permission checks from the user's group
+names, read once per request: the change form asks them for every inline
+and action.
+
+"Request profiles" lists what the profiler middleware recorded (see
+api/profiling.py), with the pstats file of each one to download.
+"""
+import time
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.utils import display_for_field, display_for_value, label_for_field, lookup_field, unquote
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models, router
+from django.db.models.constants import LOOKUP_SEP
+from django.forms.models import BaseInlineFormSet
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.text import capfirst
+
+from . import deletion
+from .models import DeletionJob, RequestProfile
+
+# (alias, table) -> (expiry, estimated rows)
+_estimates = {}
+
+
+def estimated_rows(model, using=None):
+    """The number of rows the database statistics give ``model``'s table, or None."""
+    using = using or router.db_for_read(model)
+    table = model._meta.db_table
+    cached = _estimates.get((using, table))
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        sql = ('SELECT table_rows FROM information_schema.tables '
+               'WHERE table_schema = DATABASE() AND table_name = %s')
+    elif connection.vendor == 'sqlite':
+        # The first number of each index's stat is the table's row count.
+        sql = 'SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # No statistics yet (sqlite_stat1 only exists after ANALYZE).
+        row = None
+    rows = int(row[0]) if row and row[0] is not None else None
+    _estimates[using, table] = (time.monotonic() + settings.ADMIN_ESTIMATE_TTL, rows)
+    return rows
+
+
+def in_group(user, name):
+    """Whether ``user`` belongs to the group ``name``; their group names are read once per user object."""
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        names = user._group_names = frozenset(user.groups.values_list('name', flat=True))
+    return name in names
+
+
+def is_indexed(model, path):
+    """Whether the column ``path`` (e.g. 'organization__name') leads an index."""
+    *relations, name = path.split(LOOKUP_SEP)
+    try:
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        field = model._meta.get_field(name)
+    except (FieldDoesNotExist, AttributeError):
+        return False
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    # Inherited fields are indexed on the parent's table.
+    opts = field.model._meta
+    leading = [index.fields[0] for index in opts.indexes if index.fields]
+    leading += [fields[0] for fields in opts.unique_together]
+    return field.name in leading
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Takes ``estimate`` as the count of the unfiltered list (one filtered
+    no further than ``unfiltered``), and counts filtered lists up to
+    ``limit`` rows.
+    """
+
+    def __init__(self, *args, estimate=None, limit=None, unfiltered=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate = estimate
+        self.limit = limit
+        self.unfiltered = unfiltered
+
+    def is_unfiltered(self):
+        if self.unfiltered is None:
+            return not self.object_list.query.has_filters()
+        return self.object_list.query.where == self.unfiltered.query.where
+
+    @cached_property
+    def count(self):
+        if self.estimate is not None and self.is_unfiltered():
+            return self.estimate
+        if self.limit is not None:
+            return self.object_list[:self.limit].count()
+        return super().count
+
+
+class LargeTableAdminMixin:
+    # "N results (M total)" would count the whole table again.
+    show_full_result_count = False
+
+    def estimated_rows(self):
+        return estimated_rows(self.model)
+
+    def get_unfiltered_queryset(self, request):
+        """The list whose count the table statistics stand for."""
+        return self.model._default_manager.all()
+
+    def is_large(self):
+        rows = self.estimated_rows()
+        return rows is not None and rows >= settings.ADMIN_LARGE_TABLE_ROWS
+
+    def get_list_select_related(self, request):
+        declared = super().get_list_select_related(request)
+        if declared is True:
+            return True
+        related = list(declared or ())
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return list(dict.fromkeys(related)) or False
+
+    def get_search_fields(self, request):
+        search_fields = super().get_search_fields(request)
+        if not self.is_large():
+            return search_fields
+        prefixed = []
+        for name in search_fields:
+            path = name.lstrip('^=@')
+            if is_indexed(self.model, path):
+                prefixed.append(name if name.startswith('=') else f'^{path}')
+        return prefixed
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if not self.is_large():
+            return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        return EstimatedCountPaginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            estimate=self.estimated_rows(), limit=settings.ADMIN_COUNT_LIMIT,
+            unfiltered=self.get_unfiltered_queryset(request),
+        )
+
+
+class RecentRowsFormSet(BaseInlineFormSet):
+    """
+    Shows ``rows`` children from ``offset`` in ``ordering``. A bound
+    formset works on the rows that were rendered, and leaves out of
+    validation the ones left untouched.
+    """
+    rows = 20
+    offset = 0
+    ordering = ('-pk',)
+    rows_url = None
+
+    def submitted_pks(self):
+        pk_name = self.model._meta.pk.name
+        pks = (self.data.get(f'{self.add_prefix(i)}-{pk_name}') for i in range(self.initial_form_count()))
+        return [pk for pk in pks if pk]
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = self.queryset.order_by(*self.ordering)
+            if self.is_bound:
+                queryset = queryset.filter(pk__in=self.submitted_pks())
+            else:
+                queryset = queryset[self.offset:self.offset + self.rows]
+            self._queryset = queryset
+        return self._queryset
+
+    @cached_property
+    def has_older(self):
+        start = self.offset + self.rows
+        return self.queryset.order_by(*self.ordering)[start:start + 1].exists()
+
+    def _construct_form(self, i, **kwargs):
+        # Unchanged rows skip validation, like the blank extra forms do.
+        if i < self.initial_form_count():
+            kwargs['empty_permitted'] = True
+        return super()._construct_form(i, **kwargs)
+
+
+class RecentRowsInlineMixin:
+    """For inlines of a ``RecentRowsAdminMixin`` admin."""
+    formset = RecentRowsFormSet
+    template = 'admin/edit_inline/recent_rows_tabular.html'
+    # Newest first
+    recent_ordering = ('-pk',)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        prefix = formset.get_default_prefix()
+        try:
+            offset = max(int(request.GET.get(f'{prefix}-offset', 0)), 0)
+        except ValueError:
+            offset = 0
+        formset.rows = settings.ADMIN_INLINE_ROWS
+        formset.offset = offset
+        formset.ordering = self.recent_ordering
+        if obj is not None and obj.pk is not None:
+            opts = self.parent_model._meta
+            formset.rows_url = reverse(f'admin:{opts.app_label}_{opts.model_name}_inline_rows',
+                                       args=[obj.pk, prefix], current_app=self.admin_site.name)
+        return formset
+
+    def display(self, obj, name):
+        field, attr, value = lookup_field(name, obj, self)
+        if field is not None:
+            return str(display_for_field(value, field, self.get_empty_value_display()))
+        return str(display_for_value(value, self.get_empty_value_display()))
+
+    def rows_page(self, request, obj, offset):
+        """A page of rows from ``offset``, for the JSON view."""
+        formset = self.get_formset(request, obj)
+        fields = list(formset.form.base_fields)
+        size = settings.ADMIN_INLINE_ROWS
+        rows = list(self.get_queryset(request).filter(**{formset.fk.name: obj})
+                    .order_by(*self.recent_ordering)[offset:offset + size + 1])
+        opts = self.parent_model._meta
+        change_url = reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[obj.pk],
+                             current_app=self.admin_site.name)
+        return {
+            'columns': [capfirst(label_for_field(name, self.model, self)) for name in fields],
+            'results': [{'id': row.pk, 'cells': [self.display(row, name) for name in fields]}
+                        for row in rows[:size]],
+            'offset': offset,
+            'next': offset + size if len(rows) > size else None,
+            'edit_url': f'{change_url}?{formset.get_default_prefix()}-offset={offset}',
+        }
+
+
+class RecentRowsAdminMixin:
+    """Serves older rows of the admin's ``RecentRowsInlineMixin`` inlines as JSON."""
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('<path:object_id>/inline-rows/<str:prefix>/', self.admin_site.admin_view(self.inline_rows_view),
+                 name='%s_%s_inline_rows' % info),
+        ] + super().get_urls()
+
+    def inline_rows_view(self, request, object_id, prefix):
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+        for inline in self.get_inline_instances(request, obj):
+            if (isinstance(inline, RecentRowsInlineMixin)
+                    and inline.get_formset(request, obj).get_default_prefix() == prefix):
+                break
+        else:
+            raise Http404
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+        except ValueError:
+            offset = 0
+        return JsonResponse(inline.rows_page(request, obj, offset))
+
+
+class BackgroundDeleteAdminMixin:
+    """
+    Deletes through api/deletion.py instead of the collector, and keeps
+    the rows waiting for deletion out of the admin.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(hidden=False)
+
+    def get_unfiltered_queryset(self, request):
+        # The few hidden rows don't matter to an estimate.
+        return super().get_unfiltered_queryset(request).filter(hidden=False)
+
+    def get_deleted_objects(self, objs, request):
+        """
+        Count the related rows instead of listing every one of them; the
+        confirmation page shows the counts as its summary.
+        """
+        objs = list(objs)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        perms_needed = set()
+        for relation in deletion.relations(self.model):
+            related = relation.related_model
+            rows = related._base_manager.filter(**{f'{relation.field.name}__in': objs}).count()
+            if not rows:
+                continue
+            model_count[related._meta.verbose_name_plural] = rows
+            related_admin = self.admin_site._registry.get(related)
+            if (relation.on_delete is models.CASCADE and related_admin is not None
+                    and not related_admin.has_delete_permission(request)):
+                perms_needed.add(related._meta.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        deletion.schedule(obj, request.user)
+        self.message_user(request, f'"{obj}" is hidden and will be removed in the background.', messages.INFO)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            deletion.schedule(obj, request.user)
+        self.message_user(request, 'The selected objects are hidden and will be removed in the background.',
+                          messages.INFO)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('object_repr', 'content_type', 'status', 'progress', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'content_type')
+    list_select_related = ('content_type', 'requested_by')
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        done = f'{obj.processed}/{obj.total}' if obj.total else str(obj.processed)
+        return f'{done} - {obj.step}' if obj.step else done
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status', 'duration', 'sql_count', 'sql_time', 'trigger', 'user')
+    list_filter = ('trigger', 'method', 'status')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    ordering = ('-pk',)
+    fields = ('method', 'path', 'status', 'trigger', 'user', 'created_at', 'duration', 'sql_count', 'sql_time',
+              'download', 'slowest_sql', 'summary')
+    readonly_fields = fields
+
+    @admin.display(description='Duration', ordering='duration_ms')
+    def duration(self, obj):
+        return f'{obj.duration_ms:.1f} ms'
+
+    @admin.display(description='SQL time', ordering='sql_ms')
+    def sql_time(self, obj):
+        return f'{obj.sql_ms:.1f} ms'
+
+    @admin.display(description='Profile')
+    def download(self, obj):
+        url = reverse('admin:api_requestprofile_download', args=[obj.pk], current_app=self.admin_site.name)
+        return format_html('<a href="{}">request-{}.prof</a> (snakeviz, tuna, flameprof)', url, obj.pk)
+
+    @admin.display(description='Slowest statements')
+    def slowest_sql(self, obj):
+        return '\n\n'.join(f'{statement["ms"]:.1f} ms [{statement["alias"]}] {statement["sql"]}'
+                            for statement in obj.sql)
+
+    def get_queryset(self, request):
+        # The pstats blob is only read by the download view.
+        return super().get_queryset(request).defer('stats')
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='api_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = RequestProfile.objects.filter(pk=pk).only('stats').first()
+        if profile is None:
+            raise Http404
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="request-{profile.pk}.prof"'
+        return response
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import counters, leaderboards, marks, querycache, throttling
+        from .v1 import invalidation
+
+        counters.connect_signals()
+        leaderboards.connect_signals()
+        marks.connect_signals()
+        querycache.connect_signals()
+        invalidation.connect_signals()
+        checks.register(throttling.check_num_proxies, checks.Tags.security)
@@ -0,0 +1,72 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands.
+
+Benchmarks run against whatever database is configured. ``seeded_data``
+fills it with synthetic athletes inside a transaction that is always
+rolled back, so it is safe to point at a development copy of production.
+"""
+import contextlib
+import datetime
+import statistics
+import time
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def seeded_data(profiles=1000, children=5):
+    """
+    Create ``profiles`` athletes spread over a handful of organizations,
+    each with ``children`` stats, achievements and videos, and roll
+    everything back on exit.
+    """
+    from athletes.models import Profile, Achievement, Stat, Video
+    from organizations.models import Organization
+
+    try:
+        with transaction.atomic():
+            orgs = [
+                Organization.objects.create(name=f'Bench Club {i}', phone='555-0000',
+                                            email=f'club{i}@bench.invalid', state='TX')
+                for i in range(10)
+            ]
+            for i in range(profiles):
+                profile = Profile.objects.create(
+                    first_name=f'Bench{i}', last_name='Athlete', phone='555-0101',
+                    email=f'bench{i}@bench.invalid', sport='Track', school='Bench High',
+                    graduation_year=2024 + i % 4, bio='Sprinter and relay anchor.',
+                    organization=orgs[i % len(orgs)],
+                    youtube='https://youtube.com/@bench', instagram='https://instagram.com/bench',
+                )
+                Achievement.objects.bulk_create(
+                    Achievement(profile=profile, emoji='🏆', achievement=f'Meet win #{n}')
+                    for n in range(children)
+                )
+                Stat.objects.bulk_create(
+                    Stat(profile=profile, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=n),
+                         event='100m', performance=f'10.{n:02d}', highlight='Heat winner')
+                    for n in range(children)
+                )
+                Video.objects.bulk_create(
+                    Video(profile=profile, url=f'https://youtube.com/watch?v=bench{n}')
+                    for n in range(children)
+                )
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def measure(func, repeat=5):
+    """Run ``func`` ``repeat`` times and return (median seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
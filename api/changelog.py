@@ -0,0 +1,63 @@
+"""
+Append-only change log behind the delta sync endpoint (/api/v1/sync/).
+
+``record()`` appends one entry per changed object in the transaction
+making the change, so the entry commits (or rolls back) with it. Ids are
+handed out at insert, though, and transactions commit in their own
+order: an entry may become visible after a higher id already has. The
+sync endpoint therefore only serves entries older than
+SYNC_SETTLE_SECONDS (``settled()``), by which time the transactions that
+wrote them have committed; a writing transaction that stays open longer
+than that can still have its entries skipped by a client that synced in
+between.
+
+Entries are cheap (kind, id) pairs; compaction (``manage.py
+compact_changelog``) keeps only the latest entry per object and drops
+entries past the retention window; only the latter moves
+``truncated_through()``, the oldest cursor a client can still sync from.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import F, Max, Min
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ChangeLogEntry, ChangeLogWatermark
+
+PROFILE = 'profile'
+STAT = 'stat'
+ACHIEVEMENT = 'achievement'
+VIDEO = 'video'
+ORGANIZATION = 'organization'
+HIGHLIGHT = 'highlight'
+
+
+def record(kind, pks, using=None):
+    pks = sorted({pk for pk in pks if pk is not None})
+    if pks:
+        ChangeLogEntry.objects.using(using).bulk_create([ChangeLogEntry(kind=kind, object_id=pk) for pk in pks])
+
+
+def settled():
+    """The entries whose writing transactions can be taken to have committed."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    return ChangeLogEntry.objects.filter(created_at__lte=cutoff)
+
+
+def bounds():
+    """(oldest, newest) entry ids still in the log, or (None, None) when empty."""
+    result = ChangeLogEntry.objects.aggregate(oldest=Min('id'), newest=Max('id'))
+    return result['oldest'], result['newest']
+
+
+def truncated_through():
+    """The newest id entries may have been dropped through; older cursors must reset."""
+    return ChangeLogWatermark.objects.filter(pk=1).values_list('truncated_through', flat=True).first() or 0
+
+
+def truncate_through(entry_id):
+    """Record that entries up to ``entry_id`` may be gone."""
+    _, created = ChangeLogWatermark.objects.get_or_create(pk=1, defaults={'truncated_through': entry_id})
+    if not created:
+        ChangeLogWatermark.objects.filter(pk=1).update(truncated_through=Greatest(F('truncated_through'), entry_id))
@@ -0,0 +1,131 @@
+"""
+Denormalized counts of related rows.
+
+``Organization.athlete_count`` and ``Profile.achievement_count``,
+``stat_count`` and ``video_count`` save the list views and dashboards a
+COUNT(*) per row and can be sorted and filtered on (they are indexed).
+
+Each count is kept up to date in the same statement stream as the write
+that changes it, with ``UPDATE ... SET n = n + k`` so concurrent writers
+never overwrite each other:
+
+* save() of a new row, or of one moved to another parent, and delete();
+  QuerySet.delete() sends post_delete for every row once anybody listens,
+  so it is counted there too;
+* QuerySet.update() and bulk_update() touching the foreign key, as one
+  UPDATE per parent and distinct change (see api/signals.py);
+* bulk_create(), likewise grouped per parent.
+
+Raw SQL and writes on another path can still make a count drift;
+``manage.py reconcile_counters`` recounts and repairs them.
+"""
+from collections import Counter as Tally
+
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_delete, post_init, post_save
+
+from athletes.models import Achievement, Athlete, Profile, Stat, Video
+
+from .signals import post_bulk_write, pre_bulk_write
+
+
+class Counter:
+    """
+    Keeps ``field`` on the model ``fk`` points to equal to the number of
+    ``model`` rows pointing at it. ``senders`` are the models whose saves
+    write ``model`` rows (itself and its multi-table children).
+    """
+
+    def __init__(self, model, fk, field, senders=None):
+        self.model = model
+        self.fk = model._meta.get_field(fk)
+        self.target = self.fk.related_model
+        self.field = field
+        self.senders = senders or [model]
+        self.snapshot = f'_counted_{self.fk.attname}'
+
+    def __repr__(self):
+        return f'<Counter {self.target._meta.label}.{self.field}>'
+
+    def adjust(self, deltas, using=None):
+        """Apply {parent pk: change}, one UPDATE per distinct change."""
+        by_delta = {}
+        for pk, delta in deltas.items():
+            if pk is not None and delta:
+                by_delta.setdefault(delta, []).append(pk)
+        # Organization's base manager is the cached one, so its query cache
+        # and the pages showing the count follow (see invalidation.py);
+        # profiles are already refreshed by the child write itself.
+        queryset = self.target._base_manager.using(using)
+        for delta, pks in by_delta.items():
+            rows = queryset.filter(pk__in=pks)
+            if delta < 0:
+                # Never below zero; a drifted count is left to reconcile.
+                rows = rows.filter(**{f'{self.field}__gte': -delta})
+            rows.update(**{self.field: F(self.field) + delta})
+
+    def tally(self, pks, using=None):
+        """{parent pk: number of rows} among ``pks``."""
+        return Tally(self.model._base_manager.using(using).filter(pk__in=pks)
+                     .values_list(self.fk.attname, flat=True))
+
+    def writes_fk(self, fields):
+        return fields is not None and bool({self.fk.name, self.fk.attname} & set(fields))
+
+    # --- Receivers ---
+
+    def remember(self, sender, instance, **kwargs):
+        # Without touching a deferred field.
+        setattr(instance, self.snapshot, instance.__dict__.get(self.fk.attname, DEFERRED))
+
+    def saved(self, sender, instance, created, using=None, **kwargs):
+        old = None if created else getattr(instance, self.snapshot, DEFERRED)
+        new = getattr(instance, self.fk.attname)
+        # A row loaded without its foreign key can't tell where it was.
+        if old is not DEFERRED and old != new:
+            self.adjust({old: -1, new: 1}, using)
+        setattr(instance, self.snapshot, new)
+
+    def deleted(self, sender, instance, using=None, **kwargs):
+        self.adjust({getattr(instance, self.fk.attname): -1}, using)
+
+    def writing(self, sender, action, pks, fields=None, using=None, **kwargs):
+        if action in ('update', 'bulk_update') and self.writes_fk(fields):
+            self.adjust({pk: -n for pk, n in self.tally(pks, using).items()}, using)
+
+    def written(self, sender, action, pks, objs=None, fields=None, using=None, **kwargs):
+        if action == 'bulk_create':
+            self.adjust(Tally(getattr(obj, self.fk.attname) for obj in objs), using)
+        elif action in ('update', 'bulk_update') and self.writes_fk(fields):
+            self.adjust(self.tally(pks, using), using)
+
+    def connect(self):
+        uid = f'counters-{self.target._meta.label}.{self.field}'
+        for sender in self.senders:
+            post_init.connect(self.remember, sender=sender, weak=False, dispatch_uid=f'{uid}-{sender._meta.label}-init')
+            post_save.connect(self.saved, sender=sender, weak=False, dispatch_uid=f'{uid}-{sender._meta.label}-save')
+            pre_bulk_write.connect(self.writing, sender=sender, weak=False,
+                                   dispatch_uid=f'{uid}-{sender._meta.label}-pre-bulk')
+            post_bulk_write.connect(self.written, sender=sender, weak=False,
+                                    dispatch_uid=f'{uid}-{sender._meta.label}-bulk')
+        # Deleting a child row (a Profile) sends post_delete for its parent
+        # rows as well, so only the counted model itself is listened to.
+        post_delete.connect(self.deleted, sender=self.model, weak=False, dispatch_uid=f'{uid}-delete')
+
+
+COUNTERS = [
+    Counter(Athlete, 'organization', 'athlete_count', senders=[Athlete, Profile]),
+    Counter(Achievement, 'profile', 'achievement_count'),
+    Counter(Stat, 'profile', 'stat_count'),
+    Counter(Video, 'profile', 'video_count'),
+]
+
+
+def counter_fields(model):
+    """Names of the counts kept on ``model`` (or a model it inherits them from)."""
+    return {counter.field for counter in COUNTERS if issubclass(model, counter.target)}
+
+
+def connect_signals():
+    for counter in COUNTERS:
+        counter.connect()
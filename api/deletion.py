@@ -0,0 +1,139 @@
+"""
+Deletes of organizations and profiles, done in the background.
+
+Deleting a large school through the collector sets the organization of
+every athlete to NULL row by row, and a profile takes its stats,
+achievements, videos and their media files with it, all in the request
+and in one transaction. Instead, ``schedule()``:
+
+* marks the object ``hidden``, which drops it from the API, the admin and
+  the leaderboards at once (the bulk write signals take care of the
+  caches and the change log, see api/v1/invalidation.py);
+* records a ``DeletionJob``.
+
+``manage.py run_deletion_jobs`` (run from cron) then works through the
+pending jobs: the rows referring to the object are deleted, or detached
+for SET_NULL relations, DELETION_BATCH_SIZE at a time, each batch in its
+own short transaction, and the object itself is deleted last.
+django_cleanup removes its media files once that commits. The job's
+``step`` and ``processed`` show how far it got; a failed job keeps the
+error, and ``run_deletion_jobs --retry-failed`` resumes it where it stopped.
+A running job stamps ``heartbeat_at`` with every batch; one that hasn't
+for DELETION_JOB_STALE_AFTER seconds is taken to have lost its worker and
+is resumed by the next run as well.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from .models import DeletionJob
+
+
+def schedule(obj, user=None):
+    """Hide ``obj`` now and queue its deletion. Returns the DeletionJob."""
+    model = type(obj)
+    using = router.db_for_write(model, instance=obj)
+    with transaction.atomic(using=using):
+        model._default_manager.using(using).filter(pk=obj.pk).update(hidden=True)
+        obj.hidden = True
+        return DeletionJob.objects.using(using).create(
+            content_type=ContentType.objects.db_manager(using).get_for_model(obj, for_concrete_model=False),
+            object_id=obj.pk,
+            object_repr=str(obj)[:200],
+            requested_by=user if user is not None and user.is_authenticated else None,
+        )
+
+
+def stale_before():
+    """RUNNING jobs whose last heartbeat is older than this have lost their worker."""
+    return timezone.now() - timedelta(seconds=settings.DELETION_JOB_STALE_AFTER)
+
+
+def save_progress(job, *fields):
+    """Save ``fields`` of ``job``, and the heartbeat saying it is still being worked on."""
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=[*fields, 'heartbeat_at'])
+
+
+def leaf(obj):
+    """The most derived row of ``obj`` (a Profile for an Athlete that is one)."""
+    for relation in obj._meta.related_objects:
+        if relation.parent_link and relation.one_to_one:
+            child = relation.related_model._base_manager.filter(**{relation.field.name: obj.pk}).first()
+            if child is not None:
+                return leaf(child)
+    return obj
+
+
+def relations(model):
+    """The relations the collector would cascade or detach, parent links left out."""
+    return [
+        relation for relation in model._meta.related_objects
+        if not relation.parent_link and relation.on_delete in (models.CASCADE, models.SET_NULL)
+    ]
+
+
+def clear(job, obj, relation, batch_size, using):
+    """Delete or detach the rows of ``relation`` pointing at ``obj``, a batch at a time."""
+    manager = relation.related_model._default_manager.using(using)
+    rows = manager.filter(**{relation.field.name: obj.pk}).order_by('pk')
+    job.step = f'{relation.related_model._meta.verbose_name_plural} ({relation.field.name})'
+    save_progress(job, 'step')
+    while True:
+        pks = list(rows.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic(using=using):
+            batch = manager.filter(pk__in=pks)
+            if relation.on_delete is models.CASCADE:
+                batch.delete()
+            else:
+                batch.update(**{relation.field.name: None})
+            job.processed += len(pks)
+            save_progress(job, 'processed')
+
+
+def run(job, batch_size=None):
+    """
+    Carry out ``job``; marks it failed (and re-raises) on error. Returns
+    None if another worker took the job first, or is still running it.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    using = job._state.db
+    model = job.content_type.model_class()
+    claim = DeletionJob.objects.using(using).filter(pk=job.pk, status=job.status)
+    if job.status == DeletionJob.RUNNING:
+        claim = claim.filter(heartbeat_at__lt=stale_before())
+    job.started_at = job.heartbeat_at = timezone.now()
+    claimed = claim.update(status=DeletionJob.RUNNING, started_at=job.started_at, heartbeat_at=job.heartbeat_at,
+                           error='')
+    if not claimed:
+        return None
+    job.status, job.error = DeletionJob.RUNNING, ''
+    try:
+        obj = model._base_manager.using(using).filter(pk=job.object_id).first()
+        if obj is not None:
+            obj = leaf(obj)
+            pending = relations(type(obj))
+            job.total = job.processed + sum(
+                relation.related_model._base_manager.using(using).filter(**{relation.field.name: obj.pk}).count()
+                for relation in pending
+            )
+            save_progress(job, 'total')
+            for relation in pending:
+                clear(job, obj, relation, batch_size, using)
+            job.step = str(obj._meta.verbose_name)
+            save_progress(job, 'step')
+            # Only the object and its parent rows are left for the collector.
+            obj.delete(using=using)
+    except Exception as error:
+        job.status, job.error, job.finished_at = DeletionJob.FAILED, repr(error), timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+    # Rows derived from others (progression points, say) go along with them.
+    job.status, job.step, job.total, job.finished_at = DeletionJob.DONE, '', job.processed, timezone.now()
+    job.save(update_fields=['status', 'step', 'total', 'finished_at'])
+    return job
@@ -0,0 +1,122 @@
+"""
+Surrogate keys and purging for an edge cache (CDN or reverse proxy).
+
+Views name the objects a response contains with ``add_surrogate_keys``
+(e.g. ``profile-42 org-7 home``); EdgeCacheMiddleware turns those into
+``Surrogate-Key`` and ``Cache-Control`` headers on anonymous GET responses,
+so the edge may keep them until told otherwise.
+
+Writes call ``purge()`` with the keys they affect. Keys are queued once
+the transaction commits, collected for the whole request and sent to the
+configured purger in one batch when the response is done; outside a
+request (shell, management commands) they are sent straight away.
+
+Purgers are configured with EDGE_CACHE_PURGER (a dotted path). NullPurger
+does nothing (no edge in front of the app); HTTPPurger sends a PURGE
+request carrying the keys to EDGE_CACHE_PURGE_URL, which is how Varnish
+(xkey) and Fastly accept batched surrogate-key purges.
+"""
+import contextvars
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Keys collected during the current request, None outside one.
+_batch = contextvars.ContextVar('edge_cache_purge_batch', default=None)
+
+
+def profile_key(pk):
+    return f'profile-{pk}'
+
+
+def org_key(pk):
+    return f'org-{pk}'
+
+
+def leaderboard_key(event_key):
+    return f'leaderboard-{event_key}'
+
+
+def add_surrogate_keys(response, keys):
+    existing = response.get('Surrogate-Key', '').split()
+    response['Surrogate-Key'] = ' '.join(dict.fromkeys([*existing, *map(str, keys)]))
+    return response
+
+
+class BasePurger:
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class NullPurger(BasePurger):
+    def purge(self, keys):
+        pass
+
+
+class HTTPPurger(BasePurger):
+    method = 'PURGE'
+    # Fastly accepts at most 256 keys per request.
+    max_keys = 256
+
+    def __init__(self, url=None, headers=None, timeout=None):
+        self.url = url or settings.EDGE_CACHE_PURGE_URL
+        self.headers = headers if headers is not None else getattr(settings, 'EDGE_CACHE_PURGE_HEADERS', {})
+        self.timeout = timeout or getattr(settings, 'EDGE_CACHE_PURGE_TIMEOUT', 2)
+
+    def purge(self, keys):
+        # Not imported with the module: most processes never purge over HTTP.
+        import requests
+
+        for start in range(0, len(keys), self.max_keys):
+            chunk = keys[start:start + self.max_keys]
+            try:
+                response = requests.request(
+                    self.method, self.url, timeout=self.timeout,
+                    headers={**self.headers, 'Surrogate-Key': ' '.join(chunk)},
+                )
+                response.raise_for_status()
+            except requests.RequestException:
+                # A failed purge must not fail the write; the entries still
+                # expire after EDGE_CACHE_MAX_AGE.
+                logger.exception('Edge cache purge failed for %d keys', len(chunk))
+
+
+def get_purger():
+    return import_string(getattr(settings, 'EDGE_CACHE_PURGER', 'api.edgecache.NullPurger'))()
+
+
+def send_purge(keys):
+    if keys:
+        get_purger().purge(sorted(keys))
+
+
+def _queue(keys):
+    batch = _batch.get()
+    if batch is None:
+        send_purge(keys)
+    else:
+        batch.update(keys)
+
+
+def purge(keys, using=None):
+    """Evict responses tagged with any of ``keys`` once the transaction commits."""
+    keys = {str(key) for key in keys}
+    if keys:
+        transaction.on_commit(lambda: _queue(keys), using=using)
+
+
+class purge_batch:
+    """Collect the purges of the enclosed block and send them together."""
+
+    def __enter__(self):
+        self.token = _batch.set(set())
+        return self
+
+    def __exit__(self, *exc_info):
+        keys = _batch.get()
+        _batch.reset(self.token)
+        send_purge(keys)
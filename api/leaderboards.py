@@ -0,0 +1,224 @@
+"""
+Event leaderboards, precomputed in ``athletes.LeaderboardEntry``.
+
+Every athlete with a readable mark in an event (see athletes/performance.py)
+has one entry holding their best mark and its rank among everybody in the
+event. When stats change, the affected (profile, event) pairs are refreshed
+once the transaction commits (see marks.py): the best mark is looked up again and, if it
+moved, the entries it passes over get their rank shifted by one in a single
+UPDATE. A new mark costs a handful of indexed statements however long the
+board is.
+
+Sport, state and graduation year are copied onto the entries from the
+profile and its organization, and follow their changes. Profiles hidden
+while they wait for deletion (see deletion.py) leave every board.
+
+Refreshes of the same event running at the same time can leave ranks
+slightly off; ``manage.py rebuild_leaderboards`` recomputes every board
+from the stats.
+"""
+from django.db import transaction
+from django.db.models import DEFERRED, F, OuterRef, Subquery
+from django.db.models.signals import post_init, post_save, pre_delete
+
+from athletes.models import Athlete, LeaderboardEntry, Profile, Stat
+from athletes.performance import lower_is_better
+from organizations.models import Organization, School
+
+from . import edgecache
+from .signals import post_bulk_write
+
+# The list of events and their sizes.
+LEADERBOARDS_KEY = 'leaderboards'
+
+# LeaderboardEntry field -> Athlete lookup it is copied from
+PROFILE_FIELDS = {
+    'sport': 'sport',
+    'state': 'organization__state',
+    'graduation_year': 'graduation_year',
+}
+COPIED_FROM = {'sport', 'organization', 'organization_id', 'graduation_year'}
+# Athlete attributes remembered on load, to tell whether a save changed them
+COPIED_ATTNAMES = ('sport', 'organization_id', 'graduation_year')
+SNAPSHOT = '_leaderboard_copies'
+
+
+def better(value, lower):
+    return {'value__lt' if lower else 'value__gt': value}
+
+
+def worse(value, lower):
+    return {'value__gt' if lower else 'value__lt': value}
+
+
+def best_stat(profile_id, event_key, using=None):
+    order = 'performance_value' if lower_is_better(event_key) else '-performance_value'
+    return (Stat._base_manager.using(using)
+            .filter(profile_id=profile_id, event_key=event_key, performance_value__isnull=False,
+                    profile__hidden=False)
+            .order_by(order, 'date', 'pk').values('pk', 'performance_value').first())
+
+
+def profile_fields(profile_id, using=None):
+    row = Athlete._base_manager.using(using).filter(pk=profile_id).values(*PROFILE_FIELDS.values()).first()
+    return {field: row[lookup] for field, lookup in PROFILE_FIELDS.items()} if row else {}
+
+
+def copy_profile_fields(entries):
+    """Refresh the copied profile fields of ``entries`` in one UPDATE."""
+    profiles = Athlete._base_manager.filter(pk=OuterRef('profile_id'))
+    return entries.update(**{
+        field: Subquery(profiles.values(lookup)[:1]) for field, lookup in PROFILE_FIELDS.items()
+    })
+
+
+def refresh_entry(profile_id, event_key, using=None):
+    """
+    Bring one athlete's entry in an event in line with their stats.
+    Returns 'joined', 'left', 'moved' or None if the board didn't change.
+    """
+    lower = lower_is_better(event_key)
+    entries = LeaderboardEntry.objects.using(using).filter(event_key=event_key)
+    with transaction.atomic(using=using):
+        entry = entries.select_for_update().filter(profile_id=profile_id).first()
+        best = best_stat(profile_id, event_key, using)
+        if entry is None and best is None:
+            return None
+        value = best and best['performance_value']
+        if entry is not None and entry.value == value:
+            if entry.stat_id == best['pk']:
+                return None
+            # An equal mark, e.g. the old stat was deleted.
+            entry.stat_id = best['pk']
+            entry.save(using=using, update_fields=['stat'])
+            return 'moved'
+
+        others = entries.exclude(pk=entry.pk) if entry else entries
+        if entry is not None:
+            others.filter(**worse(entry.value, lower)).update(rank=F('rank') - 1)
+        if best is None:
+            entry.delete()
+            return 'left'
+        others.filter(**worse(value, lower)).update(rank=F('rank') + 1)
+        fields = {
+            'stat_id': best['pk'], 'value': value, 'lower_is_better': lower,
+            'rank': others.filter(**better(value, lower)).count() + 1,
+            **profile_fields(profile_id, using),
+        }
+        if entry is None:
+            LeaderboardEntry.objects.using(using).create(profile_id=profile_id, event_key=event_key, **fields)
+            return 'joined'
+        for name, field_value in fields.items():
+            setattr(entry, name, field_value)
+        entry.save(using=using)
+        return 'moved'
+
+
+def refresh(pairs, using=None):
+    """Refresh the entries of the given (profile id, event key) pairs."""
+    keys = set()
+    for profile_id, event_key in pairs:
+        change = refresh_entry(profile_id, event_key, using)
+        if change:
+            keys.add(edgecache.leaderboard_key(event_key))
+        if change in ('joined', 'left'):
+            keys.add(LEADERBOARDS_KEY)
+    edgecache.purge(keys, using)
+
+
+def drop_ranks(rows, using=None):
+    # The entries themselves are gone; close the gaps they leave.
+    entries = LeaderboardEntry.objects.using(using)
+    for event_key, value, lower in rows:
+        entries.filter(event_key=event_key, **worse(value, lower)).update(rank=F('rank') - 1)
+    edgecache.purge([LEADERBOARDS_KEY, *(edgecache.leaderboard_key(row[0]) for row in rows)], using)
+
+
+# --- Profiles and organizations ---
+
+def profile_deleting(sender, instance, using=None, **kwargs):
+    rows = list(LeaderboardEntry.objects.using(using).filter(profile_id=instance.pk)
+                .values_list('event_key', 'value', 'lower_is_better'))
+    if rows:
+        transaction.on_commit(lambda: drop_ranks(rows, using), using=using)
+
+
+def remove_entries(entries, using=None):
+    rows = list(entries.values_list('event_key', 'value', 'lower_is_better'))
+    if rows:
+        entries.delete()
+        transaction.on_commit(lambda: drop_ranks(rows, using), using=using)
+
+
+def copied_values(instance):
+    # Without touching a deferred field.
+    return tuple(instance.__dict__.get(name, DEFERRED) for name in COPIED_ATTNAMES)
+
+
+def profile_loaded(sender, instance, **kwargs):
+    setattr(instance, SNAPSHOT, copied_values(instance))
+
+
+def profile_saved(sender, instance, created, update_fields=None, using=None, **kwargs):
+    # A bio or a link doesn't show on the boards.
+    if update_fields is not None and not COPIED_FROM & set(update_fields):
+        return
+    old, new = getattr(instance, SNAPSHOT, None), copied_values(instance)
+    if update_fields is not None and old is not None:
+        # Fields left out of update_fields weren't written.
+        new = tuple(value if {name, name.removesuffix('_id')} & set(update_fields) else previous
+                    for name, value, previous in zip(COPIED_ATTNAMES, new, old))
+    setattr(instance, SNAPSHOT, new)
+    # New profiles have no entries yet.
+    if created or old == new:
+        return
+    refresh_copies(LeaderboardEntry.objects.using(using).filter(profile_id=instance.pk), using)
+
+
+def profiles_written(sender, action, pks, fields=None, using=None, **kwargs):
+    if action in ('update', 'bulk_update') and (fields is None or COPIED_FROM & set(fields)):
+        refresh_copies(LeaderboardEntry.objects.using(using).filter(profile_id__in=pks), using)
+    if action in ('update', 'bulk_update') and fields is not None and 'hidden' in fields:
+        remove_entries(LeaderboardEntry.objects.using(using).filter(profile_id__in=pks, profile__hidden=True), using)
+
+
+def refresh_copies(entries, using=None):
+    # Filtered boards the athletes join or leave don't carry their keys.
+    events = set(entries.values_list('event_key', flat=True).distinct())
+    if events:
+        copy_profile_fields(entries)
+        edgecache.purge([edgecache.leaderboard_key(event_key) for event_key in events], using)
+
+
+def organization_saved(sender, instance, using=None, **kwargs):
+    entries = LeaderboardEntry.objects.using(using).filter(profile__organization_id=instance.pk)
+    refresh_copies(entries.exclude(state=instance.state), using)
+
+
+def organization_deleting(sender, instance, using=None, **kwargs):
+    # The athletes only lose their organization (and state) in the delete.
+    profile_ids = list(Athlete._base_manager.using(using).filter(organization_id=instance.pk)
+                       .values_list('pk', flat=True))
+    if profile_ids:
+        transaction.on_commit(lambda: refresh_copies(
+            LeaderboardEntry.objects.using(using).filter(profile_id__in=profile_ids), using), using=using)
+
+
+def organizations_written(sender, action, pks, fields=None, using=None, **kwargs):
+    if action in ('update', 'bulk_update') and (fields is None or 'state' in fields):
+        refresh_copies(LeaderboardEntry.objects.using(using).filter(profile__organization_id__in=pks), using)
+
+
+def connect_signals():
+    pre_delete.connect(profile_deleting, sender=Profile, dispatch_uid='leaderboards-profile-delete')
+    for model in (Athlete, Profile):
+        uid = f'leaderboards-{model._meta.label}'
+        post_init.connect(profile_loaded, sender=model, dispatch_uid=f'{uid}-init')
+        post_save.connect(profile_saved, sender=model, dispatch_uid=f'{uid}-save')
+        post_bulk_write.connect(profiles_written, sender=model, dispatch_uid=f'{uid}-bulk')
+
+    for model in (Organization, School):
+        uid = f'leaderboards-{model._meta.label}'
+        post_save.connect(organization_saved, sender=model, dispatch_uid=f'{uid}-save')
+        pre_delete.connect(organization_deleting, sender=model, dispatch_uid=f'{uid}-delete')
+        post_bulk_write.connect(organizations_written, sender=model, dispatch_uid=f'{uid}-bulk')
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import measure, seeded_data
+from api.middleware import available_codecs
+from api.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering time and bytes on the wire for the largest API endpoints'
+
+    endpoints = [
+        ('home', '/api/v1/home/'),
+        ('profiles', '/api/v1/profiles/'),
+        ('search', '/api/v1/search/?q=bench'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create this many synthetic profiles first (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--children',
+            type=int,
+            default=5,
+            help='Stats, achievements and videos per synthetic profile',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per measurement (the median is reported)',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            with seeded_data(options['seed'], options['children']):
+                self.run(options['repeat'])
+        else:
+            self.run(options['repeat'])
+
+    def run(self, repeat):
+        client = Client()
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        codecs = available_codecs()
+
+        for name, url in self.endpoints:
+            response = client.get(url)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f'{name}: {url} returned {response.status_code}, skipped'))
+                continue
+            data = response.data
+
+            stdlib_time, stdlib_body = measure(lambda: stdlib.render(data), repeat)
+            fast_time, fast_body = measure(lambda: fast.render(data), repeat)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({url})'))
+            self.stdout.write(f'  stdlib json : {stdlib_time * 1000:8.2f} ms  {len(stdlib_body):>10} bytes')
+            self.stdout.write(
+                f'  fast json   : {fast_time * 1000:8.2f} ms  {len(fast_body):>10} bytes'
+                f'  ({stdlib_time / fast_time if fast_time else 0:.1f}x)'
+            )
+            if fast_body != stdlib_body:
+                self.stdout.write(self.style.WARNING('  renderers disagree on the output bytes'))
+
+            for codec, compress in codecs:
+                codec_time, compressed = measure(lambda: compress(fast_body), repeat)
+                ratio = len(compressed) / len(fast_body) if fast_body else 0
+                self.stdout.write(
+                    f'  {codec:<11} : {codec_time * 1000:8.2f} ms  {len(compressed):>10} bytes'
+                    f'  ({ratio:.0%} of identity)'
+                )
@@ -0,0 +1,66 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, like a process Passenger has just spawned.
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from passenger_wsgi import application
+loaded = time.perf_counter()
+from config.warmup import request
+status = request(application, sys.argv[1])
+first_byte = time.time()
+first = time.perf_counter()
+request(application, sys.argv[1])
+print(json.dumps({"status": status, "load": loaded - start, "first": first - loaded,
+                  "second": time.perf_counter() - first, "first_byte": first_byte}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure time to first byte of freshly started application processes, with and without warmup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='/api/v1/home/',
+            help='Path of the first request',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Processes started per mode (the median is reported)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'First request: GET {options["url"]}, median of {options["repeat"]} processes')
+        self.stdout.write(f'{"warmup":<8} {"start→first byte":>17} {"load app":>9} {"1st request":>12} {"2nd":>8}')
+        for warmup in (False, True):
+            runs = [self.spawn(options['url'], warmup) for _ in range(options['repeat'])]
+            ms = {key: statistics.median(run[key] for run in runs) * 1000 for key in ('ttfb', 'load', 'first', 'second')}
+            self.stdout.write(f'{"on" if warmup else "off":<8} {ms["ttfb"]:>14.1f} ms {ms["load"]:>6.1f} ms'
+                              f' {ms["first"]:>9.1f} ms {ms["second"]:>5.1f} ms')
+
+    def spawn(self, url, warmup):
+        env = {
+            **os.environ, 'WARMUP': '1' if warmup else '0',
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+        }
+        started = time.time()
+        result = subprocess.run([sys.executable, '-c', CHILD, url], capture_output=True, text=True, env=env,
+                                cwd=settings.BASE_DIR)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        if not run['status'] or not run['status'].startswith('200'):
+            raise CommandError(f'GET {url} answered {run["status"]}')
+        run['ttfb'] = run['first_byte'] - started
+        return run
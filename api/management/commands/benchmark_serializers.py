@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import measure, seeded_data
+from api.v1.compiled import compiled_profiles
+from api.v1.serializers import ProfileSerializer
+from athletes.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF ProfileSerializer with the compiled read path on a page of profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1000,
+            help='Synthetic profiles to create for the run (rolled back afterwards, 0 to use existing data)',
+        )
+        parser.add_argument(
+            '--children',
+            type=int,
+            default=5,
+            help='Stats, achievements and videos per synthetic profile',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per measurement (the median is reported)',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            with seeded_data(options['seed'], options['children']):
+                self.run(options['repeat'])
+        else:
+            self.run(options['repeat'])
+
+    def run(self, repeat):
+        context = {'request': APIRequestFactory().get('/api/v1/profiles/')}
+        queryset = Profile.objects.order_by('pk')
+
+        # DRF at its best: everything it touches prefetched up front.
+        drf_time, drf_data = measure(lambda: ProfileSerializer(
+            queryset.select_related('user', 'organization')
+            .prefetch_related('user__groups', 'achievements', 'stats', 'videos'),
+            many=True, context=context,
+        ).data, repeat)
+        compiled_time, compiled_data = measure(lambda: compiled_profiles.serialize(queryset, context), repeat)
+
+        renderer = JSONRenderer()
+        self.stdout.write(f'profiles      : {len(compiled_data)}')
+        self.stdout.write(f'DRF serializer: {drf_time * 1000:8.2f} ms')
+        self.stdout.write(f'compiled      : {compiled_time * 1000:8.2f} ms  ({drf_time / compiled_time:.1f}x)')
+        if renderer.render(drf_data) == renderer.render(compiled_data):
+            self.stdout.write(self.style.SUCCESS('output identical'))
+        else:
+            self.stdout.write(self.style.ERROR('output differs'))
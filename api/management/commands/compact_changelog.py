@@ -0,0 +1,69 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from api.changelog import bounds, truncate_through
+from api.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = 'Keep the sync change log bounded: drop superseded entries and entries past the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SYNC_LOG_RETENTION_DAYS,
+            help='Drop entries older than this; clients with an older cursor get a reset',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Entries deleted per statement',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        superseded = self.drop_superseded()
+        expired = self.drop_expired(timezone.now() - datetime.timedelta(days=options['days']))
+        oldest, newest = bounds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {superseded} superseded and {expired} expired entries; '
+            f'log now spans #{oldest} to #{newest}'
+        ))
+
+    def delete_ids(self, ids):
+        for start in range(0, len(ids), self.batch_size):
+            ChangeLogEntry.objects.filter(id__in=ids[start:start + self.batch_size]).delete()
+        return len(ids)
+
+    def drop_superseded(self):
+        # The sync endpoint always serves an object's current state, so only
+        # its latest entry matters.
+        latest = {
+            (row['kind'], row['object_id']): row['latest']
+            for row in ChangeLogEntry.objects.values('kind', 'object_id')
+            .annotate(latest=Max('id'), entries=Count('id')).filter(entries__gt=1).order_by()
+        }
+        if not latest:
+            return 0
+        ids = [
+            entry_id for entry_id, kind, object_id in
+            ChangeLogEntry.objects.order_by('id').values_list('id', 'kind', 'object_id').iterator(self.batch_size)
+            if entry_id < latest.get((kind, object_id), entry_id)
+        ]
+        return self.delete_ids(ids)
+
+    def drop_expired(self, cutoff):
+        _, newest = bounds()
+        # The newest entry always stays: it marks where the log starts.
+        ids = list(ChangeLogEntry.objects.filter(created_at__lt=cutoff).exclude(id=newest)
+                   .order_by('id').values_list('id', flat=True))
+        if ids:
+            # Before the delete: a client syncing meanwhile gets a reset rather than a gap.
+            truncate_through(ids[-1])
+        return self.delete_ids(ids)
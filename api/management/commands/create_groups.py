@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
-from django.contrib.auth.models import Group, Permission, User
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 from athletes.models import Athlete, Profile
 from organizations.models import Organization
 
@@ -30,8 +32,90 @@ class Command(BaseCommand):
             action='store_true',
             help="Don't save changes; just print what would change",
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Group memberships inserted per statement',
+        )
 
     def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        enable_staff = options.get('enable_staff')
+        disable_staff = options.get('disable_staff')
+        dry_run = options.get('dry_run')
+
+        if enable_staff and disable_staff:
+            self.stdout.write(self.style.ERROR('Cannot specify both --enable-staff and --disable-staff'))
+            return
+
+        if dry_run:
+            self.say('Dry run: nothing will be saved')
+        else:
+            self.create_groups()
+
+        # Members of each group, as a subquery of user ids
+        members = {
+            'Athlete': Athlete.objects.filter(user__isnull=False).values('user_id'),
+            'Organization Owner': Organization.objects.filter(owner__isnull=False).values('owner_id'),
+        }
+        target_groups = [g.strip() for g in options.get('groups').split(',') if g.strip()]
+        staff = None
+        if enable_staff or disable_staff:
+            staff = bool(enable_staff)
+
+        with transaction.atomic():
+            for group_name in target_groups:
+                if group_name not in members:
+                    self.stdout.write(self.style.WARNING(f'Unknown group "{group_name}", skipped'))
+                    continue
+                self.reconcile(group_name, members[group_name], staff, dry_run, options['batch_size'])
+
+        self.say(self.style.SUCCESS('Group assignments completed for existing users'))
+
+    def reconcile(self, group_name, member_ids, staff, dry_run, batch_size):
+        """
+        Add the missing memberships of ``group_name`` and set is_staff on
+        its members, a few statements whatever the number of users.
+        """
+        User = get_user_model()
+        Membership = User.groups.through
+        users = User._default_manager.filter(pk__in=member_ids)
+
+        group = Group.objects.filter(name=group_name).first()
+        missing = users
+        if group is not None:
+            missing = users.exclude(pk__in=Membership.objects.filter(group=group).values('user_id'))
+        missing = list(missing.values_list('pk', 'username'))
+        self.say(f'{group_name}: {len(missing)} users to add to the group')
+        self.list_users(username for _, username in missing)
+        if not dry_run and missing:
+            Membership.objects.bulk_create(
+                [Membership(user_id=pk, group_id=group.pk) for pk, _ in missing],
+                batch_size=batch_size, ignore_conflicts=True,
+            )
+
+        if staff is None:
+            return
+        changing = users.exclude(is_staff=staff)
+        if dry_run:
+            names = list(changing.values_list('username', flat=True))
+            self.say(f'{group_name}: {len(names)} users would change is_staff -> {staff}')
+            self.list_users(names)
+        else:
+            changed = changing.update(is_staff=staff)
+            self.say(f'{group_name}: {changed} users changed is_staff -> {staff}')
+
+    def say(self, message):
+        if self.verbosity >= 1:
+            self.stdout.write(message)
+
+    def list_users(self, usernames):
+        if self.verbosity > 1:
+            for username in usernames:
+                self.stdout.write(f' - {username}')
+
+    def create_groups(self):
         # Get content types for models
         athlete_ct = ContentType.objects.get_for_model(Athlete)
         profile_ct = ContentType.objects.get_for_model(Profile)
@@ -88,46 +172,8 @@ class Command(BaseCommand):
         athlete_group.permissions.set(athlete_perms)
         org_owner_group.permissions.set(org_owner_perms)
 
-        self.stdout.write(
+        self.say(
             self.style.SUCCESS(
                 'Successfully created groups "Athlete" and "Organization Owner" with appropriate permissions'
             )
         )
-        
-        # Assign groups to existing users if needed
-        args_groups = options.get('groups')
-        enable_staff = options.get('enable_staff')
-        disable_staff = options.get('disable_staff')
-        dry_run = options.get('dry_run')
-
-        if enable_staff and disable_staff:
-            self.stdout.write(self.style.ERROR('Cannot specify both --enable-staff and --disable-staff'))
-            return
-
-        target_groups = [g.strip() for g in args_groups.split(',') if g.strip()]
-
-        # Helper to process a user
-        def process_user(user, group_name):
-            if not user.groups.filter(name=group_name).exists():
-                user.groups.add(Group.objects.get(name=group_name))
-            if enable_staff or disable_staff:
-                target = True if enable_staff else False
-                if user.is_staff != target:
-                    self.stdout.write(f" - {user.username} ({user.email}): is_staff {user.is_staff} -> {target}")
-                    if not dry_run:
-                        user.is_staff = target
-                        user.save()
-
-        # Assign Athlete group to existing athlete users
-        if 'Athlete' in target_groups:
-            for athlete in Athlete.objects.all():
-                if athlete.user:
-                    process_user(athlete.user, 'Athlete')
-
-        # Assign Organization Owner group to existing org owners
-        if 'Organization Owner' in target_groups:
-            for org in Organization.objects.all():
-                if org.owner:
-                    process_user(org.owner, 'Organization Owner')
-
-        self.stdout.write(self.style.SUCCESS('Group assignments completed for existing users'))
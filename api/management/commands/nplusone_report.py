@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api import nplusone
+
+
+class Command(BaseCommand):
+    help = 'List the N+1 queries the detector has seen, per view (see api/nplusone.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Forget them after listing',
+        )
+
+    def handle(self, *args, **options):
+        entries = nplusone.reports()
+        if not entries:
+            self.stdout.write('No N+1 queries seen')
+        for entry in entries:
+            self.stdout.write(self.style.WARNING(
+                f'{entry["view"]}: {entry["requests"]} requests, up to {entry["most"]} times in one,'
+                f' last {entry["last_seen"]:%Y-%m-%d %H:%M}'
+            ))
+            self.stdout.write(f'  {entry["sql"]}')
+            for line in entry['stack']:
+                self.stdout.write(f'    {line}')
+        if options['clear']:
+            nplusone.clear_reports()
@@ -0,0 +1,71 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# What each target imports, run in a fresh interpreter.
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': 'import config.wsgi',
+    'urls': 'import config.wsgi; from django.urls import get_resolver; get_resolver().reverse_dict',
+}
+
+# python -X importtime: "import time: <self us> | <cumulative us> | <indented name>"
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Report what a fresh process spends importing, by top-level package'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            choices=sorted(TARGETS),
+            default='wsgi',
+            help='How far to start the application: django.setup(), the WSGI app, or the URLconf too',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=15,
+            help='Packages (and modules) listed',
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', TARGETS[options['target']]],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        packages = defaultdict(int)
+        # (package, module that first imported it) -> cumulative us
+        entries = {}
+        pending = []  # (depth, name, cumulative) waiting for their importer
+        for line in result.stderr.splitlines():
+            match = LINE.match(line)
+            if not match:
+                continue
+            own, cumulative, depth, name = int(match[1]), int(match[2]), len(match[3]), match[4]
+            packages[name.split('.')[0]] += own
+            # Lines come out children first; the deeper ones before this were imported by it.
+            while pending and pending[-1][0] > depth:
+                _, child, child_cumulative = pending.pop()
+                if child.split('.')[0] != name.split('.')[0]:
+                    entries.setdefault((child.split('.')[0], name), child_cumulative)
+            pending.append((depth, name, cumulative))
+        total = sum(packages.values())
+
+        limit = options['limit']
+        self.stdout.write(f'{options["target"]}: {total / 1000:.0f} ms of imports\n')
+        self.stdout.write(f'{"package":<30} {"ms":>8} {"share":>6}')
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{name:<30} {own / 1000:>8.1f} {own / total:>6.1%}')
+        self.stdout.write(f'\n{"package":<30} {"ms":>8}  pulled in by')
+        for (package, importer), cumulative in sorted(entries.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{package:<30} {cumulative / 1000:>8.1f}  {importer}')
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import edgecache
+from api.leaderboards import LEADERBOARDS_KEY, PROFILE_FIELDS
+from athletes.models import PARSED_FIELDS, Athlete, LeaderboardEntry, Stat
+from athletes.performance import lower_is_better
+
+
+class Command(BaseCommand):
+    help = 'Recompute every event leaderboard from the stats, optionally reparsing the marks first'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reparse',
+            action='store_true',
+            help='Parse event/performance of every stat again (backfill after a parser change)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Stats parsed, or entries written, per statement',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        if options['reparse']:
+            parsed = self.reparse()
+            self.stdout.write(f'Parsed {parsed} stats')
+
+        events = sorted(set(Stat._base_manager.exclude(event_key='').filter(performance_value__isnull=False)
+                            .values_list('event_key', flat=True).distinct()))
+        entries = sum(self.rebuild(event_key) for event_key in events)
+        LeaderboardEntry.objects.exclude(event_key__in=events).delete()
+        edgecache.purge([LEADERBOARDS_KEY, *map(edgecache.leaderboard_key, events)])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(events)} leaderboards with {entries} entries'))
+
+    def reparse(self):
+        # Through the base manager: the parsed columns aren't part of any
+        # representation, so there's nothing to invalidate.
+        stats = Stat._base_manager.only('event', 'performance').order_by('pk')
+        count = 0
+        last = 0
+        while True:
+            batch = list(stats.filter(pk__gt=last)[:self.batch_size])
+            if not batch:
+                return count
+            for stat in batch:
+                stat.parse_performance()
+            Stat._base_manager.bulk_update(batch, PARSED_FIELDS)
+            count += len(batch)
+            last = batch[-1].pk
+
+    def rebuild(self, event_key):
+        lower = lower_is_better(event_key)
+        stats = (Stat._base_manager.filter(event_key=event_key, performance_value__isnull=False,
+                                            profile__isnull=False, profile__hidden=False)
+                 .order_by('performance_value' if lower else '-performance_value', 'date', 'pk')
+                 .values_list('pk', 'profile_id', 'performance_value'))
+        best = {}
+        for stat_id, profile_id, value in stats.iterator(self.batch_size):
+            best.setdefault(profile_id, (stat_id, value))
+
+        profiles = {row['pk']: row for row in
+                    Athlete._base_manager.filter(pk__in=list(best)).values('pk', *PROFILE_FIELDS.values())}
+        entries = []
+        previous = None
+        for position, (profile_id, (stat_id, value)) in enumerate(best.items(), start=1):
+            # Ties share the rank of the first of them.
+            rank = previous.rank if previous and previous.value == value else position
+            previous = LeaderboardEntry(
+                event_key=event_key, profile_id=profile_id, stat_id=stat_id, value=value,
+                lower_is_better=lower, rank=rank,
+                **{field: profiles[profile_id][lookup] for field, lookup in PROFILE_FIELDS.items()},
+            )
+            entries.append(previous)
+
+        with transaction.atomic():
+            LeaderboardEntry.objects.filter(event_key=event_key).delete()
+            LeaderboardEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+        return len(entries)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from athletes.models import Profile, ProgressionPoint, Stat
+from api import progression
+
+
+class Command(BaseCommand):
+    help = 'Recompute the progression points of every athlete from the stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Athletes rebuilt per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        profiles = Profile._base_manager.order_by('pk').values_list('pk', flat=True)
+        athletes = points = 0
+        last = 0
+        while True:
+            batch = list(profiles.filter(pk__gt=last)[:batch_size])
+            if not batch:
+                break
+            marks = set(Stat._base_manager.filter(profile_id__in=batch, performance_value__isnull=False)
+                        .exclude(event_key='')
+                        .values_list('profile_id', 'event_key', 'date'))
+            with transaction.atomic():
+                ProgressionPoint.objects.filter(profile_id__in=batch).delete()
+                progression.refresh(marks)
+            athletes += len(batch)
+            points += ProgressionPoint.objects.filter(profile_id__in=batch).count()
+            last = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {points} progression points for {athletes} athletes'))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from api.counters import COUNTERS
+
+
+class Command(BaseCommand):
+    help = 'Recount the denormalized counters (api/counters.py) and repair the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Parent rows recounted and locked per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the counts that are off',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        for counter in COUNTERS:
+            checked, fixed = self.reconcile(counter)
+            label = f'{counter.target._meta.label}.{counter.field}'
+            verb = 'off' if self.dry_run else 'repaired'
+            self.stdout.write(self.style.SUCCESS(f'{label}: {fixed} of {checked} {verb}'))
+
+    def reconcile(self, counter):
+        checked = fixed = 0
+        last = None
+        while True:
+            with transaction.atomic():
+                # Locked while recounted, so a concurrent F() update waits
+                # and then applies on top of the repaired value.
+                rows = counter.target._base_manager.select_for_update().order_by('pk')
+                if last is not None:
+                    rows = rows.filter(pk__gt=last)
+                stored = dict(rows.values_list('pk', counter.field)[:self.batch_size])
+                if not stored:
+                    break
+                actual = dict(
+                    counter.model._base_manager.filter(**{f'{counter.fk.attname}__in': list(stored)})
+                    .order_by().values(counter.fk.attname).annotate(n=Count('pk'))
+                    .values_list(counter.fk.attname, 'n')
+                )
+                wrong = {pk: actual.get(pk, 0) for pk, value in stored.items() if actual.get(pk, 0) != value}
+                if wrong and not self.dry_run:
+                    self.repair(counter, wrong)
+            checked += len(stored)
+            fixed += len(wrong)
+            last = max(stored)
+        return checked, fixed
+
+    def repair(self, counter, values):
+        by_value = {}
+        for pk, value in values.items():
+            by_value.setdefault(value, []).append(pk)
+        for value, pks in by_value.items():
+            counter.target._base_manager.filter(pk__in=pks).update(**{counter.field: value})
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api import deletion
+from api.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Carry out the pending (and stalled) background deletes of organizations and profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Related rows deleted or detached per transaction (default: DELETION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Resume the jobs that failed before as well',
+        )
+
+    def handle(self, *args, **options):
+        # Jobs left RUNNING by a worker that died are resumed along with the pending ones.
+        statuses = (Q(status=DeletionJob.PENDING)
+                    | Q(status=DeletionJob.RUNNING, heartbeat_at__lt=deletion.stale_before()))
+        if options['retry_failed']:
+            statuses |= Q(status=DeletionJob.FAILED)
+        done = failed = 0
+        for job in DeletionJob.objects.filter(statuses).select_related('content_type').order_by('pk'):
+            try:
+                if deletion.run(job, options['batch_size']) is None:
+                    continue
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{job.object_repr}: {error!r}')
+                continue
+            done += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Deleted {job.object_repr} ({job.processed} related rows)')
+        self.stdout.write(self.style.SUCCESS(f'Ran {done} deletion jobs, {failed} failed'))
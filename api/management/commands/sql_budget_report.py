@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import sqlbudget
+
+
+class Command(BaseCommand):
+    help = 'How often each SQL budget ran out (see api/sqlbudget.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Start counting again from zero',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"budget":<20} {"ms":>6} {"exceeded":>9}')
+        for name, count in sqlbudget.hits().items():
+            self.stdout.write(f'{name:<20} {settings.SQL_BUDGETS[name]:>6} {count:>9}')
+        if options['clear']:
+            sqlbudget.clear_hits()
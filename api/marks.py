@@ -0,0 +1,81 @@
+"""
+Follows writes to the marks in Stat rows - who (profile), what (event),
+when (date) and how good (performance) - and, once the transaction
+commits, refreshes what is derived from them: the event leaderboards
+(leaderboards.py) and the progression rollups (progression.py).
+
+A mark is identified as (profile id, event key, date). Saves and deletes
+report the mark they leave and the one they make; update() and
+bulk_update() touching a mark field report the marks of their rows before
+and after; bulk_create() those of the new rows.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from athletes.models import PARSED_FIELDS, PARSED_FROM, Stat
+
+from . import leaderboards, progression
+from .signals import post_bulk_write, pre_bulk_write
+
+# Stat fields that identify or rank a mark
+MARK_FIELDS = {'profile', 'profile_id', 'date', *PARSED_FROM, *PARSED_FIELDS}
+
+
+def marks_changed(marks, using=None):
+    marks = {mark for mark in marks if all(mark)}
+    leaderboards.refresh({(profile_id, event_key) for profile_id, event_key, _ in marks}, using)
+    progression.refresh(marks, using)
+
+
+def schedule(marks, using=None):
+    if any(all(mark) for mark in marks):
+        transaction.on_commit(lambda: marks_changed(marks, using), using=using)
+
+
+def stat_marks(pks, using=None):
+    return set(Stat._base_manager.using(using).filter(pk__in=pks).values_list('profile_id', 'event_key', 'date'))
+
+
+def moves_marks(action, fields):
+    return action in ('update', 'bulk_update') and (fields is None or bool(MARK_FIELDS & set(fields)))
+
+
+def mark(instance):
+    # Without touching a deferred field.
+    return tuple(instance.__dict__.get(name) for name in ('profile_id', 'event_key', 'date'))
+
+
+def remember_stat(sender, instance, **kwargs):
+    instance._mark = mark(instance)
+
+
+def stat_saved(sender, instance, using=None, **kwargs):
+    schedule({getattr(instance, '_mark', (None, None, None)), mark(instance)}, using)
+    instance._mark = mark(instance)
+
+
+def stat_deleted(sender, instance, using=None, **kwargs):
+    schedule({mark(instance)}, using)
+
+
+def stats_writing(sender, action, pks, fields=None, using=None, **kwargs):
+    # Deletes are seen row by row by stat_deleted.
+    if moves_marks(action, fields):
+        schedule(stat_marks(pks, using), using)
+
+
+def stats_written(sender, action, pks, objs=None, fields=None, using=None, **kwargs):
+    if action == 'bulk_create':
+        schedule({mark(obj) for obj in objs}, using)
+    elif moves_marks(action, fields):
+        # Read at commit time: update() reparses the marks after this.
+        transaction.on_commit(lambda: marks_changed(stat_marks(pks, using), using), using=using)
+
+
+def connect_signals():
+    uid = 'marks-stat'
+    post_init.connect(remember_stat, sender=Stat, dispatch_uid=f'{uid}-init')
+    post_save.connect(stat_saved, sender=Stat, dispatch_uid=f'{uid}-save')
+    post_delete.connect(stat_deleted, sender=Stat, dispatch_uid=f'{uid}-delete')
+    pre_bulk_write.connect(stats_writing, sender=Stat, dispatch_uid=f'{uid}-pre-bulk')
+    post_bulk_write.connect(stats_written, sender=Stat, dispatch_uid=f'{uid}-bulk')
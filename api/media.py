@@ -0,0 +1,135 @@
+"""
+Uploaded media and collected static files, delivered by the web server.
+
+Requests for /media/ and /static/ that reach Django (no front server
+location serves them directly) are checked here and the transfer is
+handed back to the web server, so no worker streams file bytes:
+
+* FILE_SENDFILE = 'x-sendfile' answers with an empty response carrying
+  ``X-Sendfile: <absolute path, percent-encoded>`` (Apache mod_xsendfile,
+  lighttpd);
+* FILE_SENDFILE = 'x-accel-redirect' answers with ``X-Accel-Redirect:
+  <MEDIA_ACCEL_PREFIX or STATIC_ACCEL_PREFIX><path>``, for an nginx
+  ``internal`` location aliased to MEDIA_ROOT or STATIC_ROOT;
+* without FILE_SENDFILE (runserver, or a host without either) the file is
+  streamed from Python as a last resort.
+
+Media files are public while the row holding them is (see MEDIA_FIELDS);
+files of hidden profiles and organizations, unpublished highlights and
+files no row refers to are only served to staff.
+
+Static files get the ``.br``/``.gz`` sibling collectstatic wrote for them
+(see api/staticfiles.py) when the client accepts it. Content-addressed
+names (``app.3f2a9c81d0b4.css``) are cached for a year as immutable,
+anything else for FILE_MAX_AGE seconds.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from athletes.models import Profile
+from home.models import Highlight
+from organizations.models import Organization
+
+from .middleware import parse_accept_encoding
+
+# upload_to directory -> (model, file field, rows whose file is public)
+MEDIA_FIELDS = {
+    'profile_picture/': (Profile, 'profile_picture', Q(hidden=False)),
+    'profile_banner/': (Profile, 'banner', Q(hidden=False)),
+    'org_logos/': (Organization, 'logo', Q(hidden=False)),
+    'highlight_images/': (Highlight, 'image', Q(published=True)),
+}
+
+# The 12 hex digits ManifestStaticFilesStorage puts before the extension.
+CONTENT_ADDRESSED = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Precompressed siblings, in server preference order
+SIBLINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def is_public(name):
+    """Whether anyone may fetch the media file ``name``."""
+    for directory, (model, field, visible) in MEDIA_FIELDS.items():
+        if name.startswith(directory):
+            return model._base_manager.filter(visible, **{field: name}).exists()
+    return False
+
+
+def offload(request, root, accel_prefix, name, encoding=None, content_type=None):
+    """A response delivering ``root``/``name``; 404 if there's no such file."""
+    try:
+        path = safe_join(root, name)
+    except ValueError:  # SuspiciousFileOperation: outside the root
+        raise Http404
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.FILE_SENDFILE == 'x-sendfile':
+        response = HttpResponse()
+        # Header values must be latin-1; mod_xsendfile unescapes the path.
+        response['X-Sendfile'] = quote(path)
+    elif settings.FILE_SENDFILE == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = quote(accel_prefix + name)
+    else:
+        response = FileResponse(open(path, 'rb'))
+        response['Content-Length'] = stat.st_size
+    response['Content-Type'] = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def cache_for(response, name, public):
+    if not public:
+        patch_cache_control(response, private=True, no_cache=True)
+    elif CONTENT_ADDRESSED.search(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.FILE_MAX_AGE)
+    return response
+
+
+def serve_media(request, path):
+    public = is_public(path)
+    if not public and not request.user.is_staff:
+        raise Http404
+    response = offload(request, settings.MEDIA_ROOT, settings.MEDIA_ACCEL_PREFIX, path)
+    return cache_for(response, path, public)
+
+
+def serve_static(request, path):
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    content_type = mimetypes.guess_type(path)[0]
+    response = None
+    for encoding, suffix in SIBLINGS:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            try:
+                response = offload(request, settings.STATIC_ROOT, settings.STATIC_ACCEL_PREFIX, path + suffix,
+                                   encoding, content_type)
+                break
+            except Http404:
+                continue
+    if response is None:
+        response = offload(request, settings.STATIC_ROOT, settings.STATIC_ACCEL_PREFIX, path)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return cache_for(response, path, public=True)
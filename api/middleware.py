@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
+
+from .edgecache import purge_batch
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:  # pragma: no cover - optional dependency
+        zstd = None
+
+
+# Media that is already compressed gains nothing from another pass.
+INCOMPRESSIBLE_TYPES = (
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif',
+    'video/', 'audio/', 'font/woff', 'font/woff2',
+    'application/zip', 'application/gzip', 'application/x-gzip',
+    'application/zstd', 'application/x-brotli', 'application/pdf',
+    'application/octet-stream',
+)
+
+
+def _gzip(content):
+    # Django's helper pads the header with random bytes to mitigate BREACH.
+    return compress_string(content, max_random_bytes=100)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=5)
+
+
+def _zstd(content):
+    # Both compression.zstd and the zstandard package expose compress().
+    return zstd.compress(content, level=3)
+
+
+def available_codecs():
+    """
+    Encodings we can produce, in server preference order (best ratio first
+    when the client weighs them equally).
+    """
+    codecs = []
+    if zstd is not None:
+        codecs.append(('zstd', _zstd))
+    if brotli is not None:
+        codecs.append(('br', _brotli))
+    codecs.append(('gzip', _gzip))
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """Return a ``{coding: qvalue}`` map for an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, codecs=None):
+    """Pick the best (name, compress) pair the client accepts, or None."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for name, compress in codecs or available_codecs():
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = (name, compress), q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with zstd, brotli or gzip depending on what the
+    client accepts and which codecs are installed.
+
+    Only bodies of at least ``RESPONSE_COMPRESSION_MIN_SIZE`` bytes are
+    compressed; streaming responses and media that is already compressed
+    (images, video, archives...) are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+        self.codecs = available_codecs()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return response
+
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        codec = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        if codec is None:
+            return response
+        name, compress = codec
+
+        compressed_content = compress(response.content)
+        # Return the compressed content only if it's actually shorter.
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        # A strong ETag no longer matches the encoded representation.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = name
+        return response
+
+
+class EdgeCacheMiddleware:
+    """
+    Let an edge cache keep public responses, and tell it when to drop them.
+
+    Responses a view tagged with surrogate keys (see api/edgecache.py) are
+    marked cacheable by shared caches when they answer an anonymous GET
+    successfully; otherwise they are marked private and the keys removed.
+    Purges triggered while handling the request are sent as one batch.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with purge_batch():
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not response.has_header('Surrogate-Key'):
+            return response
+
+        user = getattr(request, 'user', None)
+        anonymous = not (user and user.is_authenticated) and 'HTTP_AUTHORIZATION' not in request.META
+        if anonymous and request.method in ('GET', 'HEAD') and response.status_code == 200:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=getattr(settings, 'EDGE_CACHE_BROWSER_MAX_AGE', 60),
+                s_maxage=getattr(settings, 'EDGE_CACHE_MAX_AGE', 60 * 60 * 24),
+            )
+            patch_vary_headers(response, ('Authorization',))
+        else:
+            del response['Surrogate-Key']
+            patch_cache_control(response, private=True)
+        return response
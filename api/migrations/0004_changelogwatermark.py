@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('truncated_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
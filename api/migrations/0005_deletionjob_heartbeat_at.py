@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_heartbeats(apps, schema_editor):
+    # Jobs running from before: their last sign of life is their start.
+    DeletionJob = apps.get_model('api', 'DeletionJob')
+    DeletionJob.objects.using(schema_editor.connection.alias).filter(status='running').update(
+        heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_changelogwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats, migrations.RunPython.noop),
+    ]
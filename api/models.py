@@ -1,3 +1,97 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
-# Create your models here.
+
+class ChangeLogEntry(models.Model):
+    """
+    One row per write to an object the mobile clients sync (see
+    api/changelog.py). The id doubles as the sync cursor. Entries only say
+    that an object changed; the sync endpoint decides between upsert and
+    tombstone by looking the object up when it is asked.
+    """
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['kind', 'object_id'])]
+
+    def __str__(self):
+        return f'#{self.pk} {self.kind} {self.object_id}'
+
+
+class ChangeLogWatermark(models.Model):
+    """
+    The single row recording how far ``compact_changelog`` has dropped
+    expired entries: the log is complete only after ``truncated_through``,
+    so older sync cursors must reset. Dropping superseded entries doesn't
+    move it, as the sync endpoint serves current state anyway.
+    """
+    truncated_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'Truncated through #{self.truncated_through}'
+
+
+class DeletionJob(models.Model):
+    """
+    A delete handed to the background worker (see api/deletion.py). The
+    object is hidden as soon as the job is created; ``manage.py
+    run_deletion_jobs`` then clears its related rows in chunks and deletes
+    it, recording its progress here.
+    """
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING, db_index=True)
+    # The relation being cleared, and the related rows cleared so far
+    step = models.CharField(max_length=100, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Stamped with every batch: a running job that stops beating lost its worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['content_type', 'object_id'])]
+
+    def __str__(self):
+        return f'Delete {self.object_repr} ({self.status})'
+
+
+class RequestProfile(models.Model):
+    """
+    One request run under cProfile by the profiler middleware (see
+    api/profiling.py). Only the newest PROFILER_KEEP are kept.
+    """
+    STAFF, SAMPLED = 'staff', 'sampled'
+    TRIGGERS = [(STAFF, 'Asked for by staff'), (SAMPLED, 'Sampled')]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGERS)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='+')
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    # The slowest statements: [{"sql": ..., "ms": ..., "alias": ...}]
+    sql = models.JSONField(default=list)
+    # The functions with the most cumulative time, as pstats prints them
+    summary = models.TextField()
+    # marshal'ed pstats, as cProfile's dump_stats() writes them
+    stats = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
@@ -0,0 +1,184 @@
+"""
+Catches N+1 queries: the same SELECT, with different parameters, run over
+and over while answering one request - typically a related object read
+in a loop (``athlete.organization``, ``user.role()``, a permission
+following ``obj.organization.owner``) that select_related() or
+prefetch_related() should have fetched with the list.
+
+``NPlusOneMiddleware`` fingerprints every statement of a request (string
+and number literals and the length of ``IN (...)`` lists don't count)
+and, when one shape runs more than NPLUSONE_THRESHOLD times, records the
+application frames of the access that ran it. NPLUSONE_MODE says what
+happens then:
+
+* ``'raise'``: ``NPlusOneError`` is raised from that access (the test
+  runner, api/testrunner.py, turns this on), so the test fails with the
+  stack pointing at the loop;
+* ``'log'``: a warning on the ``api.nplusone`` logger the first time a
+  view is seen running the statement, and a running count per view in
+  the default cache, listed by ``manage.py nplusone_report``;
+* ``'off'``: nothing is wrapped.
+
+Loops that are meant to run one query per item (and are bounded) go in
+``with allow():``.
+"""
+import functools
+import hashlib
+import logging
+import re
+import threading
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPORT_PREFIX = 'nplusone:'
+REPORT_INDEX = 'nplusone:index'
+STACK_FRAMES = 8
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+]
+_SKIP_DIRS = ('site-packages', 'dist-packages')
+_local = threading.local()
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """The shape of ``sql``: what stays the same from one item of a loop to the next."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def app_frames(stack):
+    """The frames of ``stack`` in our own code, and the library call the innermost one made."""
+    root = str(Path(settings.BASE_DIR).resolve())
+    frames, via = [], None
+    for frame in stack:
+        ours = frame.filename.startswith(root) and not any(d in frame.filename for d in _SKIP_DIRS)
+        if ours and frame.filename != __file__:
+            frames.append(frame)
+            via = None
+        elif frames and via is None:
+            via = frame
+    lines = [f'{Path(f.filename).relative_to(root)}:{f.lineno} in {f.name}: {f.line}' for f in frames[-STACK_FRAMES:]]
+    if via is not None:
+        lines.append(f'-> {Path(via.filename).name}:{via.lineno} in {via.name}')
+    return lines
+
+
+@contextmanager
+def allow():
+    """Don't count the statements run inside: a loop that is meant to run one query per item."""
+    _local.allowed = getattr(_local, 'allowed', 0) + 1
+    try:
+        yield
+    finally:
+        _local.allowed -= 1
+
+
+class Detector:
+    """An execute_wrapper counting the statement shapes of one request."""
+
+    def __init__(self, view=None, threshold=None, mode=None):
+        self.view = view
+        self.threshold = settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+        self.mode = settings.NPLUSONE_MODE if mode is None else mode
+        self.counts = Counter()
+        # fingerprint -> {'sql', 'stack'} of the statements over the threshold
+        self.found = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and not getattr(_local, 'allowed', 0) and sql.lstrip()[:6].upper() == 'SELECT':
+            self.check(sql)
+        return execute(sql, params, many, context)
+
+    def check(self, sql):
+        shape = fingerprint(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] != self.threshold + 1:
+            return
+        self.found[shape] = {'sql': sql, 'stack': app_frames(traceback.extract_stack()[:-2])}
+        if self.mode == 'raise':
+            raise NPlusOneError(self.message(shape))
+
+    def view_name(self):
+        return self.view() if callable(self.view) else self.view
+
+    def message(self, shape):
+        found = self.found[shape]
+        return (f'N+1 queries in {self.view_name() or "?"}: this statement ran more than {self.threshold} times\n'
+                f'  {found["sql"]}\n' + ''.join(f'  {line}\n' for line in found['stack']))
+
+    def report(self):
+        """Log the statements over the threshold and add them to the per-view counts."""
+        view = self.view_name() or '?'
+        for shape, found in self.found.items():
+            key = REPORT_PREFIX + hashlib.md5(f'{view}\n{shape}'.encode()).hexdigest()
+            entry = cache.get(key)
+            first = entry is None
+            if first:
+                entry = {'view': view, 'sql': shape, 'requests': 0, 'most': 0, 'stack': found['stack']}
+            entry['requests'] += 1
+            entry['most'] = max(entry['most'], self.counts[shape])
+            entry['last_seen'] = timezone.now()
+            cache.set(key, entry, None)
+            if first:
+                index = cache.get(REPORT_INDEX) or []
+                if key not in index:
+                    cache.set(REPORT_INDEX, [*index, key], None)
+                logger.warning(self.message(shape))
+
+
+@contextmanager
+def detect(view=None, threshold=None, mode=None):
+    """Count the statements run inside on every database; yields the ``Detector``."""
+    detector = Detector(view, threshold, mode)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+
+
+def reports():
+    """The per-view counts ``report()`` has gathered, most requests first."""
+    keys = cache.get(REPORT_INDEX) or []
+    return sorted(cache.get_many(keys).values(), key=lambda entry: (-entry['requests'], entry['view']))
+
+
+def clear_reports():
+    cache.delete_many([*(cache.get(REPORT_INDEX) or []), REPORT_INDEX])
+
+
+def request_view(request):
+    match = getattr(request, 'resolver_match', None)
+    return f'{request.method} {match.view_name}' if match is not None else None
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.NPLUSONE_MODE == 'off':
+            return self.get_response(request)
+        with detect(view=lambda: request_view(request)) as detector:
+            response = self.get_response(request)
+        if detector.found:
+            detector.report()
+        return response
@@ -0,0 +1,149 @@
+"""
+Runs single requests under cProfile, with their SQL timed, and keeps the
+result in ``RequestProfile`` (listed in the admin).
+
+A request is profiled when:
+
+* staff ask for it with an ``X-Profile: 1`` header or ``?_profile=1``
+  (session or token authentication); the response then carries
+  ``X-Profile-Id``;
+* it is picked by sampling: PROFILER_SAMPLE_RATE of all requests are
+  profiled and kept when they took at least PROFILER_SLOW_MS, so the
+  profiler can stay on in production at a small cost.
+
+Profiles are stored as marshal'ed pstats (what ``cProfile``'s
+``dump_stats()`` writes); the admin serves them as ``.prof`` files for
+snakeviz, tuna or flameprof (``flameprof request.prof > flame.svg``).
+Only the newest PROFILER_KEEP profiles are kept.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FUNCTIONS = 40
+SLOWEST_STATEMENTS = 20
+
+
+class SQLTimer:
+    """An execute_wrapper (see Django's "database instrumentation") timing every statement."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append((time.perf_counter() - start, sql, self.alias))
+
+
+def token_user(request):
+    """The user of a DRF ``Authorization: Token <key>`` header, if any."""
+    from rest_framework.authtoken.models import Token
+
+    scheme, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'token' or not key:
+        return None
+    token = Token.objects.select_related('user').filter(key=key.strip()).first()
+    return token.user if token else None
+
+
+def requesting_staff(request):
+    """The staff member asking for this request to be profiled, or None."""
+    if request.headers.get('X-Profile') != '1' and request.GET.get('_profile') != '1':
+        return None
+    user = active_user(request) or token_user(request)
+    return user if user is not None and user.is_staff else None
+
+
+def active_user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def summary(stats):
+    out = io.StringIO()
+    pstats.Stats(stats, stream=out).sort_stats('cumulative').print_stats(SUMMARY_FUNCTIONS)
+    return out.getvalue()
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        staff = requesting_staff(request)
+        sampled = staff is None and random.random() < settings.PROFILER_SAMPLE_RATE
+        if staff is None and not sampled:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        timers = [SQLTimer(connection.alias) for connection in connections.all()]
+        wrappers = [connection.execute_wrapper(timer) for connection, timer in zip(connections.all(), timers)]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this thread.
+            profiler = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            duration = time.perf_counter() - start
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+        if profiler is None or (sampled and duration * 1000 < settings.PROFILER_SLOW_MS):
+            return response
+
+        statements = sorted((statement for timer in timers for statement in timer.statements), reverse=True)
+        try:
+            profile = self.store(request, response, staff, profiler, duration, statements)
+        except DatabaseError:
+            logger.exception('Could not store the profile of %s %s', request.method, request.path)
+            return response
+        if staff is not None:
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    def store(self, request, response, staff, profiler, duration, statements):
+        from .models import RequestProfile
+
+        profiler.create_stats()
+        # Before summary(): pstats.Stats() empties the profiler it reads.
+        dumped = marshal.dumps(profiler.stats)
+        profiles = RequestProfile.objects.using(router.db_for_write(RequestProfile))
+        profile = profiles.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status=response.status_code,
+            trigger=RequestProfile.SAMPLED if staff is None else RequestProfile.STAFF,
+            user=staff or active_user(request),
+            duration_ms=duration * 1000,
+            sql_count=len(statements),
+            sql_ms=sum(seconds for seconds, _, _ in statements) * 1000,
+            sql=[{'sql': sql, 'ms': seconds * 1000, 'alias': alias}
+                 for seconds, sql, alias in statements[:SLOWEST_STATEMENTS]],
+            summary=summary(profiler),
+            stats=dumped,
+        )
+        # Keep a ring of the newest ones.
+        keep = settings.PROFILER_KEEP
+        oldest_kept = list(profiles.order_by('-pk').values_list('pk', flat=True)[keep - 1:keep])
+        if oldest_kept:
+            profiles.filter(pk__lt=oldest_kept[0]).delete()
+        return profile
@@ -0,0 +1,162 @@
+"""
+Per-athlete progression series, rolled up in ``athletes.ProgressionPoint``.
+
+Each point is an athlete's best mark in an event on one day. Points are
+recomputed for the (profile, event, day) marks a stat write touches once
+the transaction commits (see marks.py), so reading a series never goes
+through the raw Stat rows or their free-text performances.
+
+Long series are downsampled before they are sent: the points are split
+into equal buckets and the best mark of each is kept, along with the most
+recent one. Personal and season bests are taken from the full series.
+The grouping runs on NumPy arrays when NumPy is installed and falls back
+to plain Python otherwise. NumPy is imported on first use rather than
+with this module, which every process loads at startup.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from athletes.models import ProgressionPoint, Stat
+from athletes.performance import lower_is_better
+
+_NOT_LOADED = object()
+np = _NOT_LOADED
+
+
+def numpy():
+    """The numpy module, or None when it isn't installed."""
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy as module
+        except ImportError:  # pragma: no cover - optional dependency
+            module = None
+        np = module
+    return np
+
+
+# --- Rollup ---
+
+def refresh_days(profile_id, event_key, dates, using=None):
+    """Recompute one athlete's points in an event on ``dates``."""
+    lower = lower_is_better(event_key)
+    points = ProgressionPoint.objects.using(using).filter(profile_id=profile_id, event_key=event_key)
+    stats = (Stat._base_manager.using(using)
+             .filter(profile_id=profile_id, event_key=event_key, date__in=dates, performance_value__isnull=False)
+             .order_by('date', 'performance_value' if lower else '-performance_value', 'pk')
+             .values_list('date', 'pk', 'performance_value'))
+    with transaction.atomic(using=using):
+        existing = {point.date: point for point in points.select_for_update().filter(date__in=dates)}
+        best = {}
+        counts = Counter()
+        for date, stat_id, value in stats:
+            best.setdefault(date, (stat_id, value))
+            counts[date] += 1
+
+        points.filter(pk__in=[point.pk for date, point in existing.items() if date not in best]).delete()
+        changed = []
+        for date, (stat_id, value) in best.items():
+            point = existing.get(date)
+            if point is None:
+                point = ProgressionPoint(profile_id=profile_id, event_key=event_key, date=date)
+            point.stat_id, point.value, point.lower_is_better, point.stats = stat_id, value, lower, counts[date]
+            changed.append(point)
+        ProgressionPoint.objects.using(using).bulk_create([point for point in changed if point.pk is None])
+        ProgressionPoint.objects.using(using).bulk_update(
+            [point for point in changed if point.pk is not None], ['stat', 'value', 'lower_is_better', 'stats'],
+        )
+
+
+def refresh(marks, using=None):
+    """Refresh the points of the given (profile id, event key, date) marks."""
+    days = defaultdict(set)
+    for profile_id, event_key, date in marks:
+        days[profile_id, event_key].add(date)
+    for (profile_id, event_key), dates in days.items():
+        refresh_days(profile_id, event_key, dates, using)
+
+
+# --- Series ---
+
+def best_per_group(groups, values, lower):
+    """Index of the best value in each group, in order. Ties go to the first one."""
+    np = numpy()
+    if np is None:
+        best = {}
+        for index, (group, value) in enumerate(zip(groups, values)):
+            current = best.get(group)
+            if current is None or (value < values[current] if lower else value > values[current]):
+                best[group] = index
+        return sorted(best.values())
+
+    groups = np.asarray(groups)
+    keys = np.asarray(values, dtype=float)
+    if not lower:
+        keys = -keys
+    # By group, then value, then position.
+    order = np.lexsort((np.arange(len(keys)), keys, groups))
+    ordered = groups[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    return np.sort(order[first]).tolist()
+
+
+def downsample(values, lower, max_points):
+    """Indexes of at most ``max_points`` points worth keeping from ``values``."""
+    count = len(values)
+    if count <= max_points:
+        return list(range(count))
+    np = numpy()
+    # max_points - 1 equal buckets, and room for the most recent point.
+    buckets = (np.arange(count) * (max_points - 1) // count if np is not None
+               else [index * (max_points - 1) // count for index in range(count)])
+    keep = best_per_group(buckets, values, lower)
+    if keep[-1] != count - 1:
+        keep.append(count - 1)
+    return keep
+
+
+def season(date):
+    """The season ``date`` falls in: '2024-25', or '2024' when seasons are calendar years."""
+    start_month = settings.PROGRESSION_SEASON_START_MONTH
+    start = date.year if date.month >= start_month else date.year - 1
+    return str(start) if start_month == 1 else f'{start}-{str(start + 1)[-2:]}'
+
+
+def series(profile_id, event_key=None, max_points=None):
+    """The progression of an athlete in every event (or just ``event_key``)."""
+    max_points = settings.PROGRESSION_MAX_POINTS if max_points is None else max_points
+    if max_points < 2:
+        # The first and the latest point are always kept.
+        raise ValueError('max_points must be at least 2.')
+    points = ProgressionPoint.objects.filter(profile_id=profile_id)
+    if event_key is not None:
+        points = points.filter(event_key=event_key)
+
+    events = defaultdict(list)
+    for key, date, value, lower in (points.order_by('event_key', 'date')
+                                    .values_list('event_key', 'date', 'value', 'lower_is_better')):
+        events[key].append((date, value, lower))
+
+    result = []
+    for key, rows in events.items():
+        dates = [date for date, _, _ in rows]
+        values = [value for _, value, _ in rows]
+        lower = rows[-1][2]
+        [personal_best] = best_per_group([0] * len(values), values, lower)
+        seasons = [season(date) for date in dates]
+        result.append({
+            'event': key,
+            'lower_is_better': lower,
+            'personal_best': {'date': dates[personal_best], 'value': values[personal_best]},
+            'season_bests': [
+                {'season': seasons[index], 'date': dates[index], 'value': values[index]}
+                for index in best_per_group(seasons, values, lower)
+            ],
+            'total_points': len(rows),
+            'points': [{'date': dates[index], 'value': values[index]}
+                       for index in downsample(values, lower, max_points)],
+        })
+    return result
@@ -0,0 +1,147 @@
+"""
+Opt-in queryset caching for small, read-mostly tables.
+
+A model opts in by using ``CachedManager`` as its default manager. Any
+query built from that manager whose SQL only touches opted-in tables is
+cached under a key made of the normalized SQL, its parameters and the
+current version of every table involved. Writing to a table - save(),
+delete(), QuerySet.update(), bulk_update(), bulk_create() - bumps that
+table's version once the transaction commits, so every cached query
+reading it is invalidated at once and no stale entry can ever be served.
+
+A hit costs one cache round trip for the versions and one for the rows;
+the database is not touched. Misses are read from the primary, so a lagging
+replica can't file old rows under a new version. Queries inside a
+transaction, with select_for_update() or prefetch_related() always go to
+the database.
+
+Settings: QUERYSET_CACHE_ENABLED (kill switch), QUERYSET_CACHE_TIMEOUT,
+QUERYSET_CACHE_ALIAS (which CACHES entry to use). The cache must be shared
+between worker processes for invalidation to reach all of them.
+"""
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+from django.db.models.signals import post_delete, post_save
+
+from config.db.router import primary_alias
+
+from .querysets import BulkSignalQuerySet
+from .signals import post_bulk_write
+from .versioning import bump_versions, get_versions
+
+MISSING = object()
+
+_cached_tables = None
+
+
+def get_cache():
+    return caches[getattr(settings, 'QUERYSET_CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    return getattr(settings, 'QUERYSET_CACHE_ENABLED', True)
+
+
+def model_tables(model):
+    """The table of ``model`` and of every concrete parent it is stored in."""
+    return [model._meta.db_table] + [parent._meta.db_table for parent in model._meta.get_parent_list()]
+
+
+def cached_models():
+    return [model for model in apps.get_models()
+            if isinstance(model._default_manager, CachedManager)]
+
+
+def cached_tables():
+    global _cached_tables
+    if _cached_tables is None:
+        _cached_tables = {table for model in cached_models() for table in model_tables(model)}
+    return _cached_tables
+
+
+def version_key(table):
+    return f'qc:version:{table}'
+
+
+def bump_tables(tables, using=None):
+    """Invalidate every cached query reading ``tables`` once the transaction commits."""
+    bump_versions(get_cache(), [version_key(table) for table in tables], using)
+
+
+def invalidate_model(model, using=None):
+    bump_tables(model_tables(model), using=using)
+
+
+def referenced_tables(sql, connection):
+    """All known tables whose quoted name appears in ``sql``."""
+    tables = set()
+    for model in apps.get_models(include_auto_created=True):
+        table = model._meta.db_table
+        if connection.ops.quote_name(table) in sql:
+            tables.add(table)
+    return tables
+
+
+class CachedQuerySet(BulkSignalQuerySet):
+    def _cache_key(self):
+        if not is_enabled() or self._prefetch_related_lookups or self.query.select_for_update:
+            return None
+        using = primary_alias()
+        connection = connections[using]
+        if connection.in_atomic_block:
+            return None
+        try:
+            sql, params = self.query.get_compiler(using=using).as_sql()
+        except EmptyResultSet:
+            return None
+
+        tables = referenced_tables(sql, connection)
+        if not tables or not tables <= cached_tables():
+            return None
+
+        keys = [version_key(table) for table in sorted(tables)]
+        versions = get_versions(get_cache(), keys)
+        signature = '|'.join([
+            self._iterable_class.__qualname__,
+            ','.join(self._fields or ()),
+            ' '.join(sql.split()),
+            repr(params),
+            *(versions.get(key, '') for key in keys),
+        ])
+        return 'qc:query:' + hashlib.sha256(signature.encode()).hexdigest()
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            key = self._cache_key()
+            if key is not None:
+                cache = get_cache()
+                result = cache.get(key, MISSING)
+                if result is MISSING:
+                    self._db = primary_alias()
+                    super()._fetch_all()
+                    cache.set(key, self._result_cache, getattr(settings, 'QUERYSET_CACHE_TIMEOUT', 3600))
+                else:
+                    self._result_cache = result
+                return
+        super()._fetch_all()
+
+
+class CachedManager(models.Manager.from_queryset(CachedQuerySet)):
+    pass
+
+
+def invalidate_table(sender, using=None, **kwargs):
+    invalidate_model(sender, using)
+
+
+def connect_signals():
+    for model in cached_models():
+        post_save.connect(invalidate_table, sender=model, dispatch_uid=f'querycache-save-{model._meta.label}')
+        post_delete.connect(invalidate_table, sender=model, dispatch_uid=f'querycache-delete-{model._meta.label}')
+        # update(), bulk_update(), bulk_create() and queryset deletes
+        post_bulk_write.connect(invalidate_table, sender=model, dispatch_uid=f'querycache-bulk-{model._meta.label}')
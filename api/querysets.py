@@ -0,0 +1,69 @@
+import contextvars
+
+from django.db import models
+
+from .signals import post_bulk_write, pre_bulk_write
+
+# Set while bulk_update() runs its per-batch update() calls, which would
+# otherwise each send their own signals.
+_inside_bulk_update = contextvars.ContextVar('inside_bulk_update', default=False)
+
+
+class BulkSignalQuerySet(models.QuerySet):
+    """
+    Sends pre_bulk_write/post_bulk_write (see api/signals.py) for writes
+    that bypass the model signals. The affected primary keys are only
+    looked up when somebody listens for this model.
+    """
+
+    def _has_bulk_listeners(self):
+        return pre_bulk_write.has_listeners(self.model) or post_bulk_write.has_listeners(self.model)
+
+    def _send_bulk(self, signal, action, pks, objs=None, fields=None):
+        signal.send(sender=self.model, action=action, pks=pks, objs=objs, fields=fields, using=self.db)
+
+    def _affected_pks(self):
+        self._for_write = True
+        return list(self.values_list('pk', flat=True))
+
+    def update(self, **kwargs):
+        if _inside_bulk_update.get() or not self._has_bulk_listeners():
+            return super().update(**kwargs)
+        pks = self._affected_pks()
+        fields = list(kwargs)
+        self._send_bulk(pre_bulk_write, 'update', pks, fields=fields)
+        rows = super().update(**kwargs)
+        self._send_bulk(post_bulk_write, 'update', pks, fields=fields)
+        return rows
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        fields = list(fields)
+        self._for_write = True
+        self._send_bulk(pre_bulk_write, 'bulk_update', pks, objs, fields)
+        token = _inside_bulk_update.set(True)
+        try:
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        finally:
+            _inside_bulk_update.reset(token)
+        self._send_bulk(post_bulk_write, 'bulk_update', pks, objs, fields)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self._send_bulk(post_bulk_write, 'bulk_create', [obj.pk for obj in objs], objs)
+        return objs
+
+    def delete(self):
+        if not self._has_bulk_listeners():
+            return super().delete()
+        pks = self._affected_pks()
+        self._send_bulk(pre_bulk_write, 'delete', pks)
+        result = super().delete()
+        self._send_bulk(post_bulk_write, 'delete', pks)
+        return result
+
+
+class BulkSignalManager(models.Manager.from_queryset(BulkSignalQuerySet)):
+    pass
@@ -0,0 +1,65 @@
+import math
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+
+
+def has_non_finite(data):
+    """Whether ``data`` holds a NaN or an infinity, in any dict or list."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson.
+
+    Produces the same bytes as the stock renderer for compact output
+    (UTF-8, no whitespace, \\u2028/\\u2029 escaped). Anything orjson can't
+    handle natively (datetimes, Decimals, lazy strings...) is handed to
+    DRF's own JSONEncoder so the formatting rules stay identical.
+    Falls back to the stdlib renderer when orjson isn't installed, when
+    pretty printing is requested or when the payload needs ASCII escaping.
+    orjson writes NaN and infinities as ``null``; payloads holding them go
+    to the stdlib renderer too, which refuses them (``strict``) as DRF does.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits; let the stdlib have a go.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Non-finite floats come out as null; only then is the data walked.
+        if b'null' in ret and has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict javascript subset escaping as JSONRenderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
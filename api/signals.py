@@ -0,0 +1,31 @@
+"""
+Signals for writes that never go through Model.save() or Model.delete().
+
+QuerySet.update(), bulk_update() and bulk_create() send no post_save, and
+QuerySet.delete() only sends post_delete when it can't take the fast path.
+Models whose manager is built on ``api.querysets.BulkSignalQuerySet`` send
+these instead, so caches and derived data can follow every write.
+
+Arguments sent with both signals:
+
+``sender``
+    The model class the queryset belongs to.
+``action``
+    'update', 'bulk_update', 'bulk_create' or 'delete'.
+``pks``
+    Primary keys of the affected rows. For bulk_create on backends that
+    don't return ids some of them may be None.
+``objs``
+    The instances passed to bulk_create()/bulk_update(), otherwise None.
+``fields``
+    The field names written by update()/bulk_update(), otherwise None.
+``using``
+    The database alias written to.
+
+pre_bulk_write is sent before update() and delete() run (while the rows
+still hold their old values); post_bulk_write after every bulk write.
+"""
+from django.dispatch import Signal
+
+pre_bulk_write = Signal()
+post_bulk_write = Signal()
@@ -0,0 +1,137 @@
+"""
+Time budgets for the statements of expensive reads.
+
+``with limit('search'):`` gives the statements run inside, all together,
+SQL_BUDGETS['search'] milliseconds; a statement still running when the
+budget is spent is interrupted by the database:
+
+* on MySQL each SELECT carries a ``MAX_EXECUTION_TIME`` optimizer hint
+  with what is left of the budget (MySQL stops the statement with error
+  3024);
+* on SQLite a progress handler interrupts the statement once the budget
+  is spent.
+
+Either way ``SQLBudgetExceeded`` is raised out of the block, the hit is
+logged and counted (``hits()``, ``manage.py sql_budget_report``), and the
+view answers with something cheaper - a cached, simpler or partial
+result - marked by ``degraded()``. Budgets not in SQL_BUDGETS don't limit
+anything.
+"""
+import logging
+import re
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connections
+from django.utils.cache import add_never_cache_headers
+
+logger = logging.getLogger(__name__)
+
+HITS_PREFIX = 'sqlbudget:'
+# MySQL's "maximum statement execution time exceeded"
+ER_QUERY_TIMEOUT = 3024
+# SQLite virtual machine instructions between two looks at the clock
+SQLITE_PROGRESS_STEPS = 1000
+
+_SELECT = re.compile(r'^(\(*)SELECT ', re.IGNORECASE)
+
+
+class SQLBudgetExceeded(DatabaseError):
+    pass
+
+
+class Budget:
+    """An execute_wrapper giving the statements what is left of ``ms`` milliseconds."""
+
+    def __init__(self, name, ms):
+        self.name = name
+        self.ms = ms
+        self.deadline = time.monotonic() + ms / 1000
+
+    def remaining_ms(self):
+        return (self.deadline - time.monotonic()) * 1000
+
+    def expired(self):
+        return time.monotonic() >= self.deadline
+
+    def interrupted(self, error):
+        """Whether ``error`` is the database stopping a statement over this budget."""
+        code = error.args[0] if error.args else None
+        return code == ER_QUERY_TIMEOUT or self.expired()
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.expired():
+            raise SQLBudgetExceeded(f'SQL budget {self.name!r} ({self.ms} ms) spent')
+        if context['connection'].vendor == 'mysql' and not many:
+            hint = f'SELECT /*+ MAX_EXECUTION_TIME({max(1, int(self.remaining_ms()))}) */ '
+            sql = _SELECT.sub(lambda match: match[1] + hint, sql, count=1)
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def _sqlite_interrupt(connection, budget):
+    connection.ensure_connection()
+    # A non-zero return interrupts the running statement.
+    connection.connection.set_progress_handler(budget.expired, SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        if connection.connection is not None:
+            connection.connection.set_progress_handler(None, 0)
+
+
+@contextmanager
+def limit(name):
+    """Run the block's statements under the budget ``name``; yields the ``Budget`` (or None)."""
+    ms = settings.SQL_BUDGETS.get(name)
+    if ms is None:
+        yield None
+        return
+    budget = Budget(name, ms)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(budget))
+                if connection.vendor == 'sqlite':
+                    stack.enter_context(_sqlite_interrupt(connection, budget))
+            yield budget
+    except SQLBudgetExceeded:
+        record_hit(name)
+        raise
+    except OperationalError as error:
+        # Also raised while fetching rows, outside the execute_wrapper.
+        if not budget.interrupted(error):
+            raise
+        record_hit(name)
+        raise SQLBudgetExceeded(f'SQL budget {name!r} ({ms} ms) spent') from error
+
+
+def record_hit(name):
+    logger.warning('SQL budget %r (%s ms) exceeded', name, settings.SQL_BUDGETS[name])
+    key = HITS_PREFIX + name
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, 1, None)
+
+
+def hits():
+    """{budget name: times it was exceeded} for every budget in SQL_BUDGETS."""
+    counts = cache.get_many([HITS_PREFIX + name for name in settings.SQL_BUDGETS])
+    return {name: counts.get(HITS_PREFIX + name, 0) for name in settings.SQL_BUDGETS}
+
+
+def clear_hits():
+    cache.delete_many([HITS_PREFIX + name for name in settings.SQL_BUDGETS])
+
+
+def degraded(response, name):
+    """Mark ``response`` as the cheaper answer given when the budget ``name`` ran out."""
+    response['X-SQL-Budget'] = f'{name}; exceeded'
+    # Neither the edge nor browsers should keep it in place of the full answer.
+    add_never_cache_headers(response)
+    return response
@@ -0,0 +1,71 @@
+"""
+Static files storage for ``collectstatic``: hashed file names (as
+ManifestStaticFilesStorage) with ``.gz`` and, when brotli is installed,
+``.br`` siblings written next to every text asset, so neither the web
+server nor api/media.py ever compresses a static file on the fly.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+
+
+def _gzip(content):
+    # mtime=0 keeps the output the same from one collectstatic to the next.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=11)
+
+
+def compressors():
+    codecs = [('.gz', _gzip)]
+    if brotli is not None:
+        codecs.append(('.br', _brotli))
+    return codecs
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected yet (a fresh checkout, the test runner): the
+            # plain name is all there is.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if dry_run or isinstance(processed, Exception) or not hashed_name:
+                continue
+            for target in (name, hashed_name):
+                if target not in compressed and target.endswith(COMPRESSIBLE_EXTENSIONS):
+                    compressed.add(target)
+                    self.compress(target)
+
+    def compress(self, name):
+        """Write the siblings of ``name`` that come out smaller than it."""
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < settings.STATIC_COMPRESS_MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            data = compress(content)
+            if len(data) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Django's test runner, with N+1 queries (api/nplusone.py) failing the
+    test that runs them, and throttling buckets (api/throttling.py) kept in
+    memory rather than in the table the running site uses.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.NPLUSONE_MODE = 'raise'
+        settings.THROTTLE_STORE = 'api.throttling.LocMemBucketStore'
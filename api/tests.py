@@ -1,3 +1,1859 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import multiprocessing
+import os
+import pstats
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import quote, unquote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api import deletion, nplusone, progression, sqlbudget, throttling
+from api.edgecache import purge_batch
+from api.middleware import CompressionMiddleware, negotiate_encoding
+from api.models import ChangeLogEntry, DeletionJob, RequestProfile
+from api.renderers import FastJSONRenderer
+from api.staticfiles import CompressedManifestStaticFilesStorage
+from api.v1.compiled import (compiled_athletes, compiled_organizations,
+                             compiled_profiles, compiled_schools)
+from api.v1.fragments import cached_profiles
+from api.v1.serializers import (AthleteSerializer, OrganizationSerializer,
+                                ProfileSerializer, SchoolSerializer)
+from athletes.models import (Achievement, Athlete, LeaderboardEntry, Person, Profile, ProgressionPoint, Stat,
+                             Video)
+from athletes.performance import event_key, lower_is_better, parse_performance
+from config.db import router as db_router
+from config.db.middleware import ReadYourWritesMiddleware
+from config.db.pool import ConnectionPool, PoolTimeout
+from config.warmup import warmup
+from home.models import Highlight, SocialMedia
+from organizations.models import Organization, School
+
+
+class CompiledSerializerParityTests(TestCase):
+    """The compiled read path must render exactly what the DRF serializers do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        owner = User.objects.create_user(username='owner@example.com', email='owner@example.com')
+        cls.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com',
+                                              owner=owner, state='TX', city='Austin')
+        Organization.objects.filter(pk=cls.org.pk).update(logo='org_logos/aquatics.png')
+        School.objects.create(name='Lincoln High', phone='555', email='school@example.com',
+                              principal_name='Ms. Lee', established_year=1950)
+
+        user = User.objects.create_user(username='alex@example.com', email='alex@example.com')
+        alex = Profile.objects.create(user=user, first_name='Alex', last_name='Smith', phone='555',
+                                      email='alex@example.com', sport='Swimming', graduation_year=2025,
+                                      organization=cls.org, bio='Fast 🏊', instagram='https://instagram.com/alex')
+        Profile.objects.filter(pk=alex.pk).update(profile_picture='profile_picture/alex.jpg')
+        Achievement.objects.create(profile=alex, emoji='🥇', achievement='State Champion')
+        Achievement.objects.create(profile=alex, emoji='🏆', achievement=None)
+        Stat.objects.create(profile=alex, date=datetime.date(2024, 1, 15), event='200 free',
+                            performance='1:52.34', highlight='PR')
+        Video.objects.create(profile=alex, url='https://youtube.com/watch?v=1')
+
+        # No user, no organization, no children: the optional keys disappear.
+        Profile.objects.create(first_name='Sam', last_name='Kerr', phone='555', email='sam@example.com')
+        Athlete.objects.create(first_name='Plain', last_name='Athlete', phone='555', email='plain@example.com')
+
+    def assertSameJSON(self, compiled, serializer_class, queryset, context=None):
+        renderer = JSONRenderer()
+        expected = serializer_class(queryset, many=True, context=context or {}).data
+        actual = compiled.serialize(queryset, context)
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_profiles(self):
+        self.assertSameJSON(compiled_profiles, ProfileSerializer, Profile.objects.order_by('pk'))
+
+    def test_profiles_with_request(self):
+        request = APIRequestFactory().get('/api/v1/profiles/')
+        self.assertSameJSON(compiled_profiles, ProfileSerializer, Profile.objects.order_by('pk'),
+                            {'request': request})
+
+    def test_athletes(self):
+        self.assertSameJSON(compiled_athletes, AthleteSerializer, Athlete.objects.order_by('pk'))
+
+    def test_organizations(self):
+        request = APIRequestFactory().get('/api/v1/organizations/')
+        self.assertSameJSON(compiled_organizations, OrganizationSerializer,
+                            Organization.objects.order_by('pk'), {'request': request})
+
+    def test_schools(self):
+        self.assertSameJSON(compiled_schools, SchoolSerializer, School.objects.order_by('pk'))
+
+    def test_serialize_pks_keeps_order_and_duplicates(self):
+        pks = list(Profile.objects.order_by('-pk').values_list('pk', flat=True))
+        pks.append(pks[0])
+        expected = [ProfileSerializer(Profile.objects.get(pk=pk)).data for pk in pks]
+        self.assertEqual(JSONRenderer().render(compiled_profiles.serialize_pks(pks)),
+                         JSONRenderer().render(expected))
+
+    def test_list_endpoint_query_count(self):
+        # One query for the profiles plus one per child model, whatever the page size.
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/v1/profiles/')
+        self.assertEqual(response.status_code, 200)
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Routing against two SQLite files standing in for a primary and a replica."""
+
+    aliases = ('sqlite_primary', 'sqlite_replica', 'sqlite_broken')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered after the system checks and SimpleTestCase's database
+        # guards have run, which only know about the project databases.
+        cls.databases = {*cls.databases, *cls.aliases}
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        names = {
+            'sqlite_primary': os.path.join(cls.tmpdir.name, 'primary.sqlite3'),
+            'sqlite_replica': os.path.join(cls.tmpdir.name, 'replica.sqlite3'),
+            # A directory that doesn't exist: connecting fails like a dead replica.
+            'sqlite_broken': os.path.join(cls.tmpdir.name, 'missing', 'replica.sqlite3'),
+        }
+        configured = connections.configure_settings({
+            'default': {},
+            **{alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name} for alias, name in names.items()},
+        })
+        connections.settings.update({alias: configured[alias] for alias in names})
+        for alias in ('sqlite_primary', 'sqlite_replica'):
+            with connections[alias].cursor() as cursor:
+                cursor.execute('CREATE TABLE marker (name TEXT)')
+                cursor.execute('INSERT INTO marker VALUES (%s)', [alias])
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in cls.aliases:
+            connections[alias].close()
+            del connections[alias]
+            connections.settings.pop(alias)
+        cls.tmpdir.cleanup()
+        cls.databases = cls.databases - set(cls.aliases)
+        super().tearDownClass()
+
+    def setUp(self):
+        db_router._down_until.clear()
+        self.router = db_router.PrimaryReplicaRouter()
+        patcher = override_settings(DATABASE_PRIMARY='sqlite_primary', DATABASE_REPLICAS=['sqlite_replica'])
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def marker(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT name FROM marker')
+            return cursor.fetchone()[0]
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Organization), 'sqlite_primary')
+
+    def test_reads_use_replica_when_allowed(self):
+        with db_router.replica_reads():
+            alias = self.router.db_for_read(Organization)
+            self.assertEqual(self.marker(alias), 'sqlite_replica')
+            self.assertEqual(self.router.db_for_write(Organization), 'sqlite_primary')
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        with override_settings(DATABASE_REPLICAS=['sqlite_broken']), db_router.replica_reads():
+            self.assertEqual(self.router.db_for_read(Organization), 'sqlite_primary')
+        self.assertIn('sqlite_broken', db_router._down_until)
+
+    def test_replicas_are_never_migrated(self):
+        self.assertIs(self.router.allow_migrate('sqlite_replica', 'athletes'), False)
+        self.assertIsNone(self.router.allow_migrate('sqlite_primary', 'athletes'))
+
+    def test_writer_sticks_to_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Organization))
+            return HttpResponse()
+
+        middleware = ReadYourWritesMiddleware(view)
+        factory = RequestFactory()
+
+        middleware(factory.get('/api/v1/home/'))
+        response = middleware(factory.post('/api/v1/stats/'))
+        cookie = response.cookies[ReadYourWritesMiddleware.cookie_name].value
+
+        sticky = factory.get('/api/v1/home/')
+        sticky.COOKIES[ReadYourWritesMiddleware.cookie_name] = cookie
+        middleware(sticky)
+
+        expired = factory.get('/api/v1/home/')
+        expired.COOKIES[ReadYourWritesMiddleware.cookie_name] = cookie
+        with mock.patch('config.db.middleware.time.time', return_value=float(cookie) + 1):
+            middleware(expired)
+
+        self.assertEqual(seen, ['sqlite_replica', 'sqlite_primary', 'sqlite_primary', 'sqlite_replica'])
+
+    def test_read_only_posts_use_replicas(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Organization))
+            return HttpResponse()
+
+        response = ReadYourWritesMiddleware(view)(RequestFactory().post('/api/v1/batch/'))
+        self.assertEqual(seen, ['sqlite_replica'])
+        self.assertNotIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+
+class FakeConnection:
+    """Stands in for a MySQLdb connection; counts server handshakes."""
+
+    handshakes = 0
+
+    def __init__(self):
+        FakeConnection.handshakes += 1
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError('MySQL server has gone away')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        FakeConnection.handshakes = 0
+
+    def test_handshakes_per_request_drop_to_near_zero(self):
+        pool = ConnectionPool(FakeConnection, max_size=4)
+        requests = 500
+        for _ in range(requests):
+            conn = pool.checkout()
+            pool.checkin(conn)
+        self.assertEqual(FakeConnection.handshakes, 1)
+        self.assertLess(FakeConnection.handshakes / requests, 0.01)
+        self.assertEqual(pool.stats()['checkouts'], requests)
+
+    def test_dead_connection_is_replaced_on_checkout(self):
+        pool = ConnectionPool(FakeConnection)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.alive = False
+        fresh = pool.checkout()
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['failed_pings'], 1)
+
+    def test_idle_connections_are_evicted(self):
+        pool = ConnectionPool(FakeConnection, max_idle=60)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        with mock.patch('config.db.pool.time.monotonic', return_value=10 ** 9):
+            fresh = pool.checkout()
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['evicted'], 1)
+
+    def test_pool_is_bounded(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.01)
+        first, second = pool.checkout(), pool.checkout()
+        self.assertEqual(pool.stats()['in_use'], 2)
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_discarded_connections_are_closed(self):
+        pool = ConnectionPool(FakeConnection)
+        conn = pool.checkout()
+        pool.checkin(conn, discard=True)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+
+class PooledMySQLBackendTests(SimpleTestCase):
+    def setUp(self):
+        try:
+            from config.db.mysql_pool import base
+        except ImproperlyConfigured:
+            self.skipTest('mysqlclient is not installed')
+        self.base = base
+        FakeConnection.handshakes = 0
+        settings_dict = {**connections['default'].settings_dict, 'ENGINE': 'config.db.mysql_pool',
+                         'POOL': {'MAX_SIZE': 2}}
+        self.wrapper = base.DatabaseWrapper(settings_dict, alias='pooled-mysql-test')
+        self.enterContext(mock.patch.object(base.DatabaseWrapper, '_connect', lambda wrapper: FakeConnection()))
+        # Every test starts with a pool of its own.
+        self.enterContext(mock.patch.dict('config.db.pool._pools', clear=True))
+
+    def open(self):
+        self.wrapper.connection = self.wrapper.get_new_connection({})
+        return self.wrapper.connection
+
+    def test_close_returns_the_connection_to_the_pool(self):
+        conn = self.open()
+        self.wrapper.close()
+        self.assertIsNone(self.wrapper.connection)
+        self.assertFalse(conn.closed)
+        self.assertEqual(self.wrapper.pool().stats()['idle'], 1)
+        # The next request gets it back without a handshake.
+        self.assertIs(self.open(), conn)
+        self.assertEqual(FakeConnection.handshakes, 1)
+
+    def test_close_inside_an_atomic_block_discards_the_connection(self):
+        conn = self.open()
+        self.wrapper.in_atomic_block = True
+        self.wrapper.close()
+        self.assertTrue(conn.closed)
+        self.assertTrue(self.wrapper.needs_rollback)
+        stats = self.wrapper.pool().stats()
+        self.assertEqual((stats['idle'], stats['in_use']), (0, 0))
+
+    def test_fork_drops_inherited_connections(self):
+        conn = self.open()
+        with mock.patch.object(self.base.connections, 'all', return_value=[self.wrapper]):
+            self.base._drop_inherited_connections()
+        self.assertIsNone(self.wrapper.connection)
+        # Left open: the socket is the parent's.
+        self.assertFalse(conn.closed)
+        # Closing in the child then touches neither the socket nor the pool.
+        self.wrapper.close()
+        self.assertFalse(conn.closed)
+        self.assertEqual(self.wrapper.pool().stats()['idle'], 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QuerysetCacheTests(TransactionTestCase):
+    # TestCase wraps every test in a transaction, where the cache stands aside.
+
+    def setUp(self):
+        caches['default'].clear()
+        self.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        self.school = School.objects.create(name='Lincoln High', phone='555', email='school@example.com',
+                                            principal_name='Ms. Lee', established_year=1950)
+
+    def names(self, queryset):
+        return list(queryset.order_by('pk').values_list('name', flat=True))
+
+    def test_hits_do_not_touch_the_database(self):
+        self.assertEqual(self.names(Organization.objects.all()), ['City Aquatics', 'Lincoln High'])
+        School.objects.get(pk=self.school.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(Organization.objects.all()), ['City Aquatics', 'Lincoln High'])
+            self.assertEqual(School.objects.get(pk=self.school.pk).principal_name, 'Ms. Lee')
+
+    def test_related_lookups_are_cached(self):
+        athlete = Athlete.objects.create(first_name='Alex', last_name='Smith', phone='555',
+                                         email='alex@example.com', organization=self.org)
+        Athlete.objects.get(pk=athlete.pk).organization
+        with self.assertNumQueries(1):
+            self.assertEqual(Athlete.objects.get(pk=athlete.pk).organization.name, 'City Aquatics')
+
+    def test_writes_invalidate(self):
+        queryset = Organization.objects.all()
+        self.names(queryset)
+
+        self.org.name = 'Saved'
+        self.org.save()
+        self.assertEqual(self.names(queryset), ['Saved', 'Lincoln High'])
+
+        Organization.objects.filter(pk=self.org.pk).update(name='Updated')
+        self.assertEqual(self.names(queryset), ['Updated', 'Lincoln High'])
+
+        self.org.name = 'Bulk'
+        Organization.objects.bulk_update([self.org], ['name'])
+        self.assertEqual(self.names(queryset), ['Bulk', 'Lincoln High'])
+
+        # Writing the parent table invalidates the child's queries too.
+        Organization.objects.filter(pk=self.school.pk).update(name='Renamed High')
+        self.assertEqual(self.names(School.objects.all()), ['Renamed High'])
+
+        Organization.objects.filter(pk=self.org.pk).delete()
+        self.assertEqual(self.names(queryset), ['Renamed High'])
+
+    def test_other_tables_bypass_the_cache(self):
+        User = get_user_model()
+        User.objects.create_user(username='owner@example.com')
+        queryset = Organization.objects.filter(owner__username='owner@example.com')
+        list(queryset)
+        with self.assertNumQueries(1):
+            list(queryset.all())
+
+    def test_transactions_bypass_the_cache(self):
+        list(SocialMedia.objects.all())
+        with transaction.atomic(), self.assertNumQueries(1):
+            list(SocialMedia.objects.all())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProfileFragmentCacheTests(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        self.alex = Profile.objects.create(first_name='Alex', last_name='Smith', phone='555',
+                                           email='alex@example.com', sport='Swimming', organization=self.org)
+        Profile.objects.filter(pk=self.alex.pk).update(profile_picture='profile_picture/alex.jpg')
+        self.stat = Stat.objects.create(profile=self.alex, date=datetime.date(2024, 1, 15), event='200 free',
+                                        performance='1:52.34', highlight='PR')
+        self.sam = Profile.objects.create(first_name='Sam', last_name='Kerr', phone='555', email='sam@example.com')
+
+    def profiles(self):
+        return self.client.get('/api/v1/profiles/').json()
+
+    def test_warm_lists_only_fetch_ids(self):
+        cold = self.profiles()
+        with self.assertNumQueries(1):
+            warm = self.profiles()
+        self.assertEqual(warm, cold)
+        self.assertEqual(warm[0]['profile_picture'], 'http://testserver/media/profile_picture/alex.jpg')
+
+        with self.assertNumQueries(1):
+            results = self.client.get('/api/v1/search/', {'q': 'Alex'}).json()
+        self.assertEqual(results[0]['profile_picture'], '/media/profile_picture/alex.jpg')
+
+    def test_detail_matches_serializer(self):
+        self.profiles()
+        request = APIRequestFactory().get('/')
+        response = self.client.get(f'/api/v1/profiles/{self.alex.pk}/')
+        expected = ProfileSerializer(Profile.objects.get(pk=self.alex.pk), context={'request': request}).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_writes_invalidate(self):
+        self.profiles()
+
+        Stat.objects.filter(pk=self.stat.pk).update(performance='1:50.00')
+        self.assertEqual(self.profiles()[0]['stats'][0]['performance'], '1:50.00')
+
+        Achievement.objects.bulk_create([Achievement(profile=self.alex, emoji='🥇', achievement='Gold')])
+        self.assertEqual(len(self.profiles()[0]['achievements']), 1)
+
+        Video.objects.create(profile=self.sam, url='https://youtube.com/watch?v=1')
+        self.assertEqual(len(self.profiles()[1]['videos']), 1)
+
+        self.stat.profile = self.sam
+        self.stat.save()
+        alex, sam = self.profiles()
+        self.assertEqual((alex['stats'], len(sam['stats'])), ([], 1))
+
+        self.org.name = 'Metro Aquatics'
+        self.org.save()
+        self.assertEqual(self.profiles()[0]['organization_name'], 'Metro Aquatics')
+
+        Athlete.objects.filter(pk=self.sam.pk).update(sport='Diving')
+        self.assertEqual(self.profiles()[1]['sport'], 'Diving')
+
+        self.org.delete()
+        self.assertNotIn('organization_name', self.profiles()[0])
+
+
+class PurgeRecorder(BaseHTTPRequestHandler):
+    """Local stand-in for the edge cache's purge API."""
+
+    def do_PURGE(self):
+        self.server.purged.append(self.headers['Surrogate-Key'].split())
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   EDGE_CACHE_PURGER='api.edgecache.HTTPPurger')
+class EdgeCacheTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PurgeRecorder)
+        cls.server.purged = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        patcher = override_settings(EDGE_CACHE_PURGE_URL=f'http://127.0.0.1:{cls.server.server_port}/')
+        patcher.enable()
+        cls.addClassCleanup(patcher.disable)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(username='alex@example.com')
+        self.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        self.alex = Profile.objects.create(user=self.user, first_name='Alex', last_name='Smith', phone='555',
+                                           email='alex@example.com', organization=self.org)
+        self.stat = Stat.objects.create(profile=self.alex, date=datetime.date(2024, 1, 15), event='200 free',
+                                        performance='1:52.34', highlight='PR')
+        self.server.purged = []
+
+    def test_public_responses_are_tagged(self):
+        response = self.client.get(f'/api/v1/profiles/{self.alex.pk}/')
+        self.assertEqual(response['Surrogate-Key'], f'profile-{self.alex.pk} org-{self.org.pk}')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=86400', response['Cache-Control'])
+
+        response = self.client.get('/api/v1/home/')
+        self.assertTrue(response['Surrogate-Key'].startswith('home'))
+
+    def test_authenticated_responses_stay_private(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/api/v1/profiles/{self.alex.pk}/')
+        self.assertFalse(response.has_header('Surrogate-Key'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_stat_edit_purges_only_its_athlete_and_event(self):
+        self.client.force_login(self.user)
+        response = self.client.patch(f'/api/v1/stats/{self.stat.pk}/', {'performance': '1:50.00'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.purged, [['leaderboard-200-freestyle', f'profile-{self.alex.pk}']])
+
+    def test_purges_are_batched_per_request(self):
+        with purge_batch():
+            self.org.name = 'Metro Aquatics'
+            self.org.save()
+            Stat.objects.filter(profile=self.alex).update(highlight='')
+            self.assertEqual(self.server.purged, [])
+        self.assertEqual(self.server.purged, [sorted(
+            ['home', 'orgs', 'schools', f'org-{self.org.pk}', f'profile-{self.alex.pk}']
+        )])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   SYNC_SETTLE_SECONDS=0)
+class SyncTests(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.alex = Profile.objects.create(first_name='Alex', last_name='Smith', phone='555', email='alex@example.com')
+        self.stat = Stat.objects.create(profile=self.alex, date=datetime.date(2024, 1, 15), event='200 free',
+                                        performance='1:52.34', highlight='PR')
+        self.video = Video.objects.create(profile=self.alex, url='https://youtube.com/watch?v=1')
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        return self.client.get('/api/v1/sync/', params).json()
+
+    def test_without_cursor_clients_reset(self):
+        response = self.sync()
+        self.assertTrue(response['reset'])
+        self.assertEqual(self.sync(response['cursor'])['changes'], {})
+
+    def test_only_changes_since_cursor(self):
+        cursor = self.sync()['cursor']
+        Stat.objects.filter(pk=self.stat.pk).update(performance='1:50.00')
+        video_id = self.video.pk
+        self.video.delete()
+        Highlight.objects.create(title='Draft')
+
+        response = self.sync(cursor)
+        changes = response['changes']
+        self.assertFalse(response['reset'])
+        self.assertEqual([stat['performance'] for stat in changes['stats']['upserts']], ['1:50.00'])
+        self.assertEqual(changes['videos'], {'upserts': [], 'deletes': [video_id]})
+        # The profile nests its stats and videos, so it changed too.
+        self.assertEqual([profile['id'] for profile in changes['profiles']['upserts']], [self.alex.pk])
+        # Unpublished highlights aren't public.
+        self.assertEqual(len(changes['highlights']['deletes']), 1)
+        self.assertEqual(self.sync(response['cursor'])['changes'], {})
+
+    def test_pages(self):
+        cursor = self.sync()['cursor']
+        Stat.objects.filter(pk=self.stat.pk).update(highlight='')
+        pages = [self.sync(cursor, limit=1)]
+        while pages[-1]['has_more']:
+            pages.append(self.sync(pages[-1]['cursor'], limit=1))
+        self.assertGreater(len(pages), 1)
+        self.assertEqual({name for page in pages for name in page['changes']}, {'profiles', 'stats'})
+        self.assertEqual(self.sync(pages[-1]['cursor'])['changes'], {})
+
+    def test_compaction(self):
+        cursor = self.sync()['cursor']
+        for performance in ('1:51', '1:50', '1:49'):
+            self.stat.performance = performance
+            self.stat.save()
+        call_command('compact_changelog', stdout=io.StringIO())
+        self.assertEqual(ChangeLogEntry.objects.filter(kind='stat').count(), 1)
+        self.assertEqual(self.sync(cursor)['changes']['stats']['upserts'][0]['performance'], '1:49')
+
+        call_command('compact_changelog', days=0, stdout=io.StringIO())
+        self.assertEqual(ChangeLogEntry.objects.count(), 1)
+        self.assertTrue(self.sync(cursor)['reset'])
+        response = self.sync(self.sync(cursor)['cursor'])
+        self.assertEqual((response['reset'], response['changes']), (False, {}))
+
+    def test_entries_written_with_the_change(self):
+        cursor = self.sync()['cursor']
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Stat.objects.filter(pk=self.stat.pk).update(performance='1:50.00')
+            self.assertEqual(ChangeLogEntry.objects.filter(id__gt=cursor, kind='stat').count(), 1)
+            raise RuntimeError
+        self.assertEqual(self.sync(cursor)['changes'], {})
+
+    def test_fresh_entries_wait_to_settle(self):
+        cursor = self.sync()['cursor']
+        Stat.objects.filter(pk=self.stat.pk).update(performance='1:50.00')
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            # A lower id may still be in an open transaction.
+            self.assertEqual(self.sync(cursor), {'reset': False, 'cursor': cursor, 'has_more': False,
+                                                 'changes': {}})
+            self.assertLessEqual(int(self.sync()['cursor']), int(cursor))
+            with mock.patch('django.utils.timezone.now',
+                            return_value=timezone.now() + datetime.timedelta(seconds=61)):
+                self.assertIn('stats', self.sync(cursor)['changes'])
+
+    def test_dropping_superseded_entries_keeps_cursors(self):
+        cursor = self.sync()['cursor']
+        self.stat.save()
+        self.video.save()
+        call_command('compact_changelog', stdout=io.StringIO())
+        # Everything up to the cursor was superseded and dropped...
+        self.assertGreater(ChangeLogEntry.objects.order_by('id').first().id, int(cursor) + 1)
+        # ...but nothing the client needs.
+        response = self.sync(cursor)
+        self.assertFalse(response['reset'])
+        self.assertEqual(set(response['changes']), {'profiles', 'stats', 'videos'})
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='alex@example.com', email='alex@example.com')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        cls.alex = Profile.objects.create(user=cls.user, first_name='Alex', last_name='Smith', phone='555',
+                                          email='alex@example.com', organization=cls.org)
+        Stat.objects.create(profile=cls.alex, date=datetime.date(2024, 1, 15), event='200 free',
+                            performance='1:52.34', highlight='PR')
+
+    def batch(self, *paths, **extra):
+        return self.client.post('/api/v1/batch/', {'requests': [{'path': path} for path in paths]},
+                                content_type='application/json', **extra)
+
+    def test_dashboard_in_one_round_trip(self):
+        paths = [f'/api/v1/profiles/{self.alex.pk}/', '/api/v1/stats/', '/api/v1/achievements/',
+                 '/api/v1/videos/', f'/api/v1/organizations/{self.org.pk}/', '/api/v1/home/']
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        response = self.batch(*paths, **auth)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['responses']
+        self.assertEqual([result['path'] for result in results], paths)
+        for path, result in zip(paths, results):
+            self.assertEqual(result['status'], 200, path)
+            self.assertEqual(result['body'], self.client.get(path, **auth).json(), path)
+
+    def test_role_lookups_are_shared(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.batch('/api/v1/profiles/', '/api/v1/athletes/', '/api/v1/organizations/')
+        organization_lookups = [query for query in queries
+                                if 'WHERE "organizations_organization"."owner_id"' in query['sql']]
+        self.assertEqual(len(organization_lookups), 1)
+
+    def test_limits(self):
+        self.assertEqual(self.batch(*['/api/v1/home/'] * 11).status_code, 400)
+        self.assertEqual(self.batch('/admin/').status_code, 400)
+        response = self.client.post('/api/v1/batch/', {'requests': [{'path': '/api/v1/home/', 'method': 'DELETE'}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        results = self.batch('/api/v1/batch/', '/api/v1/nowhere/').json()['responses']
+        self.assertEqual([result['status'] for result in results], [400, 404])
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        cls.other_org = Organization.objects.create(name='Metro Swim', phone='555', email='metro@example.com')
+        cls.alex = Profile.objects.create(first_name='Alex', last_name='Smith', phone='555',
+                                          email='alex@example.com', organization=cls.org)
+        cls.sam = Profile.objects.create(first_name='Sam', last_name='Kerr', phone='555', email='sam@example.com')
+
+    def stat(self, profile, **fields):
+        return Stat(profile=profile, date=datetime.date(2024, 1, 15), event='200 free',
+                    performance='1:52.34', highlight='PR', **fields)
+
+    def assertCounts(self, expected):
+        counts = {obj: (type(obj).objects.get(pk=obj.pk).athlete_count if isinstance(obj, Organization)
+                        else Profile.objects.get(pk=obj.pk).stat_count) for obj in expected}
+        self.assertEqual(counts, expected)
+
+    def test_saves_and_deletes(self):
+        athlete = Athlete.objects.create(first_name='Plain', last_name='Athlete', phone='555',
+                                         email='plain@example.com', organization=self.org)
+        self.assertCounts({self.org: 2, self.other_org: 0})
+        self.alex.organization = self.other_org
+        self.alex.save()
+        self.assertCounts({self.org: 1, self.other_org: 1})
+
+        stat = self.stat(self.alex)
+        stat.save()
+        Achievement.objects.create(profile=self.alex, emoji='🥇')
+        self.assertCounts({self.alex: 1, self.sam: 0})
+        self.assertEqual(Profile.objects.get(pk=self.alex.pk).achievement_count, 1)
+        stat.profile = self.sam
+        stat.save()
+        self.assertCounts({self.alex: 0, self.sam: 1})
+        stat.delete()
+        self.assertCounts({self.sam: 0})
+
+        # Deleting a profile sends post_delete for its Athlete row too.
+        Profile.objects.get(pk=self.alex.pk).delete()
+        athlete.delete()
+        self.assertCounts({self.org: 0, self.other_org: 0})
+
+    def test_bulk_paths(self):
+        stats = Stat.objects.bulk_create([self.stat(self.alex), self.stat(self.alex), self.stat(self.sam)])
+        self.assertCounts({self.alex: 2, self.sam: 1})
+        Stat.objects.filter(pk=stats[0].pk).update(profile=self.sam)
+        self.assertCounts({self.alex: 1, self.sam: 2})
+        stats[1].profile = self.sam
+        Stat.objects.bulk_update([stats[1]], ['profile'])
+        self.assertCounts({self.alex: 0, self.sam: 3})
+        with CaptureQueriesContext(connections['default']) as queries:
+            Stat.objects.filter(profile=self.sam).update(highlight='')
+        # Writes that don't touch the foreign key leave the counts alone.
+        self.assertFalse([query for query in queries if 'athletes_profile' in query['sql']])
+        Stat.objects.filter(pk__in=[stats[0].pk, stats[2].pk]).delete()
+        self.assertCounts({self.alex: 0, self.sam: 1})
+
+        Profile.objects.filter(pk=self.sam.pk).update(organization=self.org)
+        self.assertCounts({self.org: 2})
+
+    def test_reconcile(self):
+        Stat.objects.bulk_create([self.stat(self.alex), self.stat(self.alex)])
+        Profile._base_manager.filter(pk=self.alex.pk).update(stat_count=7)
+        Organization._base_manager.filter(pk=self.org.pk).update(athlete_count=0)
+
+        call_command('reconcile_counters', dry_run=True, stdout=io.StringIO())
+        self.assertCounts({self.alex: 7, self.org: 0})
+        call_command('reconcile_counters', batch_size=1, stdout=io.StringIO())
+        self.assertCounts({self.alex: 2, self.sam: 0, self.org: 1, self.other_org: 0})
+
+    def test_lists_sort_and_filter_on_counts(self):
+        Stat.objects.bulk_create([self.stat(self.sam), self.stat(self.sam), self.stat(self.alex)])
+        response = self.client.get('/api/v1/profiles/', {'ordering': '-stat_count'})
+        self.assertEqual([(p['id'], p['stat_count']) for p in response.json()], [(self.sam.pk, 2), (self.alex.pk, 1)])
+        response = self.client.get('/api/v1/organizations/', {'min_athlete_count': 1})
+        self.assertEqual([org['id'] for org in response.json()], [self.org.pk])
+        self.assertEqual(self.client.get('/api/v1/organizations/', {'min_athlete_count': 'x'}).status_code, 400)
+
+
+class PerformanceParserTests(SimpleTestCase):
+    def test_event_keys(self):
+        self.assertEqual(event_key('100 Meters'), '100m')
+        self.assertEqual(event_key('100m'), '100m')
+        self.assertEqual(event_key('200 Free'), '200-freestyle')
+        self.assertEqual(event_key(' Long  Jump'), 'long-jump')
+        self.assertEqual(event_key(None), '')
+
+    def test_marks(self):
+        cases = [
+            ('200 free', '1:52.34', (112.34, True)),
+            ('100m', '10.52s', (10.52, True)),
+            ('Marathon', '2:05:12', (7512.0, True)),
+            ('400m', '1:02.5 (PR)', (62.5, True)),
+            ('Long Jump', '6.52m', (6.52, False)),
+            ('Long Jump', '21\' 4.5"', (6.515, False)),
+            ('Long Jump', '21-04.5', (6.515, False)),
+            ('High Jump', '190 cm', (1.9, False)),
+            ('Decathlon', '8000 pts', (8000.0, False)),
+        ]
+        for event, performance, expected in cases:
+            self.assertEqual(tuple(parse_performance(event, performance)), expected, (event, performance))
+        self.assertIsNone(parse_performance('100m', 'fast'))
+        self.assertIsNone(parse_performance('100m', ''))
+
+    def test_events_measured_by_whole_words(self):
+        cases = [
+            ('Shot Put', '15.20m', (15.2, False)),
+            ('Weight Throw', '20m', (20.0, False)),
+            ('4x100 Relay', '41.20', (41.2, True)),
+            ('Mile', '4:05', (245.0, True)),
+            ('5k', '15:30', (930.0, True)),
+            ('Points', '22', (22.0, False)),
+        ]
+        for event, performance, expected in cases:
+            self.assertEqual(tuple(parse_performance(event, performance)), expected, (event, performance))
+        # Team-sport counts aren't races, and "throws" or "shots" in them aren't throws.
+        for event, performance in [('Rebounds', '12'), ('Assists', '7'), ('Passing Yards', '250'),
+                                   ('Free Throws Made', '5'), ('Shots on Goal', '3')]:
+            self.assertIsNone(parse_performance(event, performance), event)
+            self.assertIsNone(lower_is_better(event_key(event)), event)
+
+
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.texas = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com', state='TX')
+        cls.ohio = Organization.objects.create(name='Metro Swim', phone='555', email='metro@example.com', state='OH')
+        cls.profiles = [
+            Profile.objects.create(first_name=name, last_name='Runner', phone='555', email=f'{name}@example.com',
+                                   organization=org, graduation_year=year)
+            for name, org, year in [('ann', cls.texas, 2025), ('bea', cls.ohio, 2025), ('cat', cls.texas, 2026)]
+        ]
+
+    def stat(self, profile, performance, event='100 Meters', **fields):
+        return Stat(profile=profile, date=datetime.date(2024, 1, 15), event=event,
+                    performance=performance, highlight='', **fields)
+
+    def board(self, event='100m', **params):
+        return self.client.get(f'/api/v1/leaderboards/{event}/', params).json()
+
+    def ranks(self, event='100m'):
+        return dict(LeaderboardEntry.objects.filter(event_key=event).values_list('profile__first_name', 'rank'))
+
+    def test_parsed_on_every_write_path(self):
+        ann, bea, _ = self.profiles
+        stat = self.stat(ann, '10.9')
+        stat.save()
+        self.assertEqual((stat.event_key, stat.performance_value, stat.lower_is_better), ('100m', 10.9, True))
+        Stat.objects.bulk_create([self.stat(bea, '11.2s')])
+        Stat.objects.filter(profile=bea).update(performance='11.1')
+        self.assertEqual(Stat.objects.get(profile=bea).performance_value, 11.1)
+        stat.event = 'Long Jump'
+        Stat.objects.bulk_update([stat], ['event'])
+        stat.refresh_from_db()
+        self.assertEqual((stat.event_key, stat.performance_value, stat.lower_is_better), ('long-jump', 10.9, False))
+
+    def test_ranks_follow_stats(self):
+        ann, bea, cat = self.profiles
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.stat(ann, '11.0')
+            first.save()
+            Stat.objects.bulk_create([self.stat(bea, '10.8'), self.stat(cat, '11.0')])
+        self.assertEqual(self.ranks(), {'bea': 1, 'ann': 2, 'cat': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stat(cat, '10.5').save()
+        self.assertEqual(self.ranks(), {'cat': 1, 'bea': 2, 'ann': 3})
+
+        # A slower mark doesn't replace the best one.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stat(ann, '12.0').save()
+        self.assertEqual(self.ranks(), {'cat': 1, 'bea': 2, 'ann': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.filter(profile=cat).delete()
+        self.assertEqual(self.ranks(), {'bea': 1, 'ann': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.filter(pk=first.pk).update(performance='10.0')
+        self.assertEqual(self.ranks(), {'ann': 1, 'bea': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Profile.objects.get(pk=ann.pk).delete()
+        self.assertEqual(self.ranks(), {'bea': 1})
+
+    def test_filtered_boards(self):
+        ann, bea, cat = self.profiles
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.bulk_create([self.stat(ann, '11.0'), self.stat(bea, '10.8'), self.stat(cat, '10.9'),
+                                      self.stat(ann, '6.1m', event='Long Jump')])
+
+        board = self.board()
+        self.assertEqual([(r['profile']['first_name'], r['rank']) for r in board['results']],
+                         [('bea', 1), ('cat', 2), ('ann', 3)])
+        board = self.board(state='TX')
+        self.assertEqual([(r['profile']['first_name'], r['rank'], r['overall_rank']) for r in board['results']],
+                         [('cat', 1, 2), ('ann', 2, 3)])
+        board = self.board(state='TX', offset=1)
+        self.assertEqual([(r['profile']['first_name'], r['rank']) for r in board['results']], [('ann', 2)])
+        self.assertEqual([r['profile']['first_name'] for r in self.board(graduation_year=2025)['results']],
+                         ['bea', 'ann'])
+
+        # Copied profile fields follow the profile and its organization.
+        with self.captureOnCommitCallbacks(execute=True):
+            Organization.objects.filter(pk=self.ohio.pk).update(state='TX')
+            Profile.objects.filter(pk=cat.pk).update(graduation_year=2025)
+        self.assertEqual(self.board(state='TX', graduation_year=2025)['count'], 3)
+
+        events = self.client.get('/api/v1/leaderboards/').json()
+        self.assertEqual([(e['event'], e['athletes']) for e in events], [('100m', 3), ('long-jump', 1)])
+
+        # Deleting an organization leaves its athletes on the boards, without a state.
+        with self.captureOnCommitCallbacks(execute=True):
+            Organization.objects.get(pk=self.texas.pk).delete()
+        self.assertEqual(set(LeaderboardEntry.objects.filter(profile__in=[ann, cat]).values_list('state', flat=True)),
+                         {None})
+        self.assertEqual([r['profile']['first_name'] for r in self.board(state='TX')['results']], ['bea'])
+        self.assertEqual(self.client.get('/api/v1/leaderboards/400m/').status_code, 404)
+
+    def test_profile_saves_refresh_copies_when_copied_fields_change(self):
+        ann = Profile.objects.get(pk=self.profiles[0].pk)
+        with mock.patch('api.leaderboards.refresh_copies') as refresh:
+            ann.bio = 'Sprinter'
+            ann.save()
+            ann.sport = 'Track'
+            ann.save(update_fields=['bio'])
+            self.assertFalse(refresh.called)
+            ann.save()
+            self.assertEqual(refresh.call_count, 1)
+            ann.organization = self.ohio
+            ann.graduation_year = 2030
+            ann.save(update_fields=['graduation_year'])
+            self.assertEqual(refresh.call_count, 2)
+            ann.save()
+            self.assertEqual(refresh.call_count, 3)
+
+    def test_rebuild(self):
+        ann, bea, cat = self.profiles
+        Stat.objects.bulk_create([self.stat(ann, '11.0'), self.stat(bea, '10.8'), self.stat(cat, '10.8')])
+        Stat._base_manager.update(performance_value=None)
+        LeaderboardEntry.objects.create(event_key='gone', profile=ann, value=1, lower_is_better=True, rank=1)
+
+        call_command('rebuild_leaderboards', reparse=True, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(self.ranks(), {'bea': 1, 'cat': 1, 'ann': 3})
+        self.assertFalse(LeaderboardEntry.objects.filter(event_key='gone').exists())
+
+
+class ProgressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create(first_name='Ann', last_name='Runner', phone='555',
+                                             email='ann@example.com', graduation_year=2025)
+
+    def stat(self, date, performance, event='100 Meters'):
+        return Stat(profile=self.profile, date=date, event=event, performance=performance, highlight='')
+
+    def points(self, event='100m'):
+        return list(ProgressionPoint.objects.filter(profile=self.profile, event_key=event)
+                    .order_by('date').values_list('date', 'value', 'stats'))
+
+    def test_rollup_follows_stats(self):
+        day = datetime.date(2024, 3, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.stat(day, '11.4')
+            first.save()
+            Stat.objects.bulk_create([self.stat(day, '11.2'), self.stat(day + datetime.timedelta(days=7), '11.3')])
+        self.assertEqual(self.points(), [(day, 11.2, 2), (day + datetime.timedelta(days=7), 11.3, 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.filter(pk=first.pk).update(performance='10.9')
+        self.assertEqual(self.points()[0], (day, 10.9, 2))
+
+        # Moving a mark to another day refreshes both days.
+        with self.captureOnCommitCallbacks(execute=True):
+            first.refresh_from_db()
+            first.date = day + datetime.timedelta(days=1)
+            first.save()
+        self.assertEqual([point[:2] for point in self.points()],
+                         [(day, 11.2), (day + datetime.timedelta(days=1), 10.9), (day + datetime.timedelta(days=7), 11.3)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.filter(date=day).delete()
+        self.assertEqual(len(self.points()), 2)
+
+    def test_series(self):
+        # Seasons start in August: the first two marks are 2023-24, the rest 2024-25.
+        marks = [('2024-02-01', '11.5'), ('2024-05-01', '11.1'), ('2024-09-01', '11.4'), ('2025-01-01', '11.3')]
+        with self.captureOnCommitCallbacks(execute=True):
+            Stat.objects.bulk_create([self.stat(datetime.date.fromisoformat(date), mark) for date, mark in marks]
+                                     + [self.stat(datetime.date(2024, 6, 1), '6.1m', event='Long Jump')])
+
+        response = self.client.get(f'/api/v1/profiles/{self.profile.pk}/progression/', {'event': '100 Meters'})
+        self.assertEqual(response.status_code, 200)
+        [series] = response.json()['events']
+        self.assertEqual(series['event'], '100m')
+        self.assertEqual(series['personal_best'], {'date': '2024-05-01', 'value': 11.1})
+        self.assertEqual([(best['season'], best['value']) for best in series['season_bests']],
+                         [('2023-24', 11.1), ('2024-25', 11.3)])
+        self.assertEqual(len(series['points']), 4)
+
+        events = self.client.get(f'/api/v1/profiles/{self.profile.pk}/progression/').json()['events']
+        self.assertEqual([series['event'] for series in events], ['100m', 'long-jump'])
+        self.assertFalse(events[1]['lower_is_better'])
+        for points in ('many', '0', '1', '-5'):
+            self.assertEqual(self.client.get(f'/api/v1/profiles/{self.profile.pk}/progression/',
+                                             {'points': points}).status_code, 400, points)
+        series = self.client.get(f'/api/v1/profiles/{self.profile.pk}/progression/',
+                                 {'event': '100 Meters', 'points': 2}).json()['events'][0]
+        # The best mark and the latest.
+        self.assertEqual([point['date'] for point in series['points']], ['2024-05-01', '2025-01-01'])
+
+    def test_downsample_keeps_best_and_latest(self):
+        values = [12.0 - (index % 7) * 0.1 for index in range(100)] + [12.5]
+        kept = progression.downsample(values, True, 10)
+        self.assertLessEqual(len(kept), 10)
+        self.assertEqual(kept[-1], len(values) - 1)
+        self.assertIn(values.index(min(values)), kept)
+        self.assertEqual(kept, sorted(kept))
+
+        # The pure-Python fallback keeps the same points.
+        higher = progression.downsample(values, False, 10)
+        with mock.patch('api.progression.np', None):
+            self.assertEqual(progression.downsample(values, True, 10), kept)
+            self.assertEqual(progression.downsample(values, False, 10), higher)
+
+    def test_rebuild(self):
+        Stat.objects.bulk_create([self.stat(datetime.date(2024, 3, 1), '11.4'),
+                                  self.stat(datetime.date(2024, 3, 1), '11.2')])
+        ProgressionPoint.objects.all().delete()
+        call_command('rebuild_progression', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(self.points(), [(datetime.date(2024, 3, 1), 11.2, 2)])
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        texas = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com', state='TX')
+        ohio = Organization.objects.create(name='Metro Swim', phone='555', email='metro@example.com', state='OH')
+        cls.texas = texas
+        for name, sport, year, org, school in [('ann', 'Track', 2025, texas, 'Lincoln'),
+                                               ('bea', 'Track', 2026, ohio, 'Lincoln'),
+                                               ('cat', 'Swimming', 2025, texas, 'Roosevelt'),
+                                               ('dee', 'Swimming', 2025, None, None)]:
+            Profile.objects.create(first_name=name, last_name='Runner', phone='555', email=f'{name}@example.com',
+                                   sport=sport, graduation_year=year, organization=org, school=school)
+
+    def names(self, response):
+        rows = response['results'] if isinstance(response, dict) else response
+        return sorted(row['first_name'] for row in rows)
+
+    def test_filters(self):
+        self.assertEqual(self.names(self.client.get('/api/v1/profiles/', {'sport': 'Track'}).json()), ['ann', 'bea'])
+        self.assertEqual(self.names(self.client.get('/api/v1/profiles/?graduation_year=2025&state=TX').json()),
+                         ['ann', 'cat'])
+        self.assertEqual(self.names(self.client.get('/api/v1/profiles/?school=Lincoln&school=Roosevelt').json()),
+                         ['ann', 'bea', 'cat'])
+        self.assertEqual(self.names(self.client.get('/api/v1/profiles/', {'organization': self.texas.pk}).json()),
+                         ['ann', 'cat'])
+        self.assertEqual(self.client.get('/api/v1/profiles/', {'graduation_year': 'soon'}).status_code, 400)
+
+    def test_counts_in_one_query(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get('/api/v1/profiles/', {'sport': 'Track', 'facets': 1}).json()
+        self.assertEqual(self.names(response), ['ann', 'bea'])
+        self.assertEqual(len([q for q in queries.captured_queries if 'UNION' in q['sql'].upper()]), 1)
+
+        facets = response['facets']
+        # A facet isn't narrowed by its own selection.
+        self.assertEqual(facets['sport'], [{'value': 'Swimming', 'count': 2}, {'value': 'Track', 'count': 2}])
+        self.assertEqual(facets['graduation_year'], [{'value': 2025, 'count': 1}, {'value': 2026, 'count': 1}])
+        self.assertEqual(facets['state'], [{'value': 'OH', 'count': 1}, {'value': 'TX', 'count': 1}])
+        self.assertEqual(facets['school'], [{'value': 'Lincoln', 'count': 2}])
+        self.assertEqual(facets['organization'][0]['count'], 1)
+
+
+class ProfileChildrenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = [
+            Profile.objects.create(first_name=name, last_name='Runner', phone='555', email=f'{name}@example.com')
+            for name in ('ann', 'bea')
+        ]
+        Stat.objects.bulk_create([
+            Stat(profile=profile, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day % 4),
+                 event='100 Meters', performance=str(11 + day / 10), highlight='')
+            for profile in cls.profiles for day in range(6)
+        ])
+        Video.objects.bulk_create([Video(profile=cls.profiles[0], url=f'https://example.com/{n}') for n in range(3)])
+
+    def test_cursor_pages(self):
+        ann = self.profiles[0]
+        expected = list(Stat.objects.filter(profile=ann).order_by('-date', '-id').values_list('id', flat=True))
+        seen = []
+        url = f'/api/v1/profiles/{ann.pk}/stats/?limit=4'
+        while url:
+            page = self.client.get(url).json()
+            seen += [stat['id'] for stat in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(set(self.client.get(f'/api/v1/profiles/{ann.pk}/stats/').json()['results'][0]),
+                         {'id', 'date', 'event', 'performance', 'highlight'})
+
+        videos = self.client.get(f'/api/v1/profiles/{ann.pk}/videos/').json()['results']
+        self.assertEqual([video['url'] for video in videos], [f'https://example.com/{n}' for n in (2, 1, 0)])
+        self.assertEqual(self.client.get(f'/api/v1/profiles/{self.profiles[1].pk}/achievements/').json()['results'],
+                         [])
+
+    def test_gone_before_serialized(self):
+        ann = self.profiles[0]
+        gone = Profile(pk=ann.pk + 1000)
+        with mock.patch('api.v1.views.ProfileViewSet.get_object', return_value=gone):
+            self.assertEqual(self.client.get(f'/api/v1/profiles/{ann.pk}/').status_code, 404)
+            self.assertEqual(self.client.get(f'/api/v1/profiles/{ann.pk}/', {'preview': 1}).status_code, 404)
+
+    def test_preview(self):
+        ann, bea = self.profiles
+        profile = self.client.get(f'/api/v1/profiles/{ann.pk}/', {'preview': 2}).json()
+        latest = list(Stat.objects.filter(profile=ann).order_by('-date', '-id').values_list('id', flat=True)[:2])
+        self.assertEqual([stat['id'] for stat in profile['stats']], latest)
+        self.assertEqual(len(profile['videos']), 2)
+        self.assertEqual(len(self.client.get(f'/api/v1/profiles/{ann.pk}/').json()['stats']), 6)
+
+        # One query per child model, however many profiles are listed.
+        with CaptureQueriesContext(connections['default']) as queries:
+            profiles = self.client.get('/api/v1/profiles/', {'preview': 1}).json()
+        self.assertEqual([len(profile['stats']) for profile in profiles], [1, 1])
+        self.assertEqual(len([q for q in queries.captured_queries if 'athletes_stat' in q['sql']]), 1)
+        self.assertEqual(self.client.get('/api/v1/profiles/', {'preview': 'all'}).status_code, 400)
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        for name in ('ann', 'anna', 'annie', 'bea'):
+            Profile.objects.create(first_name=name, last_name='Runner', phone='555', email=f'{name}@example.com',
+                                   organization=org)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, model='athletes/profile', **params):
+        return self.client.get(f'/admin/{model}/', params).context['cl']
+
+    def test_small_tables_keep_exact_counts_and_search(self):
+        with mock.patch('api.admin.estimated_rows', return_value=None):
+            cl = self.changelist(q='nie')
+        self.assertEqual(cl.result_count, 1)
+        self.assertEqual(cl.search_fields, ('first_name', 'last_name', 'email'))
+        self.assertEqual(cl.list_select_related, ['organization'])
+
+    @override_settings(ADMIN_LARGE_TABLE_ROWS=1000, ADMIN_COUNT_LIMIT=2)
+    def test_large_tables(self):
+        with mock.patch('api.admin.estimated_rows', return_value=50000):
+            with CaptureQueriesContext(connections['default']) as queries:
+                cl = self.changelist()
+            self.assertEqual(cl.result_count, 50000)
+            self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+            # Filtered lists are counted up to ADMIN_COUNT_LIMIT, searched by indexed prefix.
+            cl = self.changelist(q='ann')
+            self.assertEqual(cl.search_fields, ['^first_name', '^last_name', '^email'])
+            self.assertEqual(cl.result_count, 2)
+            self.assertEqual(self.changelist(q='nie').result_count, 0)
+
+            # The athlete and organization lists are large-table lists too.
+            self.assertEqual(self.changelist('athletes/athlete').result_count, 50000)
+            cl = self.changelist('athletes/athlete', q='ann')
+            self.assertEqual((cl.search_fields, cl.result_count), (['^first_name', '^last_name', '^email'], 2))
+            self.assertEqual(self.changelist('organizations/organization').result_count, 50000)
+
+
+class CreateGroupsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create_user(f'user{n}', f'user{n}@example.com', 'pass') for n in range(4)]
+        for n, user in enumerate(cls.users[:3]):
+            Athlete.objects.create(first_name='A', last_name=str(n), phone='555', email=f'a{n}@example.com', user=user)
+        Organization.objects.create(name='Metro Swim', phone='555', email='org@example.com', owner=cls.users[3])
+
+    def run_command(self, **options):
+        call_command('create_groups', stdout=io.StringIO(), **options)
+
+    def memberships(self):
+        return set(get_user_model().groups.through.objects.values_list('user__username', 'group__name'))
+
+    def test_dry_run_writes_nothing(self):
+        self.run_command(enable_staff=True, dry_run=True)
+        self.assertFalse(self.memberships())
+        self.assertFalse(get_user_model().objects.filter(is_staff=True).exists())
+
+    def test_reconciles_in_a_few_queries(self):
+        self.run_command()
+        # The group exists and user0 is already a member.
+        get_user_model().groups.through.objects.filter(user=self.users[1]).delete()
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.run_command(enable_staff=True, groups='Athlete')
+        # Select the missing members, insert them, update is_staff.
+        self.assertEqual(len([q for q in queries.captured_queries if 'users_user' in q['sql']]), 3)
+        self.assertEqual(self.memberships(), {('user0', 'Athlete'), ('user1', 'Athlete'), ('user2', 'Athlete'),
+                                              ('user3', 'Organization Owner')})
+        self.assertEqual(set(get_user_model().objects.filter(is_staff=True).values_list('username', flat=True)),
+                         {'user0', 'user1', 'user2'})
+
+
+def admin_form_data(response):
+    """What the browser would post back for the change form in ``response``."""
+    data = {}
+    forms = [response.context['adminform'].form]
+    for inline in response.context['inline_admin_formsets']:
+        formset = inline.formset
+        for name in formset.management_form.fields:
+            data[formset.management_form.add_prefix(name)] = formset.management_form[name].value()
+        forms += formset.initial_forms
+    for form in forms:
+        for name, field in form.fields.items():
+            if field.widget.needs_multipart_form:
+                continue
+            value = form[name].value()
+            if value is not None and name != 'DELETE':
+                data[form.add_prefix(name)] = value
+    return data
+
+
+class RecentRowsInlineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.profile = Profile.objects.create(first_name='Ann', last_name='Runner', phone='555',
+                                             email='ann@example.com')
+        Stat.objects.bulk_create([
+            Stat(profile=cls.profile, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+                 event='100 Meters', performance=f'{11 + day / 100:.2f}', highlight='')
+            for day in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/admin/athletes/profile/{self.profile.pk}/change/'
+
+    @override_settings(ADMIN_INLINE_ROWS=20)
+    def test_window_and_older_rows(self):
+        response = self.client.get(self.url)
+        stats = response.context['inline_admin_formsets'][1].formset
+        latest = list(Stat.objects.order_by('-date', '-pk').values_list('pk', flat=True))
+        self.assertEqual([form.instance.pk for form in stats.initial_forms], latest[:20])
+        self.assertTrue(stats.has_older)
+        self.assertContains(response, 'Show older stats')
+
+        page = self.client.get(f'/admin/athletes/profile/{self.profile.pk}/inline-rows/stats/', {'offset': 20}).json()
+        self.assertEqual([row['id'] for row in page['results']], latest[20:])
+        self.assertEqual(page['columns'], ['Date', 'Event', 'Performance', 'Highlight'])
+        self.assertIsNone(page['next'])
+        self.assertTrue(page['edit_url'].endswith('?stats-offset=20'))
+
+        older = self.client.get(self.url, {'stats-offset': 20}).context['inline_admin_formsets'][1].formset
+        self.assertEqual([form.instance.pk for form in older.initial_forms], latest[20:])
+        self.assertEqual(self.client.get(f'/admin/athletes/profile/{self.profile.pk}/inline-rows/nope/').status_code,
+                         404)
+
+    @override_settings(ADMIN_INLINE_ROWS=20)
+    def test_saves_only_changed_rows(self):
+        response = self.client.get(self.url)
+        data = admin_form_data(response)
+        stat = response.context['inline_admin_formsets'][1].formset.initial_forms[3]
+        # Untouched rows aren't validated: their blank highlight would fail.
+        data[stat.add_prefix('performance')] = '9.99'
+        data[stat.add_prefix('highlight')] = 'Heat 2'
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Stat.objects.get(pk=stat.instance.pk).performance, '9.99')
+        updates = [q for q in queries.captured_queries
+                   if q['sql'].startswith('UPDATE "athletes_stat"') and 'performance' in q['sql']]
+        self.assertEqual(len(updates), 1)
+
+
+class ProfileAdminSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.profile = Profile.objects.create(first_name='Ann', last_name='Runner', phone='555',
+                                             email='ann@example.com')
+        Stat.objects.create(profile=cls.profile, date=datetime.date(2024, 1, 1), event='100 Meters',
+                            performance='11.50', highlight='Heat 1')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/admin/athletes/profile/{self.profile.pk}/change/'
+
+    def post_new_stats(self, count):
+        response = self.client.get(self.url)
+        data = admin_form_data(response)
+        stats = response.context['inline_admin_formsets'][1].formset
+        start = stats.initial_form_count()
+        data[f'{stats.prefix}-TOTAL_FORMS'] = start + count
+        for index in range(start, start + count):
+            data.update({
+                f'{stats.prefix}-{index}-date': '2024-02-01',
+                f'{stats.prefix}-{index}-event': '100 Meters',
+                f'{stats.prefix}-{index}-performance': f'{11 + index / 1000:.3f}',
+                f'{stats.prefix}-{index}-highlight': 'Heat',
+            })
+        existing = stats.initial_forms[0]
+        data[existing.add_prefix('performance')] = '11.40'
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        return queries.captured_queries
+
+    def test_inline_rows_are_written_in_bulk(self):
+        few = self.post_new_stats(10)
+        many = self.post_new_stats(100)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len([q for q in many if q['sql'].startswith('INSERT INTO "athletes_stat"')]), 1)
+        self.assertEqual(Stat.objects.filter(profile=self.profile).count(), 111)
+        self.assertEqual(Stat.objects.get(highlight='Heat 1').performance_value, 11.4)
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).stat_count, 111)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class BackgroundDeletionTests(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        self.profiles = [
+            Profile.objects.create(first_name=name, last_name='Runner', phone='555', email=f'{name}@example.com',
+                                   organization=self.org)
+            for name in ('ann', 'bea', 'cat')
+        ]
+        for profile, performance in zip(self.profiles, ('10.9', '11.0', '11.2')):
+            Stat.objects.create(profile=profile, date=datetime.date(2024, 1, 15), event='100 Meters',
+                                performance=performance, highlight='')
+        self.client.force_login(self.admin)
+
+    def run_jobs(self, *args):
+        call_command('run_deletion_jobs', *args, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_deleted_profile_is_hidden_at_once(self):
+        ann = self.profiles[0]
+        cursor = self.client.get('/api/v1/sync/').json()['cursor']
+        self.assertEqual(self.client.delete(f'/api/v1/profiles/{ann.pk}/').status_code, 204)
+
+        self.assertEqual(self.client.get(f'/api/v1/profiles/{ann.pk}/').status_code, 404)
+        self.assertNotIn(ann.pk, [row['id'] for row in self.client.get('/api/v1/profiles/').json()])
+        self.assertEqual(self.client.get('/api/v1/sync/', {'since': cursor}).json()['changes']['profiles'],
+                         {'upserts': [], 'deletes': [ann.pk]})
+        self.assertEqual(dict(LeaderboardEntry.objects.values_list('profile__first_name', 'rank')),
+                         {'bea': 1, 'cat': 2})
+        # Nothing is deleted until the worker runs.
+        self.assertEqual(Stat.objects.filter(profile=ann).count(), 1)
+        job = DeletionJob.objects.get()
+        self.assertEqual((job.object_id, job.status, job.requested_by), (ann.pk, DeletionJob.PENDING, self.admin))
+
+    def test_worker_deletes_profile_and_children(self):
+        ann = self.profiles[0]
+        Stat.objects.bulk_create([
+            Stat(profile=ann, date=datetime.date(2024, 2, day), event='100 Meters', performance='11.5', highlight='')
+            for day in range(1, 5)
+        ])
+        Video.objects.create(profile=ann, url='https://youtube.com/watch?v=1')
+        deletion.schedule(Athlete.objects.get(pk=ann.pk), self.admin)
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.run_jobs('--batch-size', '2')
+
+        self.assertFalse(Person.objects.filter(pk=ann.pk).exists())
+        self.assertFalse(Stat.objects.filter(profile_id=ann.pk).exists())
+        self.assertFalse(ProgressionPoint.objects.filter(profile_id=ann.pk).exists())
+        job = DeletionJob.objects.get()
+        self.assertEqual((job.status, job.processed, job.total), (DeletionJob.DONE, 6, 6))
+        # Five stats two at a time.
+        stat_deletes = [q for q in queries.captured_queries if q['sql'].startswith('DELETE FROM "athletes_stat"')]
+        self.assertEqual(len(stat_deletes), 3)
+        self.assertEqual(dict(LeaderboardEntry.objects.values_list('profile__first_name', 'rank')),
+                         {'bea': 1, 'cat': 2})
+
+    def test_worker_detaches_athletes_from_organization(self):
+        self.assertEqual(self.client.post(f'/admin/organizations/organization/{self.org.pk}/delete/',
+                                          {'post': 'yes'}).status_code, 302)
+        self.assertTrue(Organization.objects.get(pk=self.org.pk).hidden)
+        self.assertEqual(self.client.get(f'/admin/organizations/organization/{self.org.pk}/change/').status_code,
+                         302)
+        self.run_jobs('--batch-size', '2')
+
+        self.assertFalse(Organization.objects.filter(pk=self.org.pk).exists())
+        self.assertEqual(Athlete.objects.filter(organization__isnull=True).count(), 3)
+        self.assertEqual(DeletionJob.objects.get().status, DeletionJob.DONE)
+
+    def test_admin_confirmation_counts_related_rows(self):
+        response = self.client.get(f'/admin/athletes/profile/{self.profiles[0].pk}/delete/')
+        self.assertEqual(list(response.context['model_count']), [
+            ('profiles', 1), ('stats', 1), ('leaderboard entries', 1), ('progression points', 1),
+        ])
+
+    def test_failed_job_resumes(self):
+        job = deletion.schedule(self.org)
+        with mock.patch.object(Organization, 'delete', side_effect=RuntimeError('locked')):
+            self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), (DeletionJob.FAILED, 3))
+        self.assertIn('locked', job.error)
+
+        self.run_jobs()
+        self.assertEqual(DeletionJob.objects.get().status, DeletionJob.FAILED)
+        self.run_jobs('--retry-failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), (DeletionJob.DONE, 3))
+        self.assertFalse(Organization.objects.filter(pk=self.org.pk).exists())
+
+    def test_stalled_job_resumes(self):
+        stalled = deletion.schedule(self.profiles[0])
+        running = deletion.schedule(self.profiles[1])
+        long_ago = timezone.now() - datetime.timedelta(seconds=settings.DELETION_JOB_STALE_AFTER + 60)
+        DeletionJob.objects.filter(pk=stalled.pk).update(status=DeletionJob.RUNNING, started_at=long_ago,
+                                                         heartbeat_at=long_ago)
+        # Started long ago, but still working through its batches.
+        DeletionJob.objects.filter(pk=running.pk).update(status=DeletionJob.RUNNING, started_at=long_ago,
+                                                         heartbeat_at=timezone.now())
+        self.run_jobs()
+
+        stalled.refresh_from_db()
+        self.assertEqual(stalled.status, DeletionJob.DONE)
+        self.assertGreater(stalled.heartbeat_at, long_ago)
+        self.assertFalse(Person.objects.filter(pk=self.profiles[0].pk).exists())
+        # Its worker may still be at it.
+        self.assertEqual(DeletionJob.objects.get(pk=running.pk).status, DeletionJob.RUNNING)
+        self.assertTrue(Person.objects.filter(pk=self.profiles[1].pk).exists())
+        running.refresh_from_db()
+        self.assertIsNone(deletion.run(running))
+
+
+class MediaDeliveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        cls.profile = Profile.objects.create(first_name='Ann', last_name='Runner', phone='555',
+                                             email='ann@example.com')
+        Profile.objects.filter(pk=cls.profile.pk).update(profile_picture='profile_picture/ann.jpg')
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        os.makedirs(os.path.join(self.media_root, 'profile_picture'))
+        for name in ('ann.jpg', 'orphan.jpg'):
+            with open(os.path.join(self.media_root, 'profile_picture', name), 'wb') as file:
+                file.write(b'\xff\xd8\xff')
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def test_handed_to_the_web_server(self):
+        with override_settings(FILE_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/profile_picture/ann.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/profile_picture/ann.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+        with override_settings(FILE_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/profile_picture/ann.jpg')
+        self.assertEqual(response['X-Sendfile'], quote(os.path.join(self.media_root, 'profile_picture', 'ann.jpg')))
+
+        with override_settings(FILE_SENDFILE=None):
+            response = self.client.get('/media/profile_picture/ann.jpg')
+        self.assertEqual(b''.join(response.streaming_content), b'\xff\xd8\xff')
+
+    def test_non_ascii_names_are_percent_encoded(self):
+        with open(os.path.join(self.media_root, 'profile_picture', '李.jpg'), 'wb') as file:
+            file.write(b'\xff\xd8\xff')
+        Profile.objects.filter(pk=self.profile.pk).update(profile_picture='profile_picture/李.jpg')
+        with override_settings(FILE_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/profile_picture/%E6%9D%8E.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(unquote(response['X-Sendfile']), os.path.join(self.media_root, 'profile_picture', '李.jpg'))
+        self.assertTrue(response['X-Sendfile'].endswith('/profile_picture/%E6%9D%8E.jpg'))
+        with override_settings(FILE_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/profile_picture/%E6%9D%8E.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/profile_picture/%E6%9D%8E.jpg')
+
+    def test_files_without_a_visible_row_are_for_staff(self):
+        self.assertEqual(self.client.get('/media/profile_picture/orphan.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        Profile.objects.filter(pk=self.profile.pk).update(hidden=True)
+        self.assertEqual(self.client.get('/media/profile_picture/ann.jpg').status_code, 404)
+
+        self.client.force_login(self.staff)
+        with override_settings(FILE_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/profile_picture/ann.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_collectstatic_writes_compressed_siblings(self):
+        static_root = self.enterContext(tempfile.TemporaryDirectory())
+        storage = CompressedManifestStaticFilesStorage(location=static_root)
+        storage.save('app.css', ContentFile(b'body { color: red; }\n' * 100))
+        storage.save('logo.png', ContentFile(b'\x89PNG' * 100))
+        processed = list(storage.post_process({name: (storage, name) for name in ('app.css', 'logo.png')}))
+        hashed = dict((name, hashed_name) for name, hashed_name, _ in processed)['app.css']
+        self.assertRegex(hashed, r'^app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(storage.exists(hashed + '.gz'))
+        self.assertFalse(storage.exists('logo.png.gz'))
+
+        with override_settings(STATIC_ROOT=static_root, FILE_SENDFILE='x-accel-redirect'):
+            response = self.client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, br')
+            plain = self.client.get(f'/static/{hashed}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/static/{hashed}.br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(plain['X-Accel-Redirect'], f'/protected/static/{hashed}')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+
+class WarmupTests(TestCase):
+    def test_steps(self):
+        from config.wsgi import application
+
+        with self.assertLogs('config.warmup', 'INFO') as logs:
+            timings = warmup(application)
+        self.assertEqual(list(timings), ['urls', 'serializers', 'connections', 'GET /api/v1/home/'])
+        self.assertIn('GET /api/v1/home/: 200 OK', '\n'.join(logs.output))
+        self.assertIsNotNone(compiled_profiles.__dict__.get('plan'))
+
+        with override_settings(WARMUP=False):
+            self.assertEqual(warmup(application), {})
+
+    def test_failing_step_is_skipped(self):
+        with mock.patch('config.warmup.open_connections', side_effect=OSError('refused')), \
+                self.assertLogs('config.warmup', 'INFO') as logs:
+            timings = warmup()
+        self.assertEqual(list(timings), ['urls', 'serializers'])
+        self.assertIn('Warmup step connections failed', '\n'.join(logs.output))
+
+
+class RequestProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'pass')
+        cls.athlete = User.objects.create_user('athlete', 'athlete@example.com', 'pass')
+        Profile.objects.create(first_name='Ann', last_name='Runner', phone='555', email='ann@example.com')
+
+    def test_staff_profile_a_request(self):
+        token = Token.objects.create(user=self.staff)
+        response = self.client.get('/api/v1/profiles/', HTTP_X_PROFILE='1',
+                                   HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.path, profile.status, profile.trigger, profile.user),
+                         ('/api/v1/profiles/', 200, RequestProfile.STAFF, self.staff))
+        self.assertGreater(profile.sql_count, 0)
+        self.assertEqual(len(profile.sql), min(profile.sql_count, 20))
+        self.assertIn('cumulative', profile.summary)
+
+        self.client.force_login(self.staff)
+        download = self.client.get(f'/admin/api/requestprofile/{profile.pk}/download/')
+        with tempfile.NamedTemporaryFile(suffix='.prof') as file:
+            file.write(download.content)
+            file.flush()
+            stats = pstats.Stats(file.name)
+        self.assertTrue(any(function[2] == 'list' for function in stats.stats))
+        self.assertEqual(self.client.get(f'/admin/api/requestprofile/{profile.pk}/change/').status_code, 200)
+
+    def test_others_cannot(self):
+        self.client.force_login(self.athlete)
+        response = self.client.get('/api/v1/profiles/?_profile=1')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_SAMPLE_RATE=1.0, PROFILER_SLOW_MS=0, PROFILER_KEEP=2)
+    def test_sampled_requests_are_kept_in_a_ring(self):
+        for _ in range(3):
+            response = self.client.get('/api/v1/leaderboards/')
+            self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(list(RequestProfile.objects.values_list('trigger', flat=True)),
+                         [RequestProfile.SAMPLED] * 2)
+
+        with override_settings(PROFILER_SLOW_MS=60 * 1000):
+            self.client.get('/api/v1/leaderboards/')
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'pass')
+        call_command('create_groups', verbosity=0)
+        athletes = Group.objects.get(name='Athlete')
+        cls.org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        for i in range(8):
+            user = User.objects.create_user(f'ann{i}', f'ann{i}@example.com', 'pass')
+            user.groups.add(athletes)
+            profile = Profile.objects.create(user=user, first_name=f'Ann{i}', last_name='Runner', phone='555',
+                                             email=f'ann{i}@example.com', organization=cls.org)
+            Achievement.objects.create(profile=profile, emoji='🥇', achievement='State Champion')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            nplusone.fingerprint("SELECT * FROM t WHERE a = 'it''s' AND b IN (%s, %s, %s) LIMIT 21"),
+            nplusone.fingerprint("SELECT *  FROM t WHERE a = 'x' AND b IN (%s) LIMIT 1"),
+        )
+
+    def test_loops_raise_with_the_stack(self):
+        ids = list(Profile.objects.values_list('pk', flat=True))
+        with self.assertRaises(nplusone.NPlusOneError) as raised, nplusone.detect('loop', threshold=3, mode='raise'):
+            for pk in ids:
+                Profile.objects.get(pk=pk)
+        self.assertIn('api/tests.py', str(raised.exception))
+        self.assertIn('Profile.objects.get(pk=pk)', str(raised.exception))
+
+        with nplusone.detect('loop', threshold=3, mode='raise') as detector, nplusone.allow():
+            for pk in ids:
+                Profile.objects.get(pk=pk)
+        self.assertEqual(detector.found, {})
+
+    def test_reports_per_view(self):
+        ids = list(Profile.objects.values_list('pk', flat=True))
+        for _ in range(2):
+            with nplusone.detect('GET profile-list', threshold=3, mode='log') as detector:
+                for pk in ids:
+                    Profile.objects.get(pk=pk)
+            with self.assertLogs('api.nplusone', 'WARNING') if _ == 0 else self.assertNoLogs('api.nplusone'):
+                detector.report()
+        [entry] = nplusone.reports()
+        self.assertEqual((entry['view'], entry['requests'], entry['most']), ('GET profile-list', 2, len(ids)))
+
+        out = io.StringIO()
+        call_command('nplusone_report', '--clear', stdout=out)
+        self.assertIn('GET profile-list: 2 requests', out.getvalue())
+        self.assertEqual(nplusone.reports(), [])
+
+    def test_lists_have_no_n_plus_one(self):
+        # The test runner raises on N+1 queries; these pages list every row.
+        for url in ('/api/v1/profiles/', '/api/v1/athletes/', '/api/v1/organizations/', '/api/v1/home/',
+                    '/api/v1/leaderboards/'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.client.force_login(self.staff)
+        for url in ('/admin/users/user/', '/admin/athletes/profile/', '/admin/athletes/athlete/',
+                    '/admin/organizations/organization/', f'/admin/organizations/organization/{self.org.pk}/change/',
+                    '/api/v1/profiles/', '/api/v1/athletes/'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+
+class SQLBudgetTests(TestCase):
+    SLOW = ('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) '
+            'SELECT COUNT(*) FROM c')
+
+    @classmethod
+    def setUpTestData(cls):
+        org = Organization.objects.create(name='City Aquatics', phone='555', email='org@example.com')
+        Profile.objects.create(first_name='Ann', last_name='Runner', phone='555', email='ann@example.com',
+                               sport='Track', organization=org)
+        Profile.objects.create(first_name='Bea', last_name='Swimmer', phone='555', email='bea@example.com',
+                               sport='Swimming', organization=org)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    @override_settings(SQL_BUDGETS={'slow': 20})
+    def test_statements_are_interrupted(self):
+        start = time.monotonic()
+        with self.assertRaises(sqlbudget.SQLBudgetExceeded), self.assertLogs('api.sqlbudget', 'WARNING'):
+            with sqlbudget.limit('slow'), connections['default'].cursor() as cursor:
+                cursor.execute(self.SLOW)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(sqlbudget.hits(), {'slow': 1})
+        # The connection is usable, and unlimited, afterwards.
+        self.assertEqual(Profile.objects.count(), 2)
+
+        with sqlbudget.limit('unknown') as budget:
+            self.assertIsNone(budget)
+
+    def test_mysql_hint(self):
+        budget = sqlbudget.Budget('search', 300)
+        context = {'connection': mock.Mock(vendor='mysql')}
+        execute = mock.Mock()
+        budget(execute, '(SELECT a FROM t) UNION ALL (SELECT b FROM u)', (), False, context)
+        sql = execute.call_args[0][0]
+        self.assertRegex(sql, r'^\(SELECT /\*\+ MAX_EXECUTION_TIME\(\d+\) \*/ a FROM t\) UNION ALL \(SELECT b')
+        budget(execute, 'UPDATE t SET a = 1', (), False, context)
+        self.assertEqual(execute.call_args[0][0], 'UPDATE t SET a = 1')
+        self.assertTrue(budget.interrupted(OperationalError(3024, 'maximum statement execution time exceeded')))
+
+    def test_search_falls_back_to_name_prefixes(self):
+        serialize = cached_profiles.serialize
+        calls = []
+
+        def first_one_too_slow(queryset, context=None):
+            calls.append(str(queryset.query))
+            if len(calls) == 1:
+                raise sqlbudget.SQLBudgetExceeded()
+            return serialize(queryset, context)
+
+        with mock.patch.object(cached_profiles, 'serialize', side_effect=first_one_too_slow), \
+                self.assertLogs('api.sqlbudget', 'WARNING'):
+            response = self.client.get('/api/v1/search/', {'q': 'swi'})
+        self.assertEqual([row['first_name'] for row in response.json()], ['Bea'])
+        self.assertEqual(response['X-SQL-Budget'], 'search; exceeded')
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertNotIn('DISTINCT', calls[1])
+        self.assertEqual(sqlbudget.hits()['search'], 1)
+
+        with override_settings(SQL_BUDGETS={'search': 0, 'facets': 500}), self.assertLogs('api.sqlbudget', 'WARNING'):
+            response = self.client.get('/api/v1/search/', {'q': 'swi'})
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+    @override_settings(SQL_BUDGETS={'search': 300, 'facets': 0})
+    def test_facets_are_left_out(self):
+        with self.assertLogs('api.sqlbudget', 'WARNING'):
+            response = self.client.get('/api/v1/profiles/', {'facets': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['facets'])
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(response['X-SQL-Budget'], 'facets; exceeded')
+        self.assertFalse(response.has_header('Surrogate-Key'))
+
+        out = io.StringIO()
+        call_command('sql_budget_report', '--clear', stdout=out)
+        self.assertRegex(out.getvalue(), r'facets\s+0\s+1')
+        self.assertEqual(sqlbudget.hits(), {'search': 0, 'facets': 0})
+
+
+def take_tokens(path, count, queue):
+    store = throttling.FileBucketStore(path, slots=64)
+    queue.put(sum(store.take('search_anon:ip:10.0.0.1', 100, 0.001) == 0 for _ in range(count)))
+
+
+class ThrottlingTests(TestCase):
+    RATES = {'search_anon': '3/min', 'search_user': '5/min'}
+
+    def setUp(self):
+        throttling.get_store().buckets.clear()
+
+    def search(self, ip='10.0.0.1', **extra):
+        return self.client.get('/api/v1/search/', {'q': 'ab'}, REMOTE_ADDR=ip, **extra)
+
+    def test_buckets_per_ip_and_account(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': self.RATES}):
+            self.assertEqual([self.search().status_code for _ in range(4)], [200, 200, 200, 429])
+            response = self.search()
+            # One request's worth of the bucket comes back every 20 seconds.
+            self.assertEqual(response['Retry-After'], '20')
+            self.assertEqual(self.search(ip='10.0.0.2').status_code, 200)
+
+            token = Token.objects.create(user=get_user_model().objects.create_user('ann', 'ann@example.com'))
+            statuses = [self.search(HTTP_AUTHORIZATION=f'Token {token.key}').status_code for _ in range(6)]
+            self.assertEqual(statuses, [200] * 5 + [429])
+            # Views without a throttle_scope aren't throttled.
+            self.assertEqual(self.client.get('/api/v1/leaderboards/', REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    def test_clients_behind_the_edge_cache(self):
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': self.RATES, 'NUM_PROXIES': 1}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            statuses = [self.search(ip='192.0.2.1', HTTP_X_FORWARDED_FOR=f'10.0.0.{n % 2}').status_code
+                        for n in range(8)]
+            # Each client behind the edge node has its own bucket.
+            self.assertEqual(statuses, [200] * 6 + [429] * 2)
+
+            self.assertEqual(throttling.check_num_proxies(None), [])
+            with override_settings(EDGE_CACHE_PURGE_URL='https://edge.example.com/purge'):
+                self.assertEqual(throttling.check_num_proxies(None), [])
+        with override_settings(EDGE_CACHE_PURGE_URL='https://edge.example.com/purge',
+                               REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 0}):
+            self.assertEqual([error.id for error in throttling.check_num_proxies(None)], ['api.E001'])
+
+    def test_refill(self):
+        store = throttling.LocMemBucketStore()
+        self.assertEqual([store.take('k', 2, 0.5, now=100) for _ in range(3)], [0, 0, 2])
+        self.assertEqual(store.take('k', 2, 0.5, now=101), 1)
+        self.assertEqual(store.take('k', 2, 0.5, now=102), 0)
+        # A bucket never holds more than its capacity.
+        self.assertEqual([store.take('k', 2, 0.5, now=1000) for _ in range(3)], [0, 0, 2])
+
+    def test_file_buckets_are_shared_between_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets')
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            workers = [context.Process(target=take_tokens, args=(path, 40, queue)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            allowed = sum(queue.get(timeout=30) for _ in workers)
+            for worker in workers:
+                worker.join()
+            self.assertEqual(allowed, 100)
+
+            store = throttling.FileBucketStore(path, slots=64)
+            self.assertGreater(store.take('search_anon:ip:10.0.0.1', 100, 0.001), 0)
+            self.assertEqual(store.take('search_anon:ip:10.0.0.2', 100, 0.001), 0)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_drf(self):
+        data = {
+            'name': 'Zoë 🏊', 'separators': 'a\u2028b\u2029c', 'none': None, 'flag': True,
+            'float': 1.5, 'decimal': decimal.Decimal('9.80'), 1: 'int key',
+            'date': datetime.date(2024, 1, 15), 'at': datetime.datetime(2024, 1, 15, 8, 30, 0, 123000),
+            'nested': [{'a': [1, 2.25, None]}, ()],
+        }
+        expected = JSONRenderer().render(data)
+        # ... by way of orjson, not the fallback.
+        with mock.patch.object(JSONRenderer, 'render', side_effect=AssertionError):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+        # Wider than orjson's 64 bits: rendered by the stdlib.
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), JSONRenderer().render({'big': 2 ** 70}))
+        self.assertEqual(FastJSONRenderer().render([]), JSONRenderer().render([]))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_non_finite_floats_are_refused(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            data = {'results': [{'value': value, 'other': None}]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    CODECS = [('zstd', bytes), ('br', bytes), ('gzip', bytes)]
+    BODY = b'{"results": [' + b'{"first_name": "Ann", "last_name": "Runner"},' * 100 + b'{}]}'
+
+    def negotiate(self, header):
+        codec = negotiate_encoding(header, self.CODECS)
+        return codec[0] if codec else None
+
+    def test_negotiation(self):
+        self.assertEqual(self.negotiate('gzip, br'), 'br')
+        self.assertEqual(self.negotiate('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertIsNone(self.negotiate('gzip;q=0'))
+        self.assertIsNone(self.negotiate('identity'))
+        self.assertIsNone(self.negotiate(''))
+        # The wildcard covers what isn't named, and q=0 turns a coding off.
+        self.assertEqual(self.negotiate('*'), 'zstd')
+        self.assertEqual(self.negotiate('zstd;q=0, *'), 'br')
+        self.assertEqual(self.negotiate('*;q=0.5, gzip'), 'gzip')
+        self.assertIsNone(self.negotiate('*;q=0'))
+
+    def respond(self, content, accept='gzip', **headers):
+        response = HttpResponse(content, content_type=headers.pop('content_type', 'application/json'))
+        for name, value in headers.items():
+            response[name] = value
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_large_bodies(self):
+        response = self.respond(self.BODY, ETag='"abc"')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        # A strong ETag no longer names these bytes; a weak one still does.
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(self.respond(self.BODY, ETag='W/"abc"')['ETag'], 'W/"abc"')
+
+    def test_leaves_alone(self):
+        with self.settings(RESPONSE_COMPRESSION_MIN_SIZE=len(self.BODY) + 1):
+            small = self.respond(self.BODY)
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertEqual(small.content, self.BODY)
+
+        for content_type in ('image/png', 'video/mp4', 'application/zip'):
+            response = self.respond(self.BODY, content_type=content_type)
+            self.assertFalse(response.has_header('Content-Encoding'), content_type)
+        self.assertFalse(self.respond(self.BODY, accept='gzip;q=0').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(self.BODY, accept='').has_header('Content-Encoding'))
@@ -0,0 +1,176 @@
+"""
+Token-bucket throttling for the public read endpoints.
+
+A view names its limits with ``throttle_scope``; ``TokenBucketThrottle``
+(in DEFAULT_THROTTLE_CLASSES) then looks up the DEFAULT_THROTTLE_RATES
+``<scope>_anon``, for a bucket per client IP, and ``<scope>_user``, for
+a bucket per signed-in account (token or session). A rate of ``N/period``
+is a bucket of N requests refilled at N per period: bursts up to N go
+through, sustained traffic is held to the rate. Over it, DRF answers 429
+with ``Retry-After`` set to when the next request will go through. A
+scope without a rate isn't throttled.
+
+Behind the edge cache, REMOTE_ADDR is the edge node's: NUM_PROXIES must
+say how many proxies to look past in X-Forwarded-For, or every client
+behind a node shares one bucket. ``check_num_proxies`` makes that an
+error at startup.
+
+Buckets live in the THROTTLE_STORE:
+
+* ``FileBucketStore`` shares them between the application processes
+  Passenger runs: a fixed table of THROTTLE_FILE_SLOTS records in
+  THROTTLE_FILE, each updated under a lock on its own bytes;
+* ``LocMemBucketStore`` keeps them in the process (tests, development).
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+# Buckets LocMemBucketStore keeps before starting over
+LOCMEM_MAX_BUCKETS = 10000
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+_store = None
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 60): DRF's rate strings, the period by its first letter."""
+    requests, period = rate.split('/')
+    return int(requests), PERIODS[period[0]]
+
+
+def take(tokens, stamp, now, capacity, rate):
+    """
+    Refill a bucket holding ``tokens`` at ``stamp`` up to ``now`` and take
+    one token. Returns (tokens left, seconds to wait): the wait is 0 when
+    the token was there.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class LocMemBucketStore:
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            if len(self.buckets) >= LOCMEM_MAX_BUCKETS and key not in self.buckets:
+                # Forgetting errs on letting requests through.
+                self.buckets.clear()
+            tokens, stamp = self.buckets.get(key, (capacity, now))
+            tokens, wait = take(tokens, stamp, now, capacity, rate)
+            self.buckets[key] = (tokens, now)
+        return wait
+
+
+class FileBucketStore:
+    # Key digest, tokens, time of the last update
+    RECORD = struct.Struct('<8sdd')
+
+    def __init__(self, path=None, slots=None):
+        if fcntl is None:
+            raise ImproperlyConfigured('FileBucketStore needs fcntl (POSIX record locks).')
+        self.path = str(path or settings.THROTTLE_FILE)
+        self.slots = slots or settings.THROTTLE_FILE_SLOTS
+        self.fd = None
+        # Record locks exclude other processes, not other threads.
+        self.lock = threading.Lock()
+
+    def open(self):
+        if self.fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            size = self.slots * self.RECORD.size
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.fd = fd
+        return self.fd
+
+    def take(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        offset = int.from_bytes(digest, 'little') % self.slots * self.RECORD.size
+        with self.lock:
+            fd = self.open()
+            fcntl.lockf(fd, fcntl.LOCK_EX, self.RECORD.size, offset)
+            try:
+                owner, tokens, stamp = self.RECORD.unpack(os.pread(fd, self.RECORD.size, offset))
+                if owner != digest:
+                    # An empty slot, or another key's: it starts as a full bucket.
+                    tokens, stamp = capacity, now
+                tokens, wait = take(tokens, stamp, now, capacity, rate)
+                os.pwrite(fd, self.RECORD.pack(digest, tokens, now), offset)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, self.RECORD.size, offset)
+        return wait
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.THROTTLE_STORE)()
+    return _store
+
+
+@receiver(setting_changed)
+def _reset_store(setting, **kwargs):
+    global _store
+    if setting in ('THROTTLE_STORE', 'THROTTLE_FILE', 'THROTTLE_FILE_SLOTS'):
+        _store = None
+
+
+def check_num_proxies(app_configs, **kwargs):
+    if settings.EDGE_CACHE_PURGE_URL and not api_settings.NUM_PROXIES:
+        return [checks.Error(
+            'NUM_PROXIES is 0 behind the edge cache: every client behind an edge node shares one throttling bucket.',
+            hint="Set REST_FRAMEWORK['NUM_PROXIES'] (the NUM_PROXIES environment variable) to the number of "
+                 'proxies in front of the application.',
+            id='api.E001',
+        )]
+    return []
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            scope, ident = f'{scope}_user', f'user:{user.pk}'
+        else:
+            scope, ident = f'{scope}_anon', f'ip:{self.get_ident(request)}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        self.wait_seconds = get_store().take(f'{scope}:{ident}', capacity, capacity / period)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,236 @@
+"""
+Read-only fast path for the list endpoints.
+
+DRF spends most of a large list response walking every field of every
+instance through ``to_representation``. ``CompiledSerializer`` inspects a
+ModelSerializer once, works out which ``.values()`` lookups feed each
+field, and then builds the output dicts straight from the rows. Nested
+``many=True`` serializers are filled from one grouped query per child
+model instead of one query per parent; with ``child_limit`` in the context
+each parent only gets its latest children, cut in SQL with a window
+function rather than after loading them all.
+
+The output is meant to be byte-for-byte what the wrapped serializer
+produces (see the parity tests in ``api/tests.py``), so only field types
+we know how to reproduce are accepted; anything else is rejected when the
+serializer is compiled rather than silently rendered differently.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from home.serializers import HighlightSerializer
+
+from .serializers import (AchievementSerializer, AthleteSerializer, OrganizationSerializer, ProfileSerializer,
+                          SchoolSerializer, StatSerializer, VideoSerializer)
+
+# Field types whose to_representation is the identity for values coming
+# out of the database driver.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+# Field types we hand back to DRF for formatting (bound field instances
+# are reused, so the configured formats are honoured).
+FORMATTED_FIELDS = (
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.TimeField,
+)
+
+CHILD_CHUNK_SIZE = 500
+
+# How a planned field turns its column value into the representation.
+PLAIN, FUNC, FILE, CHILDREN = range(4)
+
+
+class CompiledSerializer:
+    """
+    Wraps a ModelSerializer class and serializes querysets from ``.values()``.
+
+    ``overrides`` maps a field name to ``(lookup, func)`` for fields whose
+    value can't be read from a column directly; ``func`` receives the
+    looked-up value and returns the representation. ``latest`` maps a
+    nested field to the ordering, newest first, of its children when only
+    the latest ``context['child_limit']`` are wanted (``-pk`` by default).
+    Compilation happens on first use, so instances can be created at
+    import time.
+    """
+
+    def __init__(self, serializer_class, overrides=None, latest=None):
+        self.serializer_class = serializer_class
+        self.overrides = overrides or {}
+        self.latest = latest or {}
+        self.model = serializer_class.Meta.model
+
+    @cached_property
+    def plan(self):
+        opts = self.model._meta
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+
+            source_attrs = field.source_attrs
+            # DRF drops the key entirely when an intermediate relation is
+            # missing (e.g. organization.name on an athlete with no
+            # organization); remember which column tells us that.
+            guard = source_attrs[0] if len(source_attrs) > 1 else None
+
+            if name in self.overrides:
+                lookup, func = self.overrides[name]
+                plan.append((name, lookup, FUNC, func, guard))
+            elif isinstance(field, serializers.ListSerializer):
+                plan.append((name, opts.pk.attname, CHILDREN, self._compile_child(name, opts, field), None))
+            elif isinstance(field, serializers.FileField):
+                storage = opts.get_field(field.source).storage
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                plan.append((name, field.source, FILE, (storage, use_url), guard))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                plan.append((name, field.source, PLAIN, None, guard))
+            elif isinstance(field, FORMATTED_FIELDS):
+                plan.append((name, '__'.join(source_attrs), FUNC, field.to_representation, guard))
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                plan.append((name, '__'.join(source_attrs), PLAIN, None, guard))
+            else:
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name}: {type(field).__name__} '
+                    f'is not supported by CompiledSerializer'
+                )
+
+        return plan
+
+    @cached_property
+    def lookups(self):
+        return list(dict.fromkeys(
+            [lookup for _, lookup, _, _, _ in self.plan]
+            + [guard for *_, guard in self.plan if guard]
+        ))
+
+    def _compile_child(self, name, opts, field):
+        rel = opts.get_field(field.source)
+        child = CompiledSerializer(type(field.child))
+        fk = rel.field.attname
+        if fk not in child.lookups:
+            child.lookups.append(fk)
+        return child, rel.related_model, fk, self.latest.get(name, ['-pk'])
+
+    def _bind(self, rows, context):
+        """Resolve request-dependent converters and fetch nested children."""
+        request = (context or {}).get('request')
+        limit = (context or {}).get('child_limit')
+        plan = []
+        for name, lookup, kind, arg, guard in self.plan:
+            if kind == FILE:
+                storage, use_url = arg
+                if not use_url:
+                    func = str
+                elif request is not None:
+                    func = lambda value, url=storage.url: request.build_absolute_uri(url(value))
+                else:
+                    func = storage.url
+                plan.append((name, lookup, FILE, func, guard))
+            elif kind == CHILDREN:
+                child, model, fk, latest = arg
+                parent_ids = [row[lookup] for row in rows]
+                if limit is None:
+                    groups = child.grouped(model, fk, parent_ids, context)
+                else:
+                    groups = child.grouped_latest(model, fk, parent_ids, limit, latest, context)
+                plan.append((name, lookup, CHILDREN, groups, guard))
+            else:
+                plan.append((name, lookup, kind, arg, guard))
+        return plan
+
+    def serialize_rows(self, rows, context=None):
+        """Turn ``.values(*self.lookups)`` rows into representation dicts."""
+        plan = self._bind(rows, context)
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, kind, arg, guard in plan:
+                if guard is not None and row[guard] is None:
+                    continue
+                value = row[lookup]
+                if kind == CHILDREN:
+                    value = arg.get(value, [])
+                elif kind == FILE:
+                    value = arg(value) if value else None
+                elif kind == FUNC and value is not None:
+                    value = arg(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+    def grouped(self, model, fk, parent_ids, context=None):
+        """Serialize the children of ``parent_ids``, grouped by parent id."""
+        groups = {}
+        for start in range(0, len(parent_ids), CHILD_CHUNK_SIZE):
+            chunk = parent_ids[start:start + CHILD_CHUNK_SIZE]
+            rows = list(
+                model._default_manager.filter(**{f'{fk}__in': chunk})
+                .order_by('pk').values(*self.lookups)
+            )
+            for row, item in zip(rows, self.serialize_rows(rows, context)):
+                groups.setdefault(row[fk], []).append(item)
+        return groups
+
+    def grouped_latest(self, model, fk, parent_ids, limit, ordering, context=None):
+        """Like grouped(), keeping the first ``limit`` children of each parent by ``ordering``."""
+        groups = {}
+        if limit <= 0:
+            return groups
+        for start in range(0, len(parent_ids), CHILD_CHUNK_SIZE):
+            chunk = parent_ids[start:start + CHILD_CHUNK_SIZE]
+            rows = list(
+                model._default_manager.filter(**{f'{fk}__in': chunk})
+                .annotate(child_position=Window(RowNumber(), partition_by=F(fk), order_by=ordering))
+                .filter(child_position__lte=limit)
+                .order_by(fk, *ordering).values(*self.lookups)
+            )
+            for row, item in zip(rows, self.serialize_rows(rows, context)):
+                groups.setdefault(row[fk], []).append(item)
+        return groups
+
+    def serialize(self, queryset, context=None):
+        """Serialize a queryset of ``self.model`` like ``many=True`` would."""
+        rows = list(queryset.prefetch_related(None).values(*self.lookups))
+        return self.serialize_rows(rows, context)
+
+    def serialize_by_pk(self, pks, context=None, queryset=None):
+        """
+        Serialize the given primary keys into a {pk: representation} dict.
+        Only rows in ``queryset`` (all of them by default) are included.
+        """
+        pk = self.model._meta.pk.attname
+        lookups = self.lookups if pk in self.lookups else [*self.lookups, pk]
+        if queryset is None:
+            queryset = self.model._default_manager.all()
+        rows = list(queryset.filter(pk__in=set(pks)).values(*lookups))
+        return {row[pk]: item for row, item in zip(rows, self.serialize_rows(rows, context))}
+
+    def serialize_pks(self, pks, context=None):
+        """Serialize the given primary keys, in that order (duplicates kept)."""
+        items = self.serialize_by_pk(pks, context)
+        return [items[value] for value in pks if value in items]
+
+
+compiled_organizations = CompiledSerializer(OrganizationSerializer)
+compiled_schools = CompiledSerializer(SchoolSerializer)
+compiled_athletes = CompiledSerializer(AthleteSerializer)
+compiled_achievements = CompiledSerializer(AchievementSerializer)
+compiled_stats = CompiledSerializer(StatSerializer)
+compiled_videos = CompiledSerializer(VideoSerializer)
+compiled_highlights = CompiledSerializer(HighlightSerializer)
+# User.role() answers 'athlete' whenever the user has an Athlete row, which
+# is always the case for the user a profile (an Athlete subclass) points to.
+compiled_profiles = CompiledSerializer(ProfileSerializer, overrides={'role': ('user', lambda user_id: 'athlete')},
+                                       latest={'stats': ['-date', '-pk']})
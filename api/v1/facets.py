@@ -0,0 +1,123 @@
+"""
+Filtering athlete lists by sport, graduation year, state, school and
+organization, with the number of athletes behind every value.
+
+``FacetFilter`` narrows the list to the values asked for; a facet given
+several times (``?sport=Track&sport=Swimming``) matches any of them.
+``facet_counts()`` counts the values of every facet in one statement: a
+UNION ALL of one GROUP BY per facet. Each facet is counted with the
+selections on the other facets applied but not its own, so a client can
+still offer the sports a recruiter hasn't ticked yet.
+"""
+from django.db.models import CharField, Count, Value
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from api import sqlbudget
+
+
+class Facet:
+    def __init__(self, name, lookup, integer=False):
+        self.name = name
+        self.lookup = lookup
+        self.integer = integer
+
+    def selected(self, request):
+        values = [value for value in request.query_params.getlist(self.name) if value != '']
+        if not self.integer:
+            return values
+        try:
+            return [int(value) for value in values]
+        except ValueError:
+            raise ValidationError({self.name: 'Must be an integer.'})
+
+    def to_python(self, value):
+        return int(value) if self.integer else value
+
+
+ATHLETE_FACETS = [
+    Facet('sport', 'sport'),
+    Facet('graduation_year', 'graduation_year', integer=True),
+    Facet('state', 'organization__state'),
+    Facet('school', 'school'),
+    Facet('organization', 'organization', integer=True),
+]
+
+
+def apply_selection(queryset, selection, exclude=None):
+    for facet, values in selection.items():
+        if facet is not exclude:
+            queryset = queryset.filter(**{f'{facet.lookup}__in': values})
+    return queryset
+
+
+def facet_counts(queryset, facets, selection):
+    """
+    ``{facet name: [{'value': ..., 'count': n}, ...]}`` for ``queryset``,
+    most common values first, in a single query.
+    """
+    branches = [
+        apply_selection(queryset, selection, exclude=facet).order_by()
+        .filter(**{f'{facet.lookup}__isnull': False})
+        .annotate(facet=Value(facet.name, output_field=CharField()),
+                  value=Cast(facet.lookup, output_field=CharField()))
+        .values('facet', 'value').annotate(count=Count('pk'))
+        .values_list('facet', 'value', 'count')
+        for facet in facets
+    ]
+    counts = {facet.name: [] for facet in facets}
+    if not branches:
+        return counts
+    by_name = {facet.name: facet for facet in facets}
+    for name, value, count in branches[0].union(*branches[1:], all=True):
+        if value != '':
+            counts[name].append({'value': by_name[name].to_python(value), 'count': count})
+    for values in counts.values():
+        values.sort(key=lambda row: (-row['count'], str(row['value'])))
+    return counts
+
+
+class FacetFilter(BaseFilterBackend):
+    """
+    Narrows the list to the values picked on the view's ``facets``, and
+    leaves the queryset it started from on the view for facet_counts().
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        selection = {}
+        for facet in getattr(view, 'facets', ()):
+            values = facet.selected(request)
+            if values:
+                selection[facet] = values
+        view.facet_queryset = queryset
+        view.facet_selection = selection
+        return apply_selection(queryset, selection)
+
+
+class FacetListMixin:
+    """
+    ``?facets=1`` on a list adds the facet counts to the response, which
+    becomes ``{"results": [...], "facets": {...}}``. Counts that would take
+    longer than the 'facets' SQL budget (see api/sqlbudget.py) are left
+    out: ``"facets"`` is then null.
+    """
+    facets = ()
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not request.query_params.get('facets') or not hasattr(self, 'facet_queryset'):
+            return response
+        try:
+            with sqlbudget.limit('facets'):
+                counts = facet_counts(self.facet_queryset, self.facets, self.facet_selection)
+        except sqlbudget.SQLBudgetExceeded:
+            counts = None
+            sqlbudget.degraded(response, 'facets')
+            # Not for the edge cache (see SurrogateKeyMixin).
+            self.surrogate_keys = ()
+        if isinstance(response.data, dict):
+            response.data['facets'] = counts
+        else:
+            response.data = {'results': response.data, 'facets': counts}
+        return response
@@ -0,0 +1,113 @@
+"""
+Per-object cache of serialized representations.
+
+The same profile is serialized over and over by the profile list and
+detail views, the global search and the home page's featured section.
+``FragmentCache`` keeps each profile's representation under a key that
+embeds a per-profile version token, so assembling a response costs two
+multi-gets (versions, then fragments) and only the misses go through the
+compiled serializer.
+
+Anything that feeds a profile's representation bumps its version once the
+transaction commits (see invalidation.py): the profile row itself, the name
+of its organization and its Achievement, Stat and Video rows. The ``role``
+field is derived from ``profile.user`` alone (see compiled_profiles), so it
+only changes along with the profile row.
+
+Fragments are built without a request: file URLs are stored relative and
+made absolute for each response.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils.functional import cached_property
+
+from api.versioning import bump_versions, get_versions
+from config.db.router import primary_alias, replica_reads
+
+from .compiled import FILE, compiled_profiles
+
+
+class FragmentCache:
+    """
+    Caches what ``compiled`` produces for each primary key. Offers the same
+    serialize()/serialize_pks()/serialize_by_pk() interface as
+    CompiledSerializer, so views can use either.
+    """
+
+    def __init__(self, compiled, prefix):
+        self.compiled = compiled
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+    @cached_property
+    def url_fields(self):
+        return [name for name, _, kind, arg, _ in self.compiled.plan if kind == FILE and arg[1]]
+
+    def version_key(self, pk):
+        return f'{self.prefix}:version:{pk}'
+
+    def is_active(self):
+        # Rows read inside a transaction may never be committed.
+        return (getattr(settings, 'FRAGMENT_CACHE_ENABLED', True)
+                and not connections[primary_alias()].in_atomic_block)
+
+    def invalidate(self, pks, using=None):
+        bump_versions(self.cache, [self.version_key(pk) for pk in set(pks) if pk is not None], using)
+
+    def get_many(self, pks):
+        """Return {pk: fragment}, serializing only the pks not cached yet."""
+        cache = self.cache
+        pks = list(dict.fromkeys(pks))
+        versions = get_versions(cache, [self.version_key(pk) for pk in pks])
+        keys = {
+            pk: f'{self.prefix}:{pk}:{versions[self.version_key(pk)]}'
+            for pk in pks if self.version_key(pk) in versions
+        }
+        found = cache.get_many(list(keys.values()))
+        fragments = {pk: found[key] for pk, key in keys.items() if key in found}
+
+        misses = [pk for pk in pks if pk not in fragments]
+        if misses:
+            # From the primary: a lagging replica would file old data under
+            # the new version.
+            with replica_reads(False):
+                built = self.compiled.serialize_by_pk(misses)
+            cache.set_many(
+                {keys[pk]: item for pk, item in built.items() if pk in keys},
+                getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24),
+            )
+            fragments.update(built)
+        return fragments
+
+    def render(self, fragment, context):
+        request = (context or {}).get('request')
+        if request is None:
+            return fragment
+        item = dict(fragment)
+        for name in self.url_fields:
+            if item.get(name):
+                item[name] = request.build_absolute_uri(item[name])
+        return item
+
+    def serialize_by_pk(self, pks, context=None):
+        if not self.is_active():
+            return self.compiled.serialize_by_pk(pks, context)
+        return {pk: self.render(fragment, context) for pk, fragment in self.get_many(pks).items()}
+
+    def serialize_pks(self, pks, context=None):
+        if not self.is_active():
+            return self.compiled.serialize_pks(pks, context)
+        fragments = self.get_many(pks)
+        return [self.render(fragments[pk], context) for pk in pks if pk in fragments]
+
+    def serialize(self, queryset, context=None):
+        if not self.is_active():
+            return self.compiled.serialize(queryset, context)
+        return self.serialize_pks(list(queryset.values_list('pk', flat=True)), context)
+
+
+cached_profiles = FragmentCache(compiled_profiles, 'profile')
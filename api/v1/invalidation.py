@@ -0,0 +1,183 @@
+"""
+Works out what a write affects and tells the caches and the change log.
+
+Every write to a model the public representations are built from, whether
+through save()/delete() or a queryset update or bulk operation (see
+api/signals.py), is mapped to the profiles, organizations and pages whose
+output it changes:
+
+* Person/Athlete/Profile rows and their Achievement, Stat and Video rows
+  change that profile;
+* Organization/School rows change the organization, the organization and
+  school lists, the home page and the ``organization_name`` of their
+  athletes' profiles (only the organization itself when just its
+  ``athlete_count`` moved, see api/counters.py);
+* Highlight, SocialMedia and FeaturedAthlete rows change the home page.
+
+Changed profiles get a new fragment version (fragments.py), their
+surrogate keys purged from the edge cache (api/edgecache.py) and a change
+log entry for the mobile sync (api/changelog.py), as do the child rows,
+organizations and highlights themselves. The log entry is written in the
+transaction; the rest happens once it commits.
+"""
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+
+from api import changelog, edgecache
+from api.counters import counter_fields
+from api.signals import post_bulk_write, pre_bulk_write
+from athletes.models import Achievement, Athlete, Person, Profile, Stat, Video
+from home.models import FeaturedAthlete, Highlight, SocialMedia
+from organizations.models import Organization, School
+
+from .fragments import cached_profiles
+
+HOME_KEY = 'home'
+ORGANIZATIONS_KEY = 'orgs'
+SCHOOLS_KEY = 'schools'
+
+CHILD_KINDS = {
+    Achievement: changelog.ACHIEVEMENT,
+    Stat: changelog.STAT,
+    Video: changelog.VIDEO,
+}
+
+
+def profiles_changed(pks, using=None):
+    pks = {pk for pk in pks if pk is not None}
+    cached_profiles.invalidate(pks, using)
+    edgecache.purge([edgecache.profile_key(pk) for pk in pks], using)
+    changelog.record(changelog.PROFILE, pks, using)
+
+
+def organizations_changed(pks, using=None):
+    pks = set(pks)
+    # organization_name is part of every profile representation.
+    profile_ids = list(Profile._base_manager.using(using).filter(organization_id__in=pks).values_list('pk', flat=True))
+    cached_profiles.invalidate(profile_ids, using)
+    changelog.record(changelog.PROFILE, profile_ids, using)
+    edgecache.purge([HOME_KEY, ORGANIZATIONS_KEY, SCHOOLS_KEY, *(edgecache.org_key(pk) for pk in pks)], using)
+    changelog.record(changelog.ORGANIZATION, pks, using)
+
+
+def organization_counts_changed(pks, using=None):
+    pks = set(pks)
+    edgecache.purge([ORGANIZATIONS_KEY, SCHOOLS_KEY, *(edgecache.org_key(pk) for pk in pks)], using)
+    changelog.record(changelog.ORGANIZATION, pks, using)
+
+
+def home_changed(using=None):
+    edgecache.purge([HOME_KEY], using)
+
+
+def _child_profile_ids(model, pks, using):
+    return model._base_manager.using(using).filter(pk__in=pks).values_list('profile_id', flat=True)
+
+
+# --- Profiles ---
+
+def profile_saved(sender, instance, using=None, **kwargs):
+    profiles_changed([instance.pk], using)
+
+
+def profiles_written(sender, pks, using=None, **kwargs):
+    profiles_changed(pks, using)
+
+
+# --- Achievements, stats and videos ---
+
+def remember_profile(sender, instance, **kwargs):
+    # Without touching a deferred field; lets a save that moves the row to
+    # another profile update the old one too.
+    instance._loaded_profile_id = instance.__dict__.get('profile_id')
+
+
+def child_saved(sender, instance, using=None, **kwargs):
+    profiles_changed([instance.profile_id, getattr(instance, '_loaded_profile_id', None)], using)
+    changelog.record(CHILD_KINDS[sender], [instance.pk], using)
+    instance._loaded_profile_id = instance.profile_id
+
+
+def children_writing(sender, action, pks, using=None, **kwargs):
+    # The profiles the rows belong to before they're changed or deleted.
+    profiles_changed(_child_profile_ids(sender, pks, using), using)
+
+
+def children_written(sender, action, pks, objs, using=None, **kwargs):
+    if objs is not None:
+        profiles_changed([obj.profile_id for obj in objs], using)
+    elif action == 'update':
+        profiles_changed(_child_profile_ids(sender, pks, using), using)
+    # bulk_create() on MySQL returns no ids; the profile entries above
+    # still carry the new rows to clients.
+    changelog.record(CHILD_KINDS[sender], pks, using)
+
+
+# --- Organizations and schools ---
+
+def organization_saved(sender, instance, using=None, **kwargs):
+    # Also sent as pre_delete, while the athletes still point at it.
+    organizations_changed([instance.pk], using)
+
+
+def organizations_writing(sender, action, pks, using=None, **kwargs):
+    if action == 'delete':
+        organizations_changed(pks, using)
+
+
+def organizations_written(sender, action, pks, fields=None, using=None, **kwargs):
+    if action == 'delete':
+        return
+    if fields and set(fields) <= counter_fields(sender):
+        organization_counts_changed(pks, using)
+    else:
+        organizations_changed(pks, using)
+
+
+# --- Home page ---
+
+def home_saved(sender, using=None, **kwargs):
+    home_changed(using)
+
+
+def highlight_saved(sender, instance, using=None, **kwargs):
+    home_changed(using)
+    changelog.record(changelog.HIGHLIGHT, [instance.pk], using)
+
+
+def highlights_written(sender, pks, using=None, **kwargs):
+    home_changed(using)
+    changelog.record(changelog.HIGHLIGHT, pks, using)
+
+
+def connect_signals():
+    for model in (Person, Athlete, Profile):
+        uid = f'invalidation-{model._meta.label}'
+        post_save.connect(profile_saved, sender=model, dispatch_uid=f'{uid}-save')
+        post_delete.connect(profile_saved, sender=model, dispatch_uid=f'{uid}-delete')
+        post_bulk_write.connect(profiles_written, sender=model, dispatch_uid=f'{uid}-bulk')
+
+    for model in (Achievement, Stat, Video):
+        uid = f'invalidation-{model._meta.label}'
+        post_init.connect(remember_profile, sender=model, dispatch_uid=f'{uid}-init')
+        post_save.connect(child_saved, sender=model, dispatch_uid=f'{uid}-save')
+        post_delete.connect(child_saved, sender=model, dispatch_uid=f'{uid}-delete')
+        pre_bulk_write.connect(children_writing, sender=model, dispatch_uid=f'{uid}-pre-bulk')
+        post_bulk_write.connect(children_written, sender=model, dispatch_uid=f'{uid}-bulk')
+
+    for model in (Organization, School):
+        uid = f'invalidation-{model._meta.label}'
+        post_save.connect(organization_saved, sender=model, dispatch_uid=f'{uid}-save')
+        pre_delete.connect(organization_saved, sender=model, dispatch_uid=f'{uid}-delete')
+        pre_bulk_write.connect(organizations_writing, sender=model, dispatch_uid=f'{uid}-pre-bulk')
+        post_bulk_write.connect(organizations_written, sender=model, dispatch_uid=f'{uid}-bulk')
+
+    uid = f'invalidation-{Highlight._meta.label}'
+    post_save.connect(highlight_saved, sender=Highlight, dispatch_uid=f'{uid}-save')
+    post_delete.connect(highlight_saved, sender=Highlight, dispatch_uid=f'{uid}-delete')
+    post_bulk_write.connect(highlights_written, sender=Highlight, dispatch_uid=f'{uid}-bulk')
+
+    for model in (SocialMedia, FeaturedAthlete):
+        uid = f'invalidation-{model._meta.label}'
+        post_save.connect(home_saved, sender=model, dispatch_uid=f'{uid}-save')
+        post_delete.connect(home_saved, sender=model, dispatch_uid=f'{uid}-delete')
+        post_bulk_write.connect(home_saved, sender=model, dispatch_uid=f'{uid}-bulk')
@@ -1,8 +1,49 @@
+from django.utils.functional import cached_property
 from rest_framework import permissions
 from athletes.models import Athlete, Profile
 from organizations.models import Organization
 
 
+class RoleContext:
+    """
+    The records that decide what a user may see: the organization they own
+    and their athlete/profile rows. Each is looked up at most once per
+    request, however many views and permissions ask (see role_context).
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def _lookup(self, model, **filters):
+        if not self.user or not self.user.is_authenticated:
+            return None
+        return model.objects.filter(**filters).first()
+
+    @cached_property
+    def organization(self):
+        return self._lookup(Organization, owner=self.user)
+
+    @cached_property
+    def athlete(self):
+        return self._lookup(Athlete, user=self.user)
+
+    @cached_property
+    def profile(self):
+        return self._lookup(Profile, user=self.user)
+
+
+def role_context(user):
+    """
+    Return the RoleContext for ``user``. It lives on the user object, which
+    DRF loads once per request (and the batch endpoint shares between its
+    sub-requests).
+    """
+    context = getattr(user, '_role_context', None)
+    if context is None:
+        context = user._role_context = RoleContext(user)
+    return context
+
+
 class IsAthleteOwnerOrReadOnly(permissions.BasePermission):
     """
     - Read-Only: Anyone can view any athlete profile (public viewing)
@@ -37,7 +78,7 @@ class IsAthleteOwnerOrReadOnly(permissions.BasePermission):
         
         # Organization owner can edit athletes in their organization
         if hasattr(obj, 'organization') and obj.organization:
-            if obj.organization.owner == request.user:
+            if obj.organization.owner_id == request.user.pk:
                 return True
         
         return False
@@ -76,7 +117,7 @@ class IsOrganizationOwnerOrAdmin(permissions.BasePermission):
         
         # Organization owner can edit athletes in their organization
         if hasattr(obj, 'organization') and obj.organization:
-            if obj.organization.owner == request.user:
+            if obj.organization.owner_id == request.user.pk:
                 return True
         
         return False
@@ -93,8 +134,9 @@ class IsAuthenticatedForDashboard(permissions.BasePermission):
             return False
         
         # Check if user is an athlete or organization owner
-        is_athlete = Athlete.objects.filter(user=request.user).exists()
-        is_org_owner = Organization.objects.filter(owner=request.user).exists()
+        roles = role_context(request.user)
+        is_athlete = roles.athlete is not None
+        is_org_owner = roles.organization is not None
         
         return is_athlete or is_org_owner or request.user.is_staff
 
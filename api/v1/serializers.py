@@ -63,6 +63,9 @@ class ProfileSerializer(serializers.ModelSerializer):
                   'achievements',
                   'stats',
                   'videos',
+                  'achievement_count',
+                  'stat_count',
+                  'video_count',
                   'profile_picture',
                   'banner',
                   'youtube',
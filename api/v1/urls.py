@@ -7,7 +7,8 @@ from rest_framework.routers import DefaultRouter
 # Import your views from the v1/views folder
 from .views import (AppHomeView, GlobalSearchView, AthleteViewSet, ProfileViewSet, 
                     OrganizationViewSet, SchoolViewSet, AchievementViewSet, 
-                    StatViewSet, VideoViewSet)
+                    StatViewSet, VideoViewSet, SyncView, BatchView, LeaderboardListView,
+                    LeaderboardView)
 
 # --- Router Setup for ViewSets ---
 # Routers automatically create URLs like /athletes/, /athletes/5/, etc.
@@ -28,6 +29,16 @@ urlpatterns = [
     # Accessible via: /api/search/?q=soccer
     path('search/', GlobalSearchView.as_view(), name='global-search'),
 
+    # Event leaderboards: /api/v1/leaderboards/100m/?state=TX
+    path('leaderboards/', LeaderboardListView.as_view(), name='leaderboards'),
+    path('leaderboards/<slug:event>/', LeaderboardView.as_view(), name='leaderboard'),
+
+    # Delta sync for the mobile app: /api/v1/sync/?since=<cursor>
+    path('sync/', SyncView.as_view(), name='sync'),
+
+    # Several GET requests in one round trip: /api/v1/batch/
+    path('batch/', BatchView.as_view(), name='batch'),
+
     # 2. The ViewSet Endpoints (generated by router)
     path('', include(router.urls)),
 ]
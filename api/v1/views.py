@@ -1,24 +1,140 @@
+import hashlib
+import time
+
 from django.shortcuts import render
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from rest_framework.exceptions import ValidationError
-from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.pagination import CursorPagination
+from django.db.models import Count, Max, Q
 from organizations.models import Organization, School
-from athletes.models import Athlete, Profile, Achievement, Stat, Video
+from athletes.models import Athlete, LeaderboardEntry, Profile, Achievement, Stat, Video
+from athletes.performance import event_key
 from .serializers import (OrganizationSerializer, SchoolSerializer, AthleteSerializer, 
                           ProfileSerializer, AchievementSerializer, StatSerializer, VideoSerializer)
+from .compiled import (compiled_achievements, compiled_athletes, compiled_highlights, compiled_organizations,
+                       compiled_profiles, compiled_schools, compiled_stats, compiled_videos)
+from .facets import ATHLETE_FACETS, FacetFilter, FacetListMixin
+from .fragments import cached_profiles
+from .invalidation import HOME_KEY, ORGANIZATIONS_KEY, SCHOOLS_KEY
 from home.models import FeaturedAthlete, Highlight, SocialMedia
 from home.serializers import HighlightSerializer, SocialMediaSerializer
-from .permissions import IsAthleteOwnerOrReadOnly, IsOrganizationOwnerOrAdmin, IsAuthenticatedForDashboard, IsProfileOwner
+from api import changelog, deletion, progression, sqlbudget
+from api.edgecache import add_surrogate_keys, leaderboard_key, org_key, profile_key
+from api.leaderboards import LEADERBOARDS_KEY, better
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from urllib.parse import urlsplit
+from .permissions import (IsAthleteOwnerOrReadOnly, IsOrganizationOwnerOrAdmin, IsAuthenticatedForDashboard,
+                          IsProfileOwner, role_context)
 
 # Create your views here.
+class CompiledListMixin:
+    """
+    Serve list() from a CompiledSerializer (see compiled.py) instead of
+    running every row through the DRF serializer. Writes and detail views
+    keep using serializer_class.
+    """
+    compiled_serializer = None
+
+    def get_compiled_serializer(self):
+        return self.compiled_serializer
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        context = self.get_serializer_context()
+        compiled = self.get_compiled_serializer()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = compiled.serialize_pks([obj.pk for obj in page], context)
+            return self.get_paginated_response(data)
+
+        return Response(compiled.serialize(queryset, context))
+
+
+class SurrogateKeyMixin:
+    """
+    Name the objects in list and detail responses with surrogate keys, so
+    the edge cache can be purged precisely (see api/edgecache.py).
+    """
+    list_surrogate_key = None
+    surrogate_keys = ()
+
+    def get_surrogate_keys(self, obj):
+        return [org_key(obj.pk)]
+
+    def list(self, request, *args, **kwargs):
+        if self.list_surrogate_key:
+            self.surrogate_keys = [self.list_surrogate_key]
+        return super().list(request, *args, **kwargs)
+
+    def get_object(self):
+        obj = super().get_object()
+        self.surrogate_keys = self.get_surrogate_keys(obj)
+        return obj
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.surrogate_keys:
+            add_surrogate_keys(response, self.surrogate_keys)
+        return response
+
+
+class BackgroundDeleteMixin:
+    """
+    Leave out the rows waiting for a background delete, and hand destroy()
+    to it (see api/deletion.py).
+    """
+
+    def filter_queryset(self, queryset):
+        return super().filter_queryset(queryset.filter(hidden=False))
+
+    def perform_destroy(self, instance):
+        deletion.schedule(instance, self.request.user)
+
+
+class CountFilter(BaseFilterBackend):
+    """
+    ``?min_<field>=N`` keeps the rows whose denormalized count (listed in
+    the view's ``count_fields``, see api/counters.py) is at least N.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for field in getattr(view, 'count_fields', ()):
+            value = request.query_params.get(f'min_{field}')
+            if value is None:
+                continue
+            try:
+                queryset = queryset.filter(**{f'{field}__gte': int(value)})
+            except ValueError:
+                raise ValidationError({f'min_{field}': 'Must be an integer.'})
+        return queryset
+
+
+class ChildCursorPagination(CursorPagination):
+    """Pages of a profile's stats, achievements or videos, newest first."""
+    page_size = settings.PROFILE_CHILDREN_PAGE_SIZE
+    max_page_size = settings.PROFILE_CHILDREN_MAX_PAGE_SIZE
+    page_size_query_param = 'limit'
+
+
 # --- Standard CRUD ViewSets ---
-class OrganizationViewSet(viewsets.ModelViewSet):
+class OrganizationViewSet(SurrogateKeyMixin, BackgroundDeleteMixin, CompiledListMixin, viewsets.ModelViewSet):
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
+    compiled_serializer = compiled_organizations
+    list_surrogate_key = ORGANIZATIONS_KEY
     permission_classes = [IsOrganizationOwnerOrAdmin]
+    filter_backends = [CountFilter, OrderingFilter]
+    count_fields = ['athlete_count']
+    ordering_fields = ['name', 'created_at', 'athlete_count']
 
     def get_queryset(self):
         """
@@ -34,21 +150,29 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             return Organization.objects.all()
         
         # Check if user is an organization owner
-        try:
-            org = Organization.objects.get(owner=user)
+        org = role_context(user).organization
+        if org is not None:
             return Organization.objects.filter(id=org.id)
-        except Organization.DoesNotExist:
-            # Not an owner - still show all for reference
-            return Organization.objects.all()
 
-class SchoolViewSet(viewsets.ModelViewSet):
+        # Not an owner - still show all for reference
+        return Organization.objects.all()
+
+class SchoolViewSet(SurrogateKeyMixin, BackgroundDeleteMixin, CompiledListMixin, viewsets.ModelViewSet):
     queryset = School.objects.all()
     serializer_class = SchoolSerializer
+    compiled_serializer = compiled_schools
+    list_surrogate_key = SCHOOLS_KEY
+    filter_backends = [CountFilter, OrderingFilter]
+    count_fields = ['athlete_count']
+    ordering_fields = ['name', 'created_at', 'athlete_count']
 
-class AthleteViewSet(viewsets.ModelViewSet):
+class AthleteViewSet(BackgroundDeleteMixin, FacetListMixin, CompiledListMixin, viewsets.ModelViewSet):
     queryset = Athlete.objects.all()
     serializer_class = AthleteSerializer
+    compiled_serializer = compiled_athletes
     permission_classes = [IsOrganizationOwnerOrAdmin]
+    filter_backends = [FacetFilter]
+    facets = ATHLETE_FACETS
 
     def get_queryset(self):
         """
@@ -66,20 +190,15 @@ class AthleteViewSet(viewsets.ModelViewSet):
         
         # For authenticated users, apply filtering based on role
         # Check if user is an athlete
-        try:
-            athlete = Athlete.objects.get(user=user)
+        roles = role_context(user)
+        if roles.athlete is not None:
             # Return only this athlete
-            return Athlete.objects.filter(id=athlete.id)
-        except Athlete.DoesNotExist:
-            pass
+            return Athlete.objects.filter(id=roles.athlete.id)
         
         # Check if user is an organization owner
-        try:
-            org = Organization.objects.get(owner=user)
+        if roles.organization is not None:
             # Return athletes in this organization
-            return Athlete.objects.filter(organization=org)
-        except Organization.DoesNotExist:
-            pass
+            return Athlete.objects.filter(organization=roles.organization)
 
         # Admin sees all athletes
         if user.is_staff:
@@ -88,10 +207,89 @@ class AthleteViewSet(viewsets.ModelViewSet):
         # Authenticated user with no role - return empty queryset
         return Athlete.objects.none()
 
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(SurrogateKeyMixin, BackgroundDeleteMixin, FacetListMixin, CompiledListMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
+    compiled_serializer = cached_profiles
     permission_classes = [IsAthleteOwnerOrReadOnly]
+    throttle_scope = 'profiles'
+    filter_backends = [CountFilter, FacetFilter, OrderingFilter]
+    facets = ATHLETE_FACETS
+    count_fields = ['achievement_count', 'stat_count', 'video_count']
+    ordering_fields = ['last_name', 'graduation_year', 'achievement_count', 'stat_count', 'video_count']
+
+    def get_surrogate_keys(self, obj):
+        # organization_name comes from the organization.
+        keys = [profile_key(obj.pk)]
+        if obj.organization_id:
+            keys.append(org_key(obj.organization_id))
+        return keys
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        preview = self.request.query_params.get('preview')
+        if preview is not None:
+            try:
+                context['child_limit'] = min(max(int(preview), 0), settings.PROFILE_PREVIEW_MAX)
+            except ValueError:
+                raise ValidationError({'preview': 'Must be an integer.'})
+        return context
+
+    def get_compiled_serializer(self):
+        # Previews aren't cached: they'd need a fragment per length.
+        if 'preview' in self.request.query_params:
+            return compiled_profiles
+        return cached_profiles
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        data = self.get_compiled_serializer().serialize_pks([instance.pk], self.get_serializer_context())
+        if not data:
+            # Deleted or hidden since get_object().
+            raise Http404
+        return Response(data[0])
+
+    def list_children(self, queryset, compiled, ordering):
+        profile = self.get_object()
+        paginator = ChildCursorPagination()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(queryset.filter(profile=profile), self.request, view=self)
+        return paginator.get_paginated_response(compiled.serialize_pks([obj.pk for obj in page]))
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """GET /api/v1/profiles/<id>/stats/ - newest first, by (date, id)."""
+        return self.list_children(Stat.objects.all(), compiled_stats, ('-date', '-id'))
+
+    @action(detail=True)
+    def achievements(self, request, pk=None):
+        """GET /api/v1/profiles/<id>/achievements/ - newest first."""
+        return self.list_children(Achievement.objects.all(), compiled_achievements, ('-id',))
+
+    @action(detail=True)
+    def videos(self, request, pk=None):
+        """GET /api/v1/profiles/<id>/videos/ - newest first."""
+        return self.list_children(Video.objects.all(), compiled_videos, ('-id',))
+
+    @action(detail=True)
+    def progression(self, request, pk=None):
+        """
+        GET /api/v1/profiles/<id>/progression/[?event=<event>][&points=<n>]
+
+        The athlete's best mark per day in each event (or just ``event``),
+        with personal and season bests. Series longer than ``points``
+        (default PROGRESSION_MAX_POINTS) are downsampled.
+        """
+        instance = self.get_object()
+        try:
+            points = int(request.GET.get('points', settings.PROGRESSION_MAX_POINTS))
+        except ValueError:
+            raise ValidationError("'points' must be an integer.")
+        if points < 2:
+            raise ValidationError("'points' must be at least 2.")
+        points = min(points, settings.PROGRESSION_MAX_POINTS)
+        event = event_key(request.GET['event']) if request.GET.get('event') else None
+        return Response({'profile': instance.pk, 'events': progression.series(instance.pk, event, points)})
 
     def get_queryset(self):
         """
@@ -109,24 +307,19 @@ class ProfileViewSet(viewsets.ModelViewSet):
             return Profile.objects.all()
         
         # Check if user is an organization owner
-        try:
-            org = Organization.objects.get(owner=user)
+        roles = role_context(user)
+        if roles.organization is not None:
             # Return profiles of athletes in this organization
-            return Profile.objects.filter(organization=org)
-        except Organization.DoesNotExist:
-            pass
+            return Profile.objects.filter(organization=roles.organization)
 
         # Admin sees all profiles
         if user.is_staff:
             return Profile.objects.all()
         
         # Check if user is an athlete (Profile is multi-table inherit from Athlete)
-        try:
-            profile = Profile.objects.get(user=user)
+        if roles.profile is not None:
             # Return only this profile
-            return Profile.objects.filter(id=profile.id)
-        except Profile.DoesNotExist:
-            pass
+            return Profile.objects.filter(id=roles.profile.id)
         
         # Authenticated user with no role - return empty queryset
         return Profile.objects.none()
@@ -134,21 +327,20 @@ class ProfileViewSet(viewsets.ModelViewSet):
 # --- The App Home API ---
 class AppHomeView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'home'
 
     def get(self, request):
-        # 1. Optimized Featured Athletes
-        # We follow the relationship from FeaturedAthlete -> Athlete -> User/Organization
-        featured_entries = FeaturedAthlete.objects.filter(active=True).select_related(
-            'athlete__user',          # To get first/last name
-            'athlete__organization'   # To get the school/org name
-        ).order_by('order')[:5]
-        featured_athletes = [fe.athlete for fe in featured_entries]
+        # 1. Featured Athletes
+        # Only the ids are needed here; the compiled serializer fetches the
+        # profile rows (and their stats/achievements/videos) in bulk.
+        featured_ids = list(FeaturedAthlete.objects.filter(active=True, athlete__hidden=False).order_by('order')
+                            .values_list('athlete_id', flat=True)[:5])
 
         # 2. Schools (Usually simple, but order_by is good)
-        top_schools = School.objects.all().order_by('name')[:3]
+        top_schools = School.objects.filter(hidden=False).order_by('name')[:3]
 
         # 3. Organizations
-        recent_orgs = Organization.objects.exclude(school__isnull=False).select_related(
+        recent_orgs = Organization.objects.filter(hidden=False).exclude(school__isnull=False).select_related(
             'owner'  # If the serializer shows owner info
         ).order_by('-id')[:3]
 
@@ -161,40 +353,310 @@ class AppHomeView(APIView):
         socialmedia = SocialMedia.objects.all().order_by('platform')
 
         # --- SERIALIZATION ---
+        context = {"request": request}
         payload = {
             "banner_message": "Welcome to the Athlete Portal",
-            "featured_athletes": ProfileSerializer(featured_athletes, many=True, context={"request": request}).data,
-            "top_schools": SchoolSerializer(top_schools, many=True, context={"request": request}).data,
-            "partner_organizations": OrganizationSerializer(recent_orgs, many=True, context={"request": request}).data,
+            "featured_athletes": cached_profiles.serialize_pks(featured_ids, context),
+            "top_schools": compiled_schools.serialize(top_schools, context),
+            "partner_organizations": compiled_organizations.serialize(recent_orgs, context),
             "recent_highlights": HighlightSerializer(highlights_qs, many=True, context={"request": request}).data,
             "social_media": SocialMediaSerializer(socialmedia, many=True, context={"request": request}).data,
         }
 
-        return Response(payload)
+        keys = [HOME_KEY]
+        keys += [profile_key(athlete["id"]) for athlete in payload["featured_athletes"]]
+        keys += [org_key(org["id"]) for org in payload["top_schools"] + payload["partner_organizations"]]
+        return add_surrogate_keys(Response(payload), keys)
 
 
 class GlobalSearchView(APIView):
+    """
+    GET /api/v1/search/?q=<text> - up to 20 profiles matching ``q``.
+
+    The search runs under the 'search' SQL budget (see api/sqlbudget.py).
+    Over it, the answer is the last result of a slow run of the same
+    search, or else the prefix matches on the names; it then carries an
+    ``X-SQL-Budget`` header.
+    """
     permission_classes = [AllowAny] # Public search
+    throttle_scope = 'search'
 
     def get(self, request):
         q = request.GET.get('q', '').strip()
         if not q or len(q) < 2:
             return Response([])
 
-        # We use select_related to grab the User and Organization 
-        # so the Serializer doesn't have to hit the DB again.
-        results = Profile.objects.select_related(
-            'user', 
-            'organization'
-        ).prefetch_related('user__groups').filter(
-            Q(first_name__icontains=q) |
-            Q(last_name__icontains=q) |
-            Q(email__icontains=q) |
-            Q(sport__icontains=q) |
-            Q(organization__name__icontains=q)
-        ).distinct()[:20]
+        key = 'search:' + hashlib.md5(q.lower().encode()).hexdigest()
+        start = time.monotonic()
+        try:
+            with sqlbudget.limit('search') as budget:
+                # Profiles come from the fragment cache (serialized in bulk on a miss),
+                # so no select/prefetch_related is needed.
+                data = cached_profiles.serialize(Profile.objects.filter(
+                    Q(first_name__icontains=q) |
+                    Q(last_name__icontains=q) |
+                    Q(email__icontains=q) |
+                    Q(sport__icontains=q) |
+                    Q(organization__name__icontains=q),
+                    hidden=False,
+                ).distinct()[:20])
+        except sqlbudget.SQLBudgetExceeded:
+            return sqlbudget.degraded(Response(self.over_budget(q, key)), 'search')
+
+        # Searches that came close to the budget are kept for when it runs out.
+        if budget is not None and (time.monotonic() - start) * 1000 > budget.ms / 2:
+            cache.set(key, data, settings.SEARCH_CACHE_TIMEOUT)
+        return Response(data)
+
+    def over_budget(self, q, key):
+        data = cache.get(key)
+        if data is not None:
+            return data
+        try:
+            with sqlbudget.limit('search'):
+                # Prefix matches on the indexed name columns: no join, no DISTINCT.
+                return cached_profiles.serialize(Profile.objects.filter(
+                    Q(last_name__istartswith=q) | Q(first_name__istartswith=q), hidden=False,
+                )[:20])
+        except sqlbudget.SQLBudgetExceeded:
+            return []
+
+
+class LeaderboardListView(APIView):
+    """
+    The events that have a leaderboard, biggest first.
 
-        return Response(ProfileSerializer(results, many=True).data)
+    GET /api/v1/leaderboards/[?sport=<sport>]
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        entries = LeaderboardEntry.objects.all()
+        if request.GET.get('sport'):
+            entries = entries.filter(sport=request.GET['sport'])
+        events = (entries.values('event_key', 'lower_is_better').annotate(athletes=Count('pk'))
+                  .order_by('-athletes', 'event_key'))
+        payload = [
+            {'event': event['event_key'], 'lower_is_better': event['lower_is_better'], 'athletes': event['athletes']}
+            for event in events
+        ]
+        return add_surrogate_keys(Response(payload), [LEADERBOARDS_KEY])
+
+
+class LeaderboardView(APIView):
+    """
+    Best mark per athlete in one event, best first.
+
+    GET /api/v1/leaderboards/<event>/[?sport=&state=&graduation_year=][&limit=&offset=]
+
+    Served from the precomputed entries (see api/leaderboards.py).
+    ``rank`` is the position on the board as filtered, ``overall_rank``
+    the position among everybody in the event; ties share a rank.
+    """
+    permission_classes = [AllowAny]
+    filter_fields = ['sport', 'state', 'graduation_year']
+
+    def get(self, request, event):
+        try:
+            limit = int(request.GET.get('limit', settings.LEADERBOARD_PAGE_SIZE))
+            offset = max(0, int(request.GET.get('offset', 0)))
+            filters = {field: request.GET[field] for field in self.filter_fields if request.GET.get(field)}
+            if 'graduation_year' in filters:
+                filters['graduation_year'] = int(filters['graduation_year'])
+        except ValueError:
+            raise ValidationError("'limit', 'offset' and 'graduation_year' must be integers.")
+        limit = max(1, min(limit, settings.LEADERBOARD_MAX_PAGE_SIZE))
+
+        entries = LeaderboardEntry.objects.filter(event_key=event)
+        lower = entries.values_list('lower_is_better', flat=True).first()
+        if lower is None:
+            raise NotFound('No leaderboard for this event.')
+
+        board = entries.filter(**filters)
+        # Unfiltered boards read the precomputed ranks straight off the index.
+        order = ['rank', 'pk'] if not filters else ['value' if lower else '-value', 'pk']
+        rows = list(board.order_by(*order).values(
+            'rank', 'value', 'sport', 'state', 'graduation_year', 'profile_id', 'profile__first_name',
+            'profile__last_name', 'profile__school', 'stat__performance', 'stat__date',
+        )[offset:offset + limit])
+
+        results = []
+        for position, row in enumerate(rows, start=offset + 1):
+            if not filters:
+                rank = row['rank']
+            elif results and row['value'] == results[-1]['value']:
+                rank = results[-1]['rank']
+            elif not results:
+                rank = board.filter(**better(row['value'], lower)).count() + 1
+            else:
+                rank = position
+            results.append({
+                'rank': rank,
+                'overall_rank': row['rank'],
+                'value': row['value'],
+                'performance': row['stat__performance'],
+                'date': row['stat__date'],
+                'profile': {
+                    'id': row['profile_id'],
+                    'first_name': row['profile__first_name'],
+                    'last_name': row['profile__last_name'],
+                    'school': row['profile__school'],
+                    'sport': row['sport'],
+                    'state': row['state'],
+                    'graduation_year': row['graduation_year'],
+                },
+            })
+
+        payload = {'event': event, 'lower_is_better': lower, 'count': board.count(), 'results': results}
+        keys = [leaderboard_key(event)] + [profile_key(result['profile']['id']) for result in results]
+        return add_surrogate_keys(Response(payload), keys)
+
+
+class SyncView(APIView):
+    """
+    Delta sync for clients that keep a local copy of the public data.
+
+    GET /api/v1/sync/?since=<cursor>[&limit=<n>]
+
+    Returns what changed after ``cursor``, grouped by collection: the
+    current representation of every object inserted or updated
+    (``upserts``) and the ids of the ones deleted or unpublished
+    (``deletes``). Follow ``cursor`` while ``has_more`` is true. Changes
+    show up SYNC_SETTLE_SECONDS after they are made (see api/changelog.py).
+
+    Without ``since``, or with a cursor from before the entries compaction
+    dropped as expired, the response has ``reset: true``: refetch the
+    collections in full and sync from the cursor returned alongside.
+    """
+    permission_classes = [AllowAny]
+
+    # change log kind -> (collection, serializer, visible rows)
+    collections = {
+        changelog.PROFILE: ('profiles', cached_profiles, Profile.objects.filter(hidden=False)),
+        changelog.STAT: ('stats', compiled_stats, None),
+        changelog.ACHIEVEMENT: ('achievements', compiled_achievements, None),
+        changelog.VIDEO: ('videos', compiled_videos, None),
+        changelog.ORGANIZATION: ('organizations', compiled_organizations, Organization.objects.filter(hidden=False)),
+        changelog.HIGHLIGHT: ('highlights', compiled_highlights, Highlight.objects.filter(published=True)),
+    }
+
+    def get(self, request):
+        try:
+            since = request.GET.get('since')
+            since = None if since is None else int(since)
+            limit = int(request.GET.get('limit', settings.SYNC_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError("'since' and 'limit' must be integers.")
+        limit = max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+
+        truncated = changelog.truncated_through()
+        if since is None or since < truncated:
+            newest = changelog.settled().aggregate(newest=Max('id'))['newest']
+            return Response({'reset': True, 'cursor': str(max(newest or 0, truncated)), 'has_more': False,
+                             'changes': {}})
+
+        entries = list(changelog.settled().filter(id__gt=since).order_by('id')
+                       .values_list('id', 'kind', 'object_id')[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        changed = {}
+        for _, kind, object_id in entries:
+            changed.setdefault(kind, {})[object_id] = None
+
+        context = {'request': request}
+        changes = {}
+        for kind, object_ids in changed.items():
+            if kind not in self.collections:
+                continue
+            name, serializer, queryset = self.collections[kind]
+            ids = list(object_ids)
+            if queryset is not None:
+                # The fragment cache serves profiles by id only.
+                visible = list(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+            current = serializer.serialize_by_pk(ids if queryset is None else visible, context)
+            changes[name] = {
+                'upserts': [current[pk] for pk in ids if pk in current],
+                'deletes': [pk for pk in ids if pk not in current],
+            }
+
+        return Response({
+            'reset': False,
+            'cursor': str(entries[-1][0] if entries else since),
+            'has_more': has_more,
+            'changes': changes,
+        })
+
+
+class BatchView(APIView):
+    """
+    Run several GET requests in one round trip.
+
+    POST /api/v1/batch/
+    {"requests": [{"path": "/api/v1/profiles/5/"}, {"path": "/api/v1/home/"}]}
+
+    Sub-requests run in process, in order, as the caller: authentication
+    happens once for the batch, and the role lookups views make (see
+    permissions.role_context) are shared between them. The result holds one
+    ``{"path", "status", "body"}`` entry per sub-request, in the same order.
+    At most ``BATCH_MAX_REQUESTS`` sub-requests are accepted.
+    """
+    permission_classes = [AllowAny]
+    # Only reads, so the database router treats it like a GET.
+    read_only = True
+
+    def post(self, request):
+        subrequests = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(subrequests, list) or not subrequests:
+            raise ValidationError({'requests': 'Expected a non-empty list of sub-requests.'})
+        if len(subrequests) > settings.BATCH_MAX_REQUESTS:
+            raise ValidationError({'requests': f'At most {settings.BATCH_MAX_REQUESTS} sub-requests are allowed.'})
+
+        paths = []
+        for sub in subrequests:
+            path = sub.get('path') if isinstance(sub, dict) else None
+            if not isinstance(path, str) or not path.startswith('/api/v1/'):
+                raise ValidationError({'requests': 'Each sub-request needs a "path" under /api/v1/.'})
+            if sub.get('method', 'GET').upper() != 'GET':
+                raise ValidationError({'requests': 'Only GET sub-requests are supported.'})
+            paths.append(path)
+
+        return Response({'responses': [self.run(request, path) for path in paths]})
+
+    def run(self, request, path):
+        url = urlsplit(path)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {'path': path, 'status': 404, 'body': {'detail': 'Not found.'}}
+        if getattr(match.func, 'view_class', None) is BatchView:
+            return {'path': path, 'status': 400, 'body': {'detail': 'Batches cannot be nested.'}}
+
+        sub = HttpRequest()
+        sub.method = 'GET'
+        sub.path = sub.path_info = url.path
+        sub.META = {
+            key: value for key, value in request.META.items()
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH')
+        }
+        sub.META.update(REQUEST_METHOD='GET', PATH_INFO=url.path, QUERY_STRING=url.query)
+        sub.GET = QueryDict(url.query)
+        sub.COOKIES = request.COOKIES
+        sub.resolver_match = match
+        sub.user = request.user
+        if request.user.is_authenticated:
+            # DRF skips its authenticators for these and uses the caller's
+            # user and token as they are.
+            sub._force_auth_user = request.user
+            sub._force_auth_token = request.auth
+
+        try:
+            response = match.func(sub, *match.args, **match.kwargs)
+        except Http404:
+            return {'path': path, 'status': 404, 'body': {'detail': 'Not found.'}}
+        body = getattr(response, 'data', None)
+        if body is None and not isinstance(response, Response):
+            body = response.content.decode(response.charset or 'utf-8')
+        return {'path': path, 'status': response.status_code, 'body': body}
 
 
 # --- Achievement, Stat, and Video ViewSets ---
@@ -217,11 +679,9 @@ class AchievementViewSet(viewsets.ModelViewSet):
         
         # For write operations, filter to only this athlete's achievements
         if user and user.is_authenticated:
-            try:
-                profile = Profile.objects.get(user=user)
+            profile = role_context(user).profile
+            if profile is not None:
                 return Achievement.objects.filter(profile=profile)
-            except Profile.DoesNotExist:
-                pass
         
         # Admin sees all
         if user and user.is_staff:
@@ -231,11 +691,10 @@ class AchievementViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Automatically associate the achievement with the authenticated user's profile"""
-        try:
-            profile = Profile.objects.get(user=self.request.user)
-            serializer.save(profile=profile)
-        except Profile.DoesNotExist:
+        profile = role_context(self.request.user).profile
+        if profile is None:
             raise ValidationError("User does not have a Profile. Please create one first.")
+        serializer.save(profile=profile)
 
 
 class StatViewSet(viewsets.ModelViewSet):
@@ -257,11 +716,9 @@ class StatViewSet(viewsets.ModelViewSet):
         
         # For write operations, filter to only this athlete's stats
         if user and user.is_authenticated:
-            try:
-                profile = Profile.objects.get(user=user)
+            profile = role_context(user).profile
+            if profile is not None:
                 return Stat.objects.filter(profile=profile)
-            except Profile.DoesNotExist:
-                pass
         
         # Admin sees all
         if user and user.is_staff:
@@ -271,11 +728,10 @@ class StatViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Automatically associate the stat with the authenticated user's profile"""
-        try:
-            profile = Profile.objects.get(user=self.request.user)
-            serializer.save(profile=profile)
-        except Profile.DoesNotExist:
+        profile = role_context(self.request.user).profile
+        if profile is None:
             raise ValidationError("User does not have a Profile. Please create one first.")
+        serializer.save(profile=profile)
 
 
 class VideoViewSet(viewsets.ModelViewSet):
@@ -297,11 +753,9 @@ class VideoViewSet(viewsets.ModelViewSet):
         
         # For write operations, filter to only this athlete's videos
         if user and user.is_authenticated:
-            try:
-                profile = Profile.objects.get(user=user)
+            profile = role_context(user).profile
+            if profile is not None:
                 return Video.objects.filter(profile=profile)
-            except Profile.DoesNotExist:
-                pass
         
         # Admin sees all
         if user and user.is_staff:
@@ -311,8 +765,7 @@ class VideoViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Automatically associate the video with the authenticated user's profile"""
-        try:
-            profile = Profile.objects.get(user=self.request.user)
-            serializer.save(profile=profile)
-        except Profile.DoesNotExist:
+        profile = role_context(self.request.user).profile
+        if profile is None:
             raise ValidationError("User does not have a Profile. Please create one first.")
+        serializer.save(profile=profile)
@@ -0,0 +1,36 @@
+"""
+Version tokens for invalidating families of cache entries at once.
+
+Entries embed the current token of whatever they were built from in their
+key; bumping the token makes all of them unreachable without having to
+find and delete them. Tokens are random rather than counters, so a token
+that was culled and recreated can never collide with one still referenced
+by an old entry, and writers in different processes never race on an
+increment.
+"""
+import uuid
+
+from django.db import transaction
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def get_versions(cache, keys):
+    """Return {key: token} for ``keys``, creating the tokens that are missing."""
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            # add() so a concurrent bump isn't overwritten.
+            cache.add(key, new_token(), None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def bump_versions(cache, keys, using=None):
+    """Give ``keys`` new tokens once the current transaction commits."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: new_token() for key in keys}, None), using=using)
@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db import router, transaction
 from django.shortcuts import redirect
 from django.urls import reverse
+
+from api.admin import (
+    BackgroundDeleteAdminMixin, LargeTableAdminMixin, RecentRowsAdminMixin, RecentRowsInlineMixin, in_group,
+)
 from .models import Profile, Athlete, Achievement, Stat, Video
 
 # Register your models here.
@@ -15,28 +20,29 @@ from .models import Profile, Athlete, Achievement, Stat, Video
 #     # Optional: Makes the organization dropdown easier to use if you have many orgs
 #     autocomplete_fields = ['organization']
 
-class AchievementInline(admin.TabularInline):
+class AchievementInline(RecentRowsInlineMixin, admin.TabularInline):
     model = Achievement
     extra = 1  # Number of empty rows to show by default
     fields = ('emoji', 'achievement')
 
-class StatInline(admin.TabularInline):
+class StatInline(RecentRowsInlineMixin, admin.TabularInline):
     model = Stat
     extra = 1  # Number of empty rows to show by default
     fields = ('date', 'event', 'performance', 'highlight')
+    recent_ordering = ('-date', '-pk')
 
-class VideoInline(admin.TabularInline):
+class VideoInline(RecentRowsInlineMixin, admin.TabularInline):
     model = Video
     extra = 1  # Number of empty rows to show by default
     fields = ('url',)
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(BackgroundDeleteAdminMixin, RecentRowsAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     # Use a custom change form template that removes breadcrumbs and object-tools
     change_form_template = 'admin/no_breadcrumb_change_form.html'
     change_list_template = 'admin/no_breadcrumb_change_list.html'
     inlines = [AchievementInline, StatInline, VideoInline]
-    list_display = ('first_name', 'last_name', 'organization', 'sport')
+    list_display = ('first_name', 'last_name', 'organization', 'sport', 'achievement_count', 'stat_count', 'video_count')
     # Don't show user/organization selection to non-superusers; auto-fill instead
     exclude = ('user', 'organization')
     search_fields = ('first_name', 'last_name', 'email')
@@ -50,7 +56,7 @@ class ProfileAdmin(admin.ModelAdmin):
             return qs
 
         # 2. Organization Owners see only athletes in their organization
-        if request.user.groups.filter(name='Organization Owner').exists():
+        if in_group(request.user, 'Organization Owner'):
             from organizations.models import Organization
             try:
                 org = Organization.objects.get(owner=request.user)
@@ -59,7 +65,7 @@ class ProfileAdmin(admin.ModelAdmin):
                 return qs.none()
         
         # 3. Athletes see only their own profile
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             try:
                 athlete = Athlete.objects.get(user=request.user)
                 return qs.filter(user=request.user)
@@ -74,7 +80,7 @@ class ProfileAdmin(admin.ModelAdmin):
         Prevent Athletes from editing sensitive fields. Organization Owners can edit most fields.
         """
         # If the user is an athlete (and not a superuser), lock these fields
-        if request.user.groups.filter(name='Athlete').exists() and not request.user.is_superuser:
+        if in_group(request.user, 'Athlete') and not request.user.is_superuser:
             return ['organization', 'user', 'email']
         return []
 
@@ -85,7 +91,7 @@ class ProfileAdmin(admin.ModelAdmin):
         """
         if request.user.is_superuser:
             return True
-        if request.user.groups.filter(name='Organization Owner').exists():
+        if in_group(request.user, 'Organization Owner'):
             return True
         return False
 
@@ -96,16 +102,16 @@ class ProfileAdmin(admin.ModelAdmin):
 
         # If no specific object (list view), only org owners may view
         if obj is None:
-            return request.user.groups.filter(name='Organization Owner').exists()
+            return in_group(request.user, 'Organization Owner')
 
         # Athletes can view their own profile
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             return False # Don't allow athletes to view via admin; they should use the API or a custom frontend.
             # return obj.user == request.user
 
         # Organization owners can view profiles in their organization
-        if request.user.groups.filter(name='Organization Owner').exists():
-            return obj.organization is not None and obj.organization.owner == request.user
+        if in_group(request.user, 'Organization Owner'):
+            return obj.organization is not None and obj.organization.owner_id == request.user.pk
 
         return False
 
@@ -116,16 +122,16 @@ class ProfileAdmin(admin.ModelAdmin):
 
         # No object provided (list/change list) - prevent athletes from accessing
         if obj is None:
-            return request.user.groups.filter(name='Organization Owner').exists()
+            return in_group(request.user, 'Organization Owner')
 
         # Athletes can change only their own profile
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             # return False  # Don't allow athletes to change via admin; they should use the API or a custom frontend.
             return obj.user == request.user
 
         # Organization owners can change profiles belonging to their org
-        if request.user.groups.filter(name='Organization Owner').exists():
-            return obj.organization is not None and obj.organization.owner == request.user
+        if in_group(request.user, 'Organization Owner'):
+            return obj.organization is not None and obj.organization.owner_id == request.user.pk
 
         return False
 
@@ -133,7 +139,7 @@ class ProfileAdmin(admin.ModelAdmin):
         """
         Athletes cannot create NEW profiles. Only Org Owners and Superusers can.
         """
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             return False
         return True
 
@@ -141,19 +147,19 @@ class ProfileAdmin(admin.ModelAdmin):
         # Athletes should never be allowed to delete via admin
         if request.user.is_superuser:
             return True
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             return False
         return super().has_delete_permission(request, obj)
 
     def get_actions(self, request):
         # Remove bulk actions for athletes
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             return {}
         return super().get_actions(request)
 
     def change_view(self, request, object_id, form_url='', extra_context=None):
         # If an athlete tries to open someone else's profile, redirect to their own
-        if request.user.groups.filter(name='Athlete').exists():
+        if in_group(request.user, 'Athlete'):
             try:
                 my_profile = Profile.objects.get(user=request.user)
                 if str(my_profile.pk) != str(object_id):
@@ -163,75 +169,60 @@ class ProfileAdmin(admin.ModelAdmin):
                 pass
         return super().change_view(request, object_id, form_url, extra_context)
 
-    # Ensure they can only add achievements to their own profile
     def save_formset(self, request, form, formset, change):
+        """
+        Write an inline's rows in bulk: deletions, inserts and updates take
+        a statement each, in one transaction.
+        """
         instances = formset.save(commit=False)
+        # Non-superusers can only add rows to their own profile.
+        owner = None
+        if not request.user.is_superuser:
+            owner = Profile.objects.filter(user=request.user).first()
+
+        fields = set()
+        for instance, changed_fields in formset.changed_objects:
+            fields.update(changed_fields)
+        new, changed = [], []
         for instance in instances:
-            # Get the user's profile (via the OneToOneField to User)
-            try:
-                user_profile = Profile.objects.get(user=request.user)
-            except Profile.DoesNotExist:
-                user_profile = None
-            
-            if isinstance(instance, Achievement):
-                # If they aren't superuser, force the profile to be theirs
-                if not request.user.is_superuser and user_profile:
-                    instance.profile = user_profile
-            elif isinstance(instance, Stat):
-                # If they aren't superuser, force the profile to be theirs
-                if not request.user.is_superuser and user_profile:
-                    instance.profile = user_profile 
-            elif isinstance(instance, Video):
-                # If they aren't superuser, force the profile to be theirs
-                if not request.user.is_superuser and user_profile:
-                    instance.profile = user_profile 
-            instance.save()
-        formset.save_m2m()
+            if owner is not None and isinstance(instance, (Achievement, Stat, Video)):
+                instance.profile = owner
+                fields.add('profile')
+            (changed if instance.pk is not None else new).append(instance)
+
+        model = formset.model
+        with transaction.atomic(using=router.db_for_write(model)):
+            deleted = [obj.pk for obj in formset.deleted_objects]
+            if deleted:
+                model.objects.filter(pk__in=deleted).delete()
+            if new:
+                model.objects.bulk_create(new)
+            if changed and fields:
+                model.objects.bulk_update(changed, list(fields))
+            formset.save_m2m()
 
     def save_model(self, request, obj, form, change):
         """
         Auto-link the profile to the organization if created by an Org Admin.
         """
-        # If the logged-in user is an athlete, ensure the profile links to them
-        if request.user.groups.filter(name='Athlete').exists() and not request.user.is_superuser:
-            obj.user = request.user
+        if not request.user.is_superuser:
+            # If the logged-in user is an athlete, ensure the profile links to them
+            if in_group(request.user, 'Athlete'):
+                obj.user = request.user
 
-        # If the logged-in user is an organization owner, link the profile to their org
-        if request.user.groups.filter(name='Organization Owner').exists() and not request.user.is_superuser:
-            try:
+            # If the logged-in user is an organization owner, link the profile to their org
+            if in_group(request.user, 'Organization Owner'):
                 from organizations.models import Organization
-                org = Organization.objects.get(owner=request.user)
-                obj.organization = org
-            except Organization.DoesNotExist:
-                pass
+                org = Organization.objects.filter(owner=request.user).first()
+                if org is not None:
+                    obj.organization = org
 
+        # Saving a Profile writes its Athlete parent row too (multi-table
+        # inheritance), so there is no parent row to repair afterwards.
         super().save_model(request, obj, form, change)
 
-        # Ensure a corresponding Athlete parent row exists for this Profile
-        try:
-            from .models import Athlete as AthleteModel
-            if not AthleteModel.objects.filter(pk=obj.pk).exists():
-                AthleteModel.objects.create(
-                    pk=obj.pk,
-                    first_name=obj.first_name,
-                    last_name=obj.last_name,
-                    phone=getattr(obj, 'phone', ''),
-                    email=getattr(obj, 'email', ''),
-                    age=getattr(obj, 'age', None),
-                    bio=getattr(obj, 'bio', ''),
-                    sport=getattr(obj, 'sport', ''),
-                    school=getattr(obj, 'school', ''),
-                    graduation_year=getattr(obj, 'graduation_year', None),
-                    coach_name=getattr(obj, 'coach_name', ''),
-                    organization=getattr(obj, 'organization', None),
-                    user=getattr(obj, 'user', None),
-                )
-        except Exception:
-            # If anything goes wrong, don't block admin save
-            pass
-
 @admin.register(Athlete)
-class AthleteAdmin(admin.ModelAdmin):
+class AthleteAdmin(BackgroundDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     # Use a custom change form template that removes breadcrumbs and object-tools
     change_form_template = 'admin/no_breadcrumb_change_form.html'
     change_list_template = 'admin/no_breadcrumb_change_list.html'
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_children(apps, schema_editor):
+    Profile = apps.get_model('athletes', 'Profile')
+    counts = {}
+    for field, model_name in [('achievement_count', 'Achievement'), ('stat_count', 'Stat'), ('video_count', 'Video')]:
+        model = apps.get_model('athletes', model_name)
+        rows = (model.objects.filter(profile=OuterRef('pk')).order_by()
+                .values('profile').annotate(n=Count('pk')).values('n'))
+        counts[field] = Coalesce(Subquery(rows), 0)
+    Profile.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0003_remove_athlete_profile_picture_alter_athlete_sport_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='achievement_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='stat_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='video_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(count_children, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0004_profile_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stat',
+            name='event_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='stat',
+            name='lower_is_better',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='stat',
+            name='performance_value',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stat',
+            index=models.Index(fields=['event_key', 'performance_value'], name='athletes_st_event_k_512c7f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stat',
+            index=models.Index(fields=['profile', 'event_key', 'performance_value'], name='athletes_st_profile_b53520_idx'),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_key', models.CharField(max_length=100)),
+                ('value', models.FloatField()),
+                ('lower_is_better', models.BooleanField()),
+                ('rank', models.PositiveIntegerField()),
+                ('sport', models.CharField(blank=True, max_length=250, null=True)),
+                ('state', models.CharField(blank=True, max_length=50, null=True)),
+                ('graduation_year', models.IntegerField(blank=True, null=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='athletes.profile')),
+                ('stat', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='athletes.stat')),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+                'indexes': [
+                    models.Index(fields=['event_key', 'rank'], name='athletes_le_event_k_c6769a_idx'),
+                    models.Index(fields=['event_key', 'sport', 'value'], name='athletes_le_event_k_8c764c_idx'),
+                    models.Index(fields=['event_key', 'state', 'value'], name='athletes_le_event_k_0c903c_idx'),
+                    models.Index(fields=['event_key', 'graduation_year', 'value'], name='athletes_le_event_k_41b55e_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('event_key', 'profile'), name='unique_leaderboard_entry'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0005_stat_performance_value_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressionPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_key', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('value', models.FloatField()),
+                ('lower_is_better', models.BooleanField()),
+                ('stats', models.PositiveIntegerField(default=1)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progression', to='athletes.profile')),
+                ('stat', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='athletes.stat')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('profile', 'event_key', 'date'), name='unique_progression_point')],
+            },
+        ),
+    ]
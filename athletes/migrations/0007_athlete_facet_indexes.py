@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0006_progressionpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['sport'], name='athletes_at_sport_ca855c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['graduation_year'], name='athletes_at_graduat_3e507a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['school'], name='athletes_at_school_859422_idx'),
+        ),
+    ]
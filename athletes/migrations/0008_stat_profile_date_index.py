@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0007_athlete_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stat',
+            index=models.Index(fields=['profile', 'date', 'id'], name='athletes_st_profile_c09c4e_idx'),
+        ),
+    ]
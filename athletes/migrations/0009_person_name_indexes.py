@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-19 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0008_stat_profile_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['last_name'], name='athletes_pe_last_na_3ed1ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['first_name'], name='athletes_pe_first_n_e8414b_idx'),
+        ),
+    ]
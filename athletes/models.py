@@ -1,4 +1,3 @@
-from PIL import Image
 import io
 
 from django.conf import settings
@@ -7,10 +6,13 @@ from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 
+from api.querysets import BulkSignalManager, BulkSignalQuerySet
 from organizations.models import Organization
 
+from .performance import event_key, parse_performance
+
 
 # A robust regex for Unicode Emojis
 emoji_validator = RegexValidator(
@@ -31,6 +33,15 @@ class Person(models.Model):
     phone = models.CharField(max_length=15)
     email = models.EmailField(unique=True)
 
+    objects = BulkSignalManager()
+
+    class Meta:
+        # Admin name searches (api/admin.py)
+        indexes = [
+            models.Index(fields=['last_name']),
+            models.Index(fields=['first_name']),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
     
@@ -51,6 +62,16 @@ class Athlete(Person):
         blank=True,
         related_name='athletes'
     )
+    # Set while a background deletion is pending (see api/deletion.py)
+    hidden = models.BooleanField(default=False, editable=False, db_index=True)
+
+    class Meta:
+        # Facet filters (api/v1/facets.py)
+        indexes = [
+            models.Index(fields=['sport']),
+            models.Index(fields=['graduation_year']),
+            models.Index(fields=['school']),
+        ]
 
     def __str__(self):
         parts = [self.first_name, self.last_name]
@@ -76,6 +97,10 @@ class Profile(Athlete):
     facebook = models.CharField(max_length=500, blank=True, null=True)
     x = models.CharField(max_length=500, blank=True, null=True)
     instagram = models.CharField(max_length=500, blank=True, null=True)
+    # Maintained by api/counters.py
+    achievement_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    stat_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    video_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
 
     def save(self, *args, **kwargs):
         # Only compress if the file is a new upload (is an instance of UploadedFile)
@@ -90,6 +115,9 @@ class Profile(Athlete):
         super().save(*args, **kwargs)
 
     def _compress_image(self, image_field):
+        # Imported here: only uploads need Pillow, and it is slow to import.
+        from PIL import Image
+
         img = Image.open(image_field)
         
         # Preserve original format (PNG, JPEG, etc.)
@@ -117,16 +145,147 @@ class Achievement(models.Model):
                              help_text="Add emoji of your achievement (e.g., 🏆, 🎯, ⭐)")
     achievement = models.TextField(blank=True, null=True)
 
+    objects = BulkSignalManager()
+
     def __str__(self):
         return f"{self.emoji} {self.achievement}"
 
+# Stat columns derived from event/performance (see performance.py)
+PARSED_FROM = {'event', 'performance'}
+PARSED_FIELDS = ['event_key', 'performance_value', 'lower_is_better']
+
+
+class StatQuerySet(BulkSignalQuerySet):
+    """Keeps the parsed performance columns in step on the bulk paths too."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.parse_performance()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        fields = list(fields)
+        if PARSED_FROM & set(fields):
+            for obj in objs:
+                obj.parse_performance()
+            fields += [name for name in PARSED_FIELDS if name not in fields]
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    def update(self, **kwargs):
+        # bulk_update() writes the parsed columns along with their sources.
+        if not PARSED_FROM & set(kwargs) or set(PARSED_FIELDS) <= set(kwargs):
+            return super().update(**kwargs)
+        # The new values may be expressions: write them, then read them back.
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            stats = list(Stat._base_manager.using(self.db).filter(pk__in=pks).only('event', 'performance'))
+            for stat in stats:
+                stat.parse_performance()
+            Stat._base_manager.using(self.db).bulk_update(stats, PARSED_FIELDS)
+        return rows
+
+
+class StatManager(models.Manager.from_queryset(StatQuerySet)):
+    pass
+
+
 class Stat(models.Model):
     profile = models.ForeignKey('Profile', on_delete=models.CASCADE, null=True, blank=True, related_name='stats')
     date = models.DateField()
     event = models.TextField(max_length=100)
     performance = models.TextField(max_length=100)
     highlight = models.TextField(max_length=100)
+    # Parsed from event/performance on save, so marks can be ranked in SQL
+    event_key = models.CharField(max_length=100, blank=True, default='', editable=False)
+    performance_value = models.FloatField(null=True, blank=True, editable=False)
+    lower_is_better = models.BooleanField(null=True, blank=True, editable=False)
+
+    objects = StatManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event_key', 'performance_value']),
+            models.Index(fields=['profile', 'event_key', 'performance_value']),
+            # /api/v1/profiles/<id>/stats/ pages and ?preview=
+            models.Index(fields=['profile', 'date', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.parse_performance()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and PARSED_FROM & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *PARSED_FIELDS}
+        super().save(*args, **kwargs)
+
+    def parse_performance(self):
+        self.event_key = event_key(self.event)
+        parsed = parse_performance(self.event, self.performance)
+        self.performance_value, self.lower_is_better = parsed or (None, None)
 
 class Video(models.Model):
     profile = models.ForeignKey('Profile', on_delete=models.CASCADE, null=True, blank=True, related_name='videos')
     url = models.URLField(max_length=500)
+
+    objects = BulkSignalManager()
+
+
+class LeaderboardEntry(models.Model):
+    """
+    An athlete's best mark in an event, kept up to date by
+    api/leaderboards.py. ``rank`` is 1 + the number of athletes with a
+    better mark in the event; sport, state and graduation year are copied
+    from the profile so every filtered board is a single index range.
+    """
+    event_key = models.CharField(max_length=100)
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    # Cleared when the stat goes; the entry is recomputed right after.
+    stat = models.ForeignKey(Stat, on_delete=models.SET_NULL, null=True, related_name='+')
+    value = models.FloatField()
+    lower_is_better = models.BooleanField()
+    rank = models.PositiveIntegerField()
+    sport = models.CharField(max_length=250, blank=True, null=True)
+    state = models.CharField(max_length=50, blank=True, null=True)
+    graduation_year = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event_key', 'profile'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['event_key', 'rank']),
+            models.Index(fields=['event_key', 'sport', 'value']),
+            models.Index(fields=['event_key', 'state', 'value']),
+            models.Index(fields=['event_key', 'graduation_year', 'value']),
+        ]
+        verbose_name_plural = 'leaderboard entries'
+
+    def __str__(self):
+        return f"#{self.rank} {self.event_key}: {self.value}"
+
+
+class ProgressionPoint(models.Model):
+    """
+    An athlete's best mark in an event on one day, kept up to date by
+    api/progression.py: the series behind the profile progression charts.
+    """
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='progression')
+    event_key = models.CharField(max_length=100)
+    date = models.DateField()
+    value = models.FloatField()
+    lower_is_better = models.BooleanField()
+    # Cleared when the stat goes; the point is recomputed right after.
+    stat = models.ForeignKey(Stat, on_delete=models.SET_NULL, null=True, related_name='+')
+    # Readable marks in the event that day
+    stats = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'event_key', 'date'], name='unique_progression_point'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_key} {self.date}: {self.value}"
@@ -0,0 +1,142 @@
+"""
+Turns the free-text ``Stat.event`` and ``Stat.performance`` into something
+that can be ranked.
+
+``event_key()`` normalizes spelling ("100 Meters", "100m" -> ``100m``;
+"200 Free" -> ``200-freestyle``). ``parse_performance()`` reads the mark
+the way the event is measured and returns it in a base unit with the
+direction in which it is better:
+
+* races and swims (a distance such as ``100m`` or ``200y``, or a race
+  such as the marathon) are times, in seconds, lower is better:
+  ``52.34``, ``52.34s``, ``1:52.34``, ``1:02:45``;
+* jumps and throws are distances, in metres, higher is better: ``6.52m``,
+  ``6.52``, ``650 cm``, ``21' 4.5"``, ``21-04.5``, ``65 ft``;
+* combined events and scores are points, higher is better.
+
+Events are recognized by whole words of their key, so "Shots on Goal" is
+no shot put. Anything else (rebounds, assists, passing yards...) isn't
+measured, and neither is a mark that doesn't read as one for its event:
+both give None, and the stat is left out of the leaderboards.
+"""
+import re
+from collections import namedtuple
+
+Performance = namedtuple('Performance', ['value', 'lower_is_better'])
+
+TIME, DISTANCE, POINTS = 'time', 'distance', 'points'
+
+# Words (or runs of words) of the event keys, see event_key()
+POINTS_WORDS = ('decathlon', 'heptathlon', 'pentathlon', 'points', 'score')
+FIELD_WORDS = ('jump', 'vault', 'shot', 'shot-put', 'discus', 'javelin', 'hammer', 'weight-throw')
+# Races named without a distance; strokes alone ("free" throws) aren't races
+RACE_WORDS = ('marathon', 'mile', 'miles', 'steeplechase', 'hurdles', 'relay', 'dash')
+
+# Spelling variants, applied word by word.
+EVENT_WORDS = {
+    'meters': 'm', 'meter': 'm', 'metres': 'm', 'metre': 'm', 'mtr': 'm',
+    'yards': 'y', 'yard': 'y', 'yds': 'y', 'yd': 'y',
+    'kilometers': 'km', 'kilometres': 'km', 'k': 'km',
+    'free': 'freestyle', 'fr': 'freestyle',
+    'back': 'backstroke', 'bk': 'backstroke',
+    'breast': 'breaststroke', 'br': 'breaststroke',
+    'fly': 'butterfly',
+    'im': 'individual-medley',
+    'hurdle': 'hurdles',
+}
+
+FEET = 0.3048
+INCH = 0.0254
+
+_RACE_DISTANCE = re.compile(r'^\d+(?:m|y|km)?$')
+_TIME = re.compile(r'^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)\s*(?:s|sec|secs|seconds)?$')
+_METRES = re.compile(r'^(\d+(?:\.\d+)?)\s*(m|cm)?$')
+_FEET_INCHES = re.compile(r'''^(\d+)\s*(?:'|ft|-)\s*(\d+(?:\.\d+)?)?\s*(?:"|in|'')?$''')
+_FEET = re.compile(r'^(\d+(?:\.\d+)?)\s*(?:ft|feet|\')$')
+_POINTS = re.compile(r'^(\d+(?:\.\d+)?)\s*(?:pts|points)?$')
+# Remarks after the mark: "52.34 (PR)", "6.52m, wind-aided", "1:02.5 SB"
+_REMARKS = re.compile(r'\s*[(,;].*$|(\s+(pr|pb|sb|sr|w|q|nwi|ht))+$')
+
+
+def event_key(event):
+    """Normalized identifier of an event, '' when there is none."""
+    text = re.sub(r'(\d)\s*([a-z])', r'\1 \2', (event or '').lower())
+    words = [EVENT_WORDS.get(word, word) for word in re.findall(r'[a-z0-9]+', text)]
+    key = '-'.join(words)
+    # "100 m" -> "100m", "1500 m freestyle" -> "1500m-freestyle"
+    return re.sub(r'\b(\d+)-(m|y|km)\b', r'\1\2', key)[:100]
+
+
+def has_words(key, words):
+    """Whether ``key`` has one of ``words`` as whole words."""
+    padded = f'-{key}-'
+    return any(f'-{word}-' in padded for word in words)
+
+
+def measure(key):
+    """How the event identified by ``key`` is measured, None if it isn't one we know."""
+    if has_words(key, POINTS_WORDS):
+        return POINTS
+    if has_words(key, FIELD_WORDS):
+        return DISTANCE
+    if has_words(key, RACE_WORDS) or any(_RACE_DISTANCE.match(word) for word in key.split('-')):
+        return TIME
+    return None
+
+
+def parse_time(text):
+    match = _TIME.match(text)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    if minutes is None:
+        hours, minutes = None, hours
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+
+def parse_distance(text):
+    match = _METRES.match(text)
+    if match:
+        value, unit = match.groups()
+        return float(value) / 100 if unit == 'cm' else float(value)
+    match = _FEET_INCHES.match(text)
+    if match:
+        feet, inches = match.groups()
+        return int(feet) * FEET + float(inches or 0) * INCH
+    match = _FEET.match(text)
+    if match:
+        return float(match.group(1)) * FEET
+    return None
+
+
+def parse_points(text):
+    match = _POINTS.match(text)
+    return float(match.group(1)) if match else None
+
+
+PARSERS = {
+    TIME: (parse_time, True),
+    DISTANCE: (parse_distance, False),
+    POINTS: (parse_points, False),
+}
+
+
+def lower_is_better(key):
+    """Whether a lower mark wins in the event identified by ``key``; None if it isn't measured."""
+    measured = measure(key)
+    return PARSERS[measured][1] if measured else None
+
+
+def parse_performance(event, performance):
+    """A ``Performance`` for the mark, or None if it can't be read."""
+    text = _REMARKS.sub('', ' '.join((performance or '').lower().split()))
+    if not text:
+        return None
+    measured = measure(event_key(event))
+    if measured is None:
+        return None
+    parse, lower_is_better = PARSERS[measured]
+    value = parse(text)
+    if value is None or value <= 0:
+        return None
+    return Performance(round(value, 3), lower_is_better)
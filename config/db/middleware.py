@@ -0,0 +1,77 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+
+from .router import replica_aliases, replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadYourWritesMiddleware:
+    """
+    Let safe requests read from replicas, except for clients that wrote
+    within the last ``DATABASE_PRIMARY_STICKY_SECONDS``.
+
+    Browsers are recognised by a cookie; token clients (the mobile app) by
+    a hash of their Authorization header stored in the cache, which needs
+    a cache shared between worker processes to be effective.
+
+    Views that only read but have to accept POST (e.g. the batch endpoint)
+    set ``read_only = True`` on their class to be treated as safe.
+    """
+
+    cookie_name = 'db_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        read_only = self.is_read_only(request)
+        allowed = read_only and not self.is_sticky(request)
+        with replica_reads(allowed):
+            response = self.get_response(request)
+
+        if not read_only and response.status_code < 400:
+            self.make_sticky(request, response)
+        return response
+
+    def is_read_only(self, request):
+        if request.method in SAFE_METHODS:
+            return True
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        return getattr(getattr(match.func, 'view_class', None), 'read_only', False)
+
+    def window(self):
+        return getattr(settings, 'DATABASE_PRIMARY_STICKY_SECONDS', 10)
+
+    def cache_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'db-sticky:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def is_sticky(self, request):
+        try:
+            if float(request.COOKIES.get(self.cookie_name, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        key = self.cache_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def make_sticky(self, request, response):
+        window = self.window()
+        response.set_cookie(self.cookie_name, str(time.time() + window), max_age=window,
+                            httponly=True, samesite='Lax')
+        key = self.cache_key(request)
+        if key is not None:
+            cache.set(key, 1, window)
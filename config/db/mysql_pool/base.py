@@ -0,0 +1,43 @@
+"""
+MySQL backend that borrows connections from a per-process pool.
+
+Use it as the ENGINE and tune the pool with a ``POOL`` dict next to
+``OPTIONS`` (keys: MAX_SIZE, MAX_IDLE, MAX_LIFETIME, TIMEOUT). Django
+still "closes" the connection at the end of every request
+(CONN_MAX_AGE = 0); with this backend that returns it to the pool.
+"""
+import os
+
+from django.db import connections
+from django.db.backends.mysql import base as mysql_base
+
+from config.db.pool import get_pool
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+    def pool(self):
+        options = {key.lower(): value for key, value in self.settings_dict.get('POOL', {}).items()}
+        return get_pool(self.alias, self._connect, **options)
+
+    def _connect(self):
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        return self.pool().checkout()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # A connection abandoned mid-transaction is not safe to reuse.
+                self.pool().checkin(self.connection, discard=self.in_atomic_block)
+
+
+def _drop_inherited_connections():
+    # After a fork the child must not reuse (or close) the parent's sockets.
+    for connection in connections.all(initialized_only=True):
+        if isinstance(connection, DatabaseWrapper):
+            connection.connection = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_drop_inherited_connections)
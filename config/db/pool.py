@@ -0,0 +1,193 @@
+"""
+A small per-process DB-API connection pool.
+
+Each worker process keeps at most ``max_size`` open connections. A
+connection handed back is kept for the next checkout instead of being
+closed, so steady traffic pays the TCP/TLS/auth handshake once per
+connection rather than once per request. Checked-out connections are
+pinged first and replaced if the server dropped them; connections idle for
+longer than ``max_idle`` seconds (or older than ``max_lifetime``) are
+closed.
+
+Pools are tied to the process that created them. After a fork the child
+starts with empty pools and never touches the sockets it inherited, which
+still belong to the parent (Passenger forks workers from a preloader).
+"""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, factory, max_size=5, max_idle=300, max_lifetime=3600, timeout=10,
+                 ping=None, close=None):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping = ping or (lambda conn: conn.ping())
+        self.close = close or (lambda conn: conn.close())
+        self.pid = os.getpid()
+
+        self._idle = []       # [(connection, created_at, last_used)], most recent last
+        self._created_at = {}  # id(connection) -> creation time, for checked-out ones
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Metrics
+        self.created = 0
+        self.checkouts = 0
+        self.evicted = 0
+        self.failed_pings = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def checkout(self):
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    conn, created_at, _ = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    conn, created_at = None, None
+                    self._in_use += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._record_wait(start)
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._record_wait(start)
+
+        try:
+            if conn is not None and not self._healthy(conn):
+                conn = None
+            if conn is None:
+                conn = self.factory()
+                created_at = time.monotonic()
+                self.created += 1
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        self.checkouts += 1
+        self._created_at[id(conn)] = created_at
+        return conn
+
+    def checkin(self, conn, discard=False):
+        created_at = self._created_at.pop(id(conn), time.monotonic())
+        now = time.monotonic()
+        if not discard and now - created_at > self.max_lifetime:
+            discard = True
+        if not discard:
+            try:
+                # Never hand the next request an open transaction.
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def _record_wait(self, start):
+        wait = time.monotonic() - start
+        self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _healthy(self, conn):
+        try:
+            self.ping(conn)
+        except Exception:
+            self.failed_pings += 1
+            self._close_quietly(conn)
+            return False
+        return True
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        keep = []
+        for entry in self._idle:
+            conn, created_at, last_used = entry
+            if now - last_used > self.max_idle or now - created_at > self.max_lifetime:
+                self.evicted += 1
+                self._close_quietly(conn)
+            else:
+                keep.append(entry)
+        self._idle = keep
+
+    def _close_quietly(self, conn):
+        try:
+            self.close(conn)
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._in_use
+        return {
+            'max_size': self.max_size,
+            'in_use': in_use,
+            'idle': idle,
+            'created': self.created,
+            'checkouts': self.checkouts,
+            'evicted': self.evicted,
+            'failed_pings': self.failed_pings,
+            'waits': self.waits,
+            'avg_wait_ms': self.total_wait / self.waits * 1000 if self.waits else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory, **options):
+    """Return this process's pool for ``key``, creating it on first use."""
+    pool = _pools.get(key)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[key] = ConnectionPool(factory, **options)
+    return pool
+
+
+def pool_stats():
+    return {key: pool.stats() for key, pool in _pools.items() if pool.pid == os.getpid()}
+
+
+def _forget_pools_after_fork():
+    # The inherited sockets belong to the parent; dropping our references
+    # (without closing) leaves its connections intact.
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
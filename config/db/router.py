@@ -0,0 +1,93 @@
+"""
+Primary/replica routing.
+
+Reads go to a read replica only while a request has explicitly allowed it
+(see ReadYourWritesMiddleware); everything else - writes, management
+commands, unsafe requests and clients that wrote recently - uses the
+primary. Replicas that fail to connect are skipped for
+``DATABASE_REPLICA_RETRY_SECONDS`` and their reads fall back to the primary.
+"""
+import contextlib
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# False (primary only), True (replicas allowed) or the alias picked for the
+# current request.
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+# alias -> monotonic time until which the replica is considered down
+_down_until = {}
+
+
+def primary_alias():
+    return getattr(settings, 'DATABASE_PRIMARY', 'default')
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextlib.contextmanager
+def replica_reads(allowed=True):
+    """Allow (or forbid) reads from replicas for the enclosed block."""
+    token = _replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def mark_replica_down(alias):
+    _down_until[alias] = time.monotonic() + getattr(settings, 'DATABASE_REPLICA_RETRY_SECONDS', 30)
+
+
+def healthy_replica():
+    """Return a usable replica alias, or None if every replica is down."""
+    now = time.monotonic()
+    candidates = [alias for alias in replica_aliases() if _down_until.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        connection = connections[alias]
+        if connection.connection is None:
+            try:
+                connection.ensure_connection()
+            except DatabaseError:
+                mark_replica_down(alias)
+                continue
+        return alias
+    return None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        primary = primary_alias()
+        if not _replica_reads.get() or not replica_aliases():
+            return primary
+        # Reads inside a transaction on the primary must see its writes.
+        if connections[primary].in_atomic_block:
+            return primary
+        chosen = _replica_reads.get()
+        if chosen is True:
+            # Pick once per request so every read sees the same snapshot.
+            chosen = healthy_replica() or primary
+            _replica_reads.set(chosen)
+        return chosen
+
+    def db_for_write(self, model, **hints):
+        return primary_alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {primary_alias(), *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication, never from migrate.
+        if db in replica_aliases():
+            return False
+        return None
@@ -62,10 +62,19 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Negotiates zstd/br/gzip for large API payloads (see RESPONSE_COMPRESSION_MIN_SIZE)
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # cProfile + SQL timings for staff-requested and sampled requests (see api/profiling.py)
+    'api.profiling.ProfilerMiddleware',
+    # Flags statements repeated per item of a list (see api/nplusone.py)
+    'api.nplusone.NPlusOneMiddleware',
+    'config.db.middleware.ReadYourWritesMiddleware',
+    # Cache-Control/Surrogate-Key for public responses, batched edge purges
+    'api.middleware.EdgeCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware'
@@ -123,8 +132,39 @@ REST_FRAMEWORK = {
         # Only authenticated users can access endpoints unless specified otherwise.
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # orjson-backed JSON, falls back to the stdlib when orjson is missing
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets for the views with a throttle_scope (see api/throttling.py):
+    # '<scope>_anon' per client IP, '<scope>_user' per signed-in account
+    'DEFAULT_THROTTLE_CLASSES': ['api.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'search_anon': '30/min',
+        'search_user': '120/min',
+        'home_anon': '60/min',
+        'home_user': '240/min',
+        'profiles_anon': '120/min',
+        'profiles_user': '600/min',
+    },
+    # Proxies (the edge cache) in front of the application: the client IP the
+    # anonymous buckets go by is taken that far back in X-Forwarded-For; with
+    # 0, X-Forwarded-For is ignored and REMOTE_ADDR used. One by default when
+    # the edge cache is set up (EDGE_CACHE_PURGE_URL), 0 otherwise; the
+    # system checks refuse 0 behind the edge cache.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1 if os.getenv('EDGE_CACHE_PURGE_URL') else 0)),
 }
 
+# Where the throttling buckets are kept: a table shared by the application
+# processes (FileBucketStore), or per process (LocMemBucketStore)
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'api.throttling.FileBucketStore')
+THROTTLE_FILE = os.getenv('THROTTLE_FILE', os.path.join(os.getenv('DJANGO_CACHE_DIR', BASE_DIR / 'cache'), 'throttle-buckets'))
+THROTTLE_FILE_SLOTS = 65536
+
+# Responses smaller than this (in bytes) are sent uncompressed
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -147,7 +187,8 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Stock MySQL backend plus a per-process connection pool (config/db/pool.py)
+        'ENGINE': 'config.db.mysql_pool',
         'NAME': os.getenv('MYSQL_DATABASE'),
         'USER': os.getenv('MYSQL_USER'),
         'PASSWORD': os.getenv('MYSQL_PASSWORD'),
@@ -158,9 +199,134 @@ DATABASES = {
             'charset': 'utf8mb4',
             'use_unicode': True,
         },
+        # Connections are handed back to the pool at the end of each request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('MYSQL_POOL_SIZE', 4)),
+            'MAX_IDLE': 300,
+            'MAX_LIFETIME': 3600,
+            'TIMEOUT': 10,
+        },
     }
 }
 
+# Read replicas: comma separated hosts that share the primary's credentials.
+# Safe requests read from them; writes and recent writers stay on 'default'.
+DATABASE_PRIMARY = 'default'
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('MYSQL_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['config.db.router.PrimaryReplicaRouter']
+# How long a client's reads stay on the primary after it writes
+DATABASE_PRIMARY_STICKY_SECONDS = 10
+# How long an unreachable replica is skipped before it is tried again
+DATABASE_REPLICA_RETRY_SECONDS = 30
+
+# Shared by every Passenger worker, so invalidations reach all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+# Queryset cache for read-mostly tables (see api/querycache.py)
+QUERYSET_CACHE_ENABLED = True
+QUERYSET_CACHE_ALIAS = 'default'
+QUERYSET_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serialized profile fragments (see api/v1/fragments.py)
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Edge cache (CDN / reverse proxy) in front of the public read endpoints.
+# Responses are kept until purged by surrogate key, or EDGE_CACHE_MAX_AGE.
+EDGE_CACHE_MAX_AGE = 60 * 60 * 24
+EDGE_CACHE_BROWSER_MAX_AGE = 60
+EDGE_CACHE_PURGE_URL = os.getenv('EDGE_CACHE_PURGE_URL', '')
+# Fastly authenticates purges with this header; Varnish needs none.
+EDGE_CACHE_PURGE_HEADERS = {'Fastly-Key': os.getenv('EDGE_CACHE_PURGE_TOKEN')} if os.getenv('EDGE_CACHE_PURGE_TOKEN') else {}
+EDGE_CACHE_PURGER = 'api.edgecache.HTTPPurger' if EDGE_CACHE_PURGE_URL else 'api.edgecache.NullPurger'
+
+# Entries per leaderboard page (?limit= can ask for up to the maximum)
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
+
+# Profile progression charts: most points sent per event (longer series are
+# downsampled), and the month seasons start in (8: "2024-25" runs Aug-Jul)
+PROGRESSION_MAX_POINTS = 200
+PROGRESSION_SEASON_START_MONTH = 8
+
+# A profile's stats, achievements and videos (/api/v1/profiles/<id>/stats/
+# etc.): rows per cursor page, and the most of the latest ones ?preview= can
+# inline on the profile itself
+PROFILE_CHILDREN_PAGE_SIZE = 50
+PROFILE_CHILDREN_MAX_PAGE_SIZE = 200
+PROFILE_PREVIEW_MAX = 20
+
+# Admin changelists (see api/admin.py): tables whose statistics show at least
+# ADMIN_LARGE_TABLE_ROWS rows get estimated counts and indexed prefix searches,
+# and their filtered lists are counted up to ADMIN_COUNT_LIMIT rows. Estimates
+# are re-read every ADMIN_ESTIMATE_TTL seconds.
+ADMIN_LARGE_TABLE_ROWS = 10000
+ADMIN_COUNT_LIMIT = 10000
+ADMIN_ESTIMATE_TTL = 300
+# Rows of a profile's stats, achievements and videos shown in its change form;
+# older ones are loaded on demand
+ADMIN_INLINE_ROWS = 20
+
+# Background deletes of organizations and profiles (see api/deletion.py):
+# related rows deleted or detached per transaction by `manage.py run_deletion_jobs`,
+# and the seconds without a finished batch after which a running job is taken
+# over by the next run (its worker died)
+DELETION_BATCH_SIZE = 500
+DELETION_JOB_STALE_AFTER = 15 * 60
+
+# Delta sync (/api/v1/sync/): change log entries per page, how long entries are
+# kept by `manage.py compact_changelog` before clients must reset, and how old
+# an entry must be before it is served (longer than writing transactions last)
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+SYNC_LOG_RETENTION_DAYS = 30
+SYNC_SETTLE_SECONDS = 10
+
+# Most sub-requests one call to /api/v1/batch/ may carry
+BATCH_MAX_REQUESTS = 10
+
+# Do the first request's setup as soon as a process starts (see
+# config/warmup.py): URLconf, serializers, connections, then these requests
+WARMUP = os.getenv('WARMUP', '1') != '0'
+WARMUP_URLS = ['/api/v1/home/']
+
+# Request profiler (see api/profiling.py): staff profile a request with
+# `X-Profile: 1` or `?_profile=1`; besides, PROFILER_SAMPLE_RATE of all requests
+# are profiled and kept when they take PROFILER_SLOW_MS or more. The newest
+# PROFILER_KEEP profiles are stored.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+PROFILER_SLOW_MS = 500
+PROFILER_KEEP = 200
+
+# N+1 query detector (see api/nplusone.py): a SELECT of the same shape run more
+# than NPLUSONE_THRESHOLD times in one request is logged and counted per view
+# ('log'), raises ('raise', what the test runner sets) or isn't looked for ('off')
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'log')
+NPLUSONE_THRESHOLD = 5
+
+# Milliseconds the statements of an expensive read may take (see api/sqlbudget.py);
+# over budget, search answers from SEARCH_CACHE_TIMEOUT-old results of a slow run
+# or with name prefix matches, and facet counts are left out
+SQL_BUDGETS = {'search': 300, 'facets': 500}
+SEARCH_CACHE_TIMEOUT = 60 * 10
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -198,6 +364,25 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Hashed names plus .gz/.br siblings of the text assets (see api/staticfiles.py)
+    'staticfiles': {'BACKEND': 'api.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+# Smallest static file collectstatic writes compressed siblings for
+STATIC_COMPRESS_MIN_SIZE = 256
+
+# /media/ and /static/ requests that reach Django (see api/media.py) are handed
+# back to the web server: 'x-sendfile' (Apache mod_xsendfile, lighttpd) or
+# 'x-accel-redirect' (nginx, with internal locations at MEDIA_ACCEL_PREFIX and
+# STATIC_ACCEL_PREFIX aliased to MEDIA_ROOT and STATIC_ROOT). Unset, the files
+# are streamed from Python.
+FILE_SENDFILE = os.getenv('FILE_SENDFILE') or None
+MEDIA_ACCEL_PREFIX = '/protected/media/'
+STATIC_ACCEL_PREFIX = '/protected/static/'
+# Browser cache lifetime of files whose names aren't content-addressed
+FILE_MAX_AGE = 60 * 60
+
 # dj_rest_auth Configuration
 REST_AUTH = {
     'REGISTER_SERIALIZER': 'api.v1.auth_serializers.CustomRegisterSerializer',
@@ -206,4 +391,6 @@ REST_AUTH = {
 }
 
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+TEST_RUNNER = 'api.testrunner.TestRunner'
\ No newline at end of file
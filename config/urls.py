@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from allauth.account.views import confirm_email
 from django.views.generic import TemplateView
+from api.media import serve_media, serve_static
 
 admin.site.site_header = 'Athlume'
 admin.site.site_title = 'Athlume Profile'
@@ -46,4 +47,8 @@ urlpatterns = [
     
     # 3. Your App Endpoints
     path('api/', include('api.urls')), 
+
+    # 4. Files no front server location picked up (handed back via X-Sendfile/X-Accel-Redirect)
+    re_path(r'^media/(?P<path>.+)$', serve_media, name='media'),
+    re_path(r'^static/(?P<path>.+)$', serve_static, name='static'),
 ]
@@ -0,0 +1,106 @@
+"""
+Work a fresh process would otherwise do while answering its first request.
+
+Passenger starts and recycles application processes often, and without
+this the first request after each start pays for loading the views and
+the router's URLconf, compiling the serializers and opening the first
+database and cache connections. ``warmup()`` runs right after
+passenger_wsgi.py loads the application:
+
+* resolves the URLconf (importing every view module) and builds its
+  reverse lookup tables;
+* builds the field maps of the API serializers and the read plans of the
+  compiled serializers (api/v1/compiled.py);
+* opens a connection to every database, handing it to the pool
+  (config/db/pool.py) for the first request, and touches every cache;
+* sends the WARMUP_URLS through the application, which loads whatever is
+  left (templates, renderers, lazy imports in the request path).
+
+Each step is timed and logged; a failing step is logged and skipped, so
+warming up can never keep a process from serving. WARMUP = False turns
+it off.
+"""
+import io
+import logging
+import sys
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_urls():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # Populating the reverse tables walks (and imports) every included URLconf.
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def build_serializers():
+    from api.v1 import compiled
+
+    serializers = [value for value in vars(compiled).values() if isinstance(value, compiled.CompiledSerializer)]
+    for serializer in serializers:
+        # The plan instantiates the DRF serializer and reads its fields.
+        serializer.lookups
+    return len(serializers)
+
+
+def open_connections():
+    from django.core.cache import caches
+    from django.db import connections
+
+    for connection in connections.all():
+        connection.ensure_connection()
+        # Back to the pool, ready for the first request.
+        connection.close()
+    for alias in settings.CACHES:
+        caches[alias].get('warmup')
+    return len(connections.all())
+
+
+def request(application, path):
+    """Send a GET for ``path`` through ``application``; returns the status line."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': (settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.').replace('*', 'localhost'),
+        'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': False, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0] if status else None
+
+
+def warmup(application=None):
+    """Run every warmup step; returns {step: seconds}."""
+    if not getattr(settings, 'WARMUP', True):
+        return {}
+    steps = [('urls', resolve_urls), ('serializers', build_serializers), ('connections', open_connections)]
+    if application is not None:
+        steps += [(f'GET {path}', lambda path=path: request(application, path))
+                  for path in getattr(settings, 'WARMUP_URLS', ())]
+
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            result = step()
+        except Exception:
+            logger.exception('Warmup step %s failed', name)
+            continue
+        timings[name] = time.perf_counter() - start
+        logger.info('Warmup %s: %s in %.1f ms', name, result, timings[name] * 1000)
+    return timings
@@ -1,18 +1,22 @@
 from django.contrib import admin
+
+from api.admin import LargeTableAdminMixin
 from .models import Highlight, FeaturedAthlete, SocialMedia
 
 
 @admin.register(Highlight)
-class HighlightAdmin(admin.ModelAdmin):
+class HighlightAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'created_by', 'created_at', 'published', 'image')
     list_filter = ('published',)
     search_fields = ('title', 'body')
 
 
 @admin.register(FeaturedAthlete)
-class FeaturedAthleteAdmin(admin.ModelAdmin):
+class FeaturedAthleteAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('athlete', 'order', 'active', 'added_by', 'added_at')
     list_editable = ('order', 'active')
+    # The athlete's name includes their organization's.
+    list_select_related = ('athlete__organization',)
     search_fields = ('athlete__first_name', 'athlete__last_name', 'athlete__email')
     autocomplete_fields = ('athlete',)
     exclude = ('added_by',)
@@ -25,6 +29,6 @@ class FeaturedAthleteAdmin(admin.ModelAdmin):
 
 
 @admin.register(SocialMedia)
-class SocialMediaAdmin(admin.ModelAdmin):
+class SocialMediaAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('platform', 'url')
     search_fields = ('platform',)
\ No newline at end of file
@@ -1,4 +1,3 @@
-from PIL import Image
 import io
 
 from django.core.exceptions import ValidationError
@@ -7,6 +6,8 @@ from django.core.files.uploadedfile import UploadedFile
 from django.db import models
 from django.conf import settings
 
+from api.querycache import CachedManager
+from api.querysets import BulkSignalManager
 from athletes.models import Profile
 
 def validate_max_size(value):
@@ -25,6 +26,8 @@ class Highlight(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     published = models.BooleanField(default=False)
 
+    objects = BulkSignalManager()
+
     class Meta:
         ordering = ['-created_at']
 
@@ -42,6 +45,9 @@ class Highlight(models.Model):
         super().save(*args, **kwargs)
 
     def _compress_image(self, image_field):
+        # Imported here: only uploads need Pillow, and it is slow to import.
+        from PIL import Image
+
         img = Image.open(image_field)
         
         # Preserve original format (PNG, JPEG, etc.)
@@ -70,6 +76,8 @@ class FeaturedAthlete(models.Model):
     added_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BulkSignalManager()
+
     class Meta:
         ordering = ['order']
         verbose_name = 'Featured Athlete'
@@ -82,8 +90,11 @@ class SocialMedia(models.Model):
     platform = models.CharField(max_length=100)
     url = models.URLField()
 
+    objects = CachedManager()
+
     class Meta:
         ordering = ['platform']
+        base_manager_name = 'objects'
         verbose_name = 'Social Media'
         verbose_name_plural = 'Social Media'
 
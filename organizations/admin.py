@@ -5,6 +5,8 @@ from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from api.admin import BackgroundDeleteAdminMixin, LargeTableAdminMixin, in_group
+
 # Register your models here.
 # @admin.register(Organization)
 # class OrganizationAdmin(admin.ModelAdmin):
@@ -21,11 +23,11 @@ from django.contrib import messages
 #     list_filter = ('state',)
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
+class OrganizationAdmin(BackgroundDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     # Use custom templates that remove the breadcrumb rail
     change_form_template = 'admin/no_breadcrumb_change_form.html'
     change_list_template = 'admin/no_breadcrumb_change_list.html'
-    list_display = ('name', 'created_at')
+    list_display = ('name', 'created_at', 'athlete_count')
     search_fields = ('name', 'email', 'state', 'city')
     
     def get_queryset(self, request):
@@ -35,7 +37,7 @@ class OrganizationAdmin(admin.ModelAdmin):
             return qs
         
         # 2. Organization Owners see ONLY their own organization
-        if request.user.groups.filter(name='Organization Owner').exists():
+        if in_group(request.user, 'Organization Owner'):
             return qs.filter(owner=request.user)
             
         # 3. Everyone else (e.g. Athletes) sees nothing
@@ -68,8 +70,8 @@ class OrganizationAdmin(admin.ModelAdmin):
             return False
 
         # Allow org owners to view their own organization
-        if request.user.groups.filter(name='Organization Owner').exists():
-            return obj.owner == request.user
+        if in_group(request.user, 'Organization Owner'):
+            return obj.owner_id == request.user.pk
 
         return False
 
@@ -83,8 +85,8 @@ class OrganizationAdmin(admin.ModelAdmin):
             return False
 
         # Organization owners can change only their own organization
-        if request.user.groups.filter(name='Organization Owner').exists():
-            return obj.owner == request.user
+        if in_group(request.user, 'Organization Owner'):
+            return obj.owner_id == request.user.pk
 
         return False
 
@@ -106,4 +108,4 @@ class OrganizationAdmin(admin.ModelAdmin):
 @admin.register(School)
 class SchoolAdmin(OrganizationAdmin):
     # Inherits the protection logic from OrganizationAdmin above
-    list_display = ('name', 'state', 'city')
\ No newline at end of file
+    list_display = ('name', 'state', 'city', 'athlete_count')
\ No newline at end of file
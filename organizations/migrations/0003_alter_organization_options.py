@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0002_organization_owner'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='organization',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_athletes(apps, schema_editor):
+    Organization = apps.get_model('organizations', 'Organization')
+    Athlete = apps.get_model('athletes', 'Athlete')
+    athletes = (Athlete.objects.filter(organization=OuterRef('pk')).order_by()
+                .values('organization').annotate(n=Count('pk')).values('n'))
+    Organization.objects.update(athlete_count=Coalesce(Subquery(athletes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('athletes', '0003_remove_athlete_profile_picture_alter_athlete_sport_and_more'),
+        ('organizations', '0003_alter_organization_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='athlete_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(count_athletes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0004_organization_athlete_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='organization',
+            index=models.Index(fields=['state'], name='organizatio_state_838ad1_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organization_state_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='hidden',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
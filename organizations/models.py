@@ -1,4 +1,3 @@
-from PIL import Image
 import io
 
 from django.core.exceptions import ValidationError
@@ -7,6 +6,8 @@ from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import UploadedFile
 from django.db import models
 
+from api.querycache import CachedManager
+
 
 def validate_max_size(value):
     limit = 2 * 1024 * 1024 # 2MB
@@ -27,6 +28,18 @@ class Organization(models.Model):
     state = models.CharField(max_length=50, blank=True, null=True)
     city = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained by api/counters.py
+    athlete_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    # Set while a background deletion is pending (see api/deletion.py)
+    hidden = models.BooleanField(default=False, editable=False, db_index=True)
+
+    objects = CachedManager()
+
+    class Meta:
+        # Related lookups (athlete.organization) go through the cache too.
+        base_manager_name = 'objects'
+        # Facet filters on the athletes' state (api/v1/facets.py)
+        indexes = [models.Index(fields=['state'])]
 
     def __str__(self):
         return self.name
@@ -41,6 +54,9 @@ class Organization(models.Model):
         super().save(*args, **kwargs)
 
     def _compress_image(self, image_field):
+        # Imported here: only uploads need Pillow, and it is slow to import.
+        from PIL import Image
+
         img = Image.open(image_field)
         
         # Preserve original format (PNG, JPEG, etc.)
@@ -1 +1,6 @@
-from config.wsgi import application
\ No newline at end of file
+from config.wsgi import application
+from config.warmup import warmup
+
+# Passenger starts processes on demand: do what the first request would
+# have to before it arrives.
+warmup(application)
@@ -36,3 +36,7 @@ class UserAdmin(BaseUserAdmin):
     list_display = ('email', 'first_name', 'last_name', 'role')
     search_fields = ('email', 'first_name', 'last_name')
     filter_horizontal = ('groups', 'user_permissions')
+
+    def get_queryset(self, request):
+        # The role column reads the groups and both reverse one-to-ones.
+        return super().get_queryset(request).select_related('athlete', 'organization').prefetch_related('groups')